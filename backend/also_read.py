@@ -0,0 +1,202 @@
+"""
+Offline builder for the "readers also shelved" table (book_also_read).
+
+The reading list is treated as an implicit-feedback matrix X (users x books,
+1 where a user shelved a book; DROPPED items are ignored). Item-item
+co-occurrence X^T X is computed one block of books at a time with sparse
+products, turned into cosine or Jaccard similarity, and the top K neighbours
+of each book are written to book_also_read, which /books/{id}/also-read reads
+with a single primary-key range scan.
+
+    python also_read.py            # refresh books marked dirty by writes
+    python also_read.py --full     # rebuild the whole table
+"""
+
+import argparse
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from models import BookAlsoRead, BookAlsoReadDirty
+
+DEFAULT_TOP_K = 20
+# Pairs shelved together by fewer readers than this are ignored as noise
+DEFAULT_MIN_SUPPORT = 2
+# Books per sparse product; bounds the size of each co-occurrence block
+DEFAULT_BLOCK_SIZE = 512
+METRICS = ("cosine", "jaccard")
+
+
+def load_matrix(db: Session) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """Load the users x books shelf matrix and the bookid of each column"""
+    rows = db.execute(
+        text("SELECT userid, bookid FROM readinglist WHERE status <> 'DROPPED'")
+    ).all()
+    if not rows:
+        return sparse.csr_matrix((0, 0), dtype=np.float32), np.array([], np.int64)
+
+    pairs = np.array(rows, dtype=np.int64)
+    _, user_index = np.unique(pairs[:, 0], return_inverse=True)
+    book_ids, book_index = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (user_index, book_index)),
+        shape=(user_index.max() + 1, len(book_ids)),
+    )
+    # Duplicate (user, book) pairs cannot occur, but keep the matrix binary
+    matrix.data[:] = 1.0
+    return matrix, book_ids
+
+
+def top_neighbors(
+    matrix: sparse.csr_matrix,
+    columns: np.ndarray,
+    k: int = DEFAULT_TOP_K,
+    metric: str = "cosine",
+    min_support: int = DEFAULT_MIN_SUPPORT,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yield (source, rank, neighbour, score) column-index arrays per block.
+
+    `columns` selects the books (matrix columns) to compute neighbours for.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(METRICS)}")
+
+    by_book = matrix.T.tocsr()
+    readers = np.asarray(matrix.sum(axis=0)).ravel()
+
+    for start in range(0, len(columns), block_size):
+        block = columns[start : start + block_size]
+        co = (by_book[block] @ matrix).tocsr()
+        if co.nnz == 0:
+            continue
+
+        row = np.repeat(np.arange(len(block)), np.diff(co.indptr))
+        source = block[row]
+        neighbor = co.indices
+        together = co.data
+
+        keep = (neighbor != source) & (together >= min_support)
+        source, neighbor, together = source[keep], neighbor[keep], together[keep]
+
+        if metric == "cosine":
+            score = together / np.sqrt(readers[source] * readers[neighbor])
+        else:
+            score = together / (readers[source] + readers[neighbor] - together)
+
+        # Sort by source then descending score and keep the first k per source
+        order = np.lexsort((neighbor, -score, source))
+        source, neighbor, score = source[order], neighbor[order], score[order]
+        starts = np.flatnonzero(np.r_[True, source[1:] != source[:-1]])
+        rank = np.arange(len(source)) - np.repeat(
+            starts, np.diff(np.r_[starts, len(source)])
+        )
+        top = rank < k
+        yield source[top], rank[top] + 1, neighbor[top], score[top]
+
+
+def _write(db: Session, book_ids: np.ndarray, blocks) -> int:
+    """Insert neighbour rows, translating column indexes back to bookids"""
+    written = 0
+    for source, rank, neighbor, score in blocks:
+        rows = [
+            {"bookid": int(b), "rank": int(r), "neighborid": int(n), "score": float(s)}
+            for b, r, n, s in zip(book_ids[source], rank, book_ids[neighbor], score)
+        ]
+        if rows:
+            db.execute(insert(BookAlsoRead), rows)
+            written += len(rows)
+    return written
+
+
+def rebuild(db: Session, k: int = DEFAULT_TOP_K, metric: str = "cosine") -> int:
+    """Recompute every book's neighbours; readers see the old table until commit"""
+    started = db.scalar(select(func.now()))
+    matrix, book_ids = load_matrix(db)
+    db.execute(delete(BookAlsoRead))
+    written = _write(
+        db,
+        book_ids,
+        top_neighbors(matrix, np.arange(len(book_ids)), k=k, metric=metric),
+    )
+    db.execute(delete(BookAlsoReadDirty).where(BookAlsoReadDirty.markedat <= started))
+    db.commit()
+    return written
+
+
+def refresh(
+    db: Session,
+    book_ids: Optional[List[int]] = None,
+    k: int = DEFAULT_TOP_K,
+    metric: str = "cosine",
+) -> int:
+    """
+    Recompute neighbours for the given books, or for the dirty ones.
+
+    Only the refreshed books' own lists change; books that gained them as a
+    neighbour are picked up by the next full rebuild.
+    """
+    started = db.scalar(select(func.now()))
+    if book_ids is None:
+        book_ids = list(db.scalars(select(BookAlsoReadDirty.bookid)))
+    if not book_ids:
+        return 0
+
+    matrix, all_book_ids = load_matrix(db)
+    targets = np.array(sorted(set(book_ids)), dtype=np.int64)
+    columns = np.array([], dtype=np.int64)
+    if len(all_book_ids):
+        positions = np.minimum(
+            np.searchsorted(all_book_ids, targets), len(all_book_ids) - 1
+        )
+        # Books nobody shelves any more simply lose their neighbours
+        columns = positions[all_book_ids[positions] == targets]
+
+    db.execute(delete(BookAlsoRead).where(BookAlsoRead.bookid.in_(targets.tolist())))
+    written = _write(
+        db,
+        all_book_ids,
+        top_neighbors(matrix, columns, k=k, metric=metric),
+    )
+    db.execute(
+        delete(BookAlsoReadDirty).where(
+            BookAlsoReadDirty.bookid.in_(targets.tolist()),
+            BookAlsoReadDirty.markedat <= started,
+        )
+    )
+    db.commit()
+    return written
+
+
+def main():
+    from config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Build the also-read table")
+    parser.add_argument("--full", action="store_true", help="rebuild every book")
+    parser.add_argument("--book", type=int, action="append", help="book id")
+    parser.add_argument("--k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--metric", choices=METRICS, default="cosine")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        if args.full:
+            print("\n🔄 Rebuilding also-read neighbours for every book...")
+            written = rebuild(db, k=args.k, metric=args.metric)
+        else:
+            print("\n🔄 Refreshing also-read neighbours...")
+            written = refresh(db, args.book, k=args.k, metric=args.metric)
+        elapsed = time.perf_counter() - started
+        print(f"✅ Wrote {written} neighbour rows in {elapsed:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
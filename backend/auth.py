@@ -2,6 +2,7 @@
 Authentication module for JWT token handling and password hashing
 """
 
+import logging
 import os
 from datetime import datetime, timedelta
 from typing import Optional
@@ -9,13 +10,16 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
+import bcrypt
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
+import statements
 from config import get_db
 from models import User
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
@@ -24,32 +28,28 @@ SECRET_KEY = os.getenv("JWT_SECRET", "default_secret_key_for_development_only")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRATION_MINUTES", "30"))
 
-# Password hashing configuration
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 password bearer token setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
+def _bcrypt_input(password: str) -> bytes:
+    # Bcrypt has a 72-byte limit for passwords; bcrypt 5 rejects longer ones
+    return password.encode("utf-8")[:72]
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
-    # Bcrypt has a 72-byte limit for passwords
-    truncated_password = (
-        plain_password[:72] if len(plain_password) > 72 else plain_password
-    )
-    return pwd_context.verify(truncated_password, hashed_password)
+    return bcrypt.checkpw(_bcrypt_input(plain_password), hashed_password.encode())
 
 
 def get_password_hash(password: str) -> str:
     """Generate password hash"""
-    # Bcrypt has a 72-byte limit for passwords
-    truncated_password = password[:72] if len(password) > 72 else password
-    return pwd_context.hash(truncated_password)
+    return bcrypt.hashpw(_bcrypt_input(password), bcrypt.gensalt()).decode()
 
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """Authenticate a user by email and password"""
-    user = db.query(User).filter(User.email == email).first()
+    user = statements.user_by_email(db, email)
     if not user:
         return None
 
@@ -63,7 +63,8 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
             if simple_hash != user.passwordhash:
                 return None
     except Exception as e:
-        print(f"Password verification error: {str(e)}")
+        # Expected for SHA-256 hashes, which bcrypt cannot identify
+        logger.debug("bcrypt verification failed: %s", type(e).__name__)
         # If bcrypt failed, check if we used the simple hashing for testing
         import hashlib
 
@@ -104,7 +105,17 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.userid == int(user_id)).first()
+    user = statements.user_by_id(db, int(user_id))
     if user is None:
         raise credentials_exception
     return user
+
+
+def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Get the current user, requiring the ADMIN role"""
+    if current_user.role != "ADMIN":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
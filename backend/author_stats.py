@@ -0,0 +1,66 @@
+"""
+Refresh of the author_stats materialized view behind /authors/{id}/stats.
+
+Statement-level triggers on the catalog tables set the single row in
+author_stats_dirty; the "author_stats_refresh" background job calls refresh()
+every minute, which only runs REFRESH MATERIALIZED VIEW CONCURRENTLY when the
+catalog changed. Concurrent refreshes rebuild the view on the side and apply
+the difference, so readers are never blocked.
+
+    python author_stats.py            # refresh if the catalog changed
+    python author_stats.py --force    # refresh unconditionally
+"""
+
+import argparse
+import time
+
+from sqlalchemy import delete, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models import AuthorStatsDirty
+
+
+def refresh(db: Session, force: bool = False) -> bool:
+    """Refresh the view if the catalog changed (or if forced); True if it ran"""
+    # Clear the flag first, in its own transaction: every write it covered is
+    # committed and so visible to the refresh, while later writes set it
+    # again without waiting for the refresh to finish
+    cleared = db.execute(delete(AuthorStatsDirty)).rowcount
+    db.commit()
+    if not force and not cleared:
+        return False
+
+    try:
+        db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY author_stats"))
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        db.merge(AuthorStatsDirty(id=1))
+        db.commit()
+        raise
+    return True
+
+
+def main():
+    from config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Refresh the author_stats view")
+    parser.add_argument("--force", action="store_true", help="refresh even if clean")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        print("\n🔄 Refreshing author stats...")
+        if refresh(db, force=args.force):
+            elapsed = time.perf_counter() - started
+            print(f"✅ Refreshed author_stats in {elapsed:.1f}s")
+        else:
+            print("✅ Catalog unchanged since the last refresh")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Browse latency of the in-memory catalog (catalog_engine.py).
+
+By default it builds a synthetic catalog the size of the real one (70k
+books, authors and genres linked with skewed popularity) and times the
+filter, count, sort and page step of GET /books/ for common listings,
+along with the build, a merge of changed books, and the memory it takes.
+
+With --postgres it loads book_doc from the configured database instead and
+also times the same listings as SQL, for comparison.
+
+    python bench_catalog_engine.py
+    python bench_catalog_engine.py --books 200000 --repeat 500
+    python bench_catalog_engine.py --postgres
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections import namedtuple
+
+import catalog_engine
+
+Row = namedtuple(
+    "Row",
+    "bookid title averagerating totalratings reviewscount pages author_ids genre_ids",
+)
+COMMON = "the of and a in love night house war girl".split()
+SYLLABLES = "ka ri mo sen ta lo vi na dre gor el um bas pi".split()
+
+
+def synthetic_rows(books: int, seed: int = 412):
+    rng = random.Random(seed)
+    authors = range(1, books // 2)
+    genres = range(1, 1000)
+
+    def skewed(population, k):
+        # Low IDs are much more popular, as with real genres
+        return sorted({int(len(population) * rng.random() ** 3) + 1 for _ in range(k)})
+
+    # A few common words and many rare made-up ones
+    rare = ["".join(rng.choices(SYLLABLES, k=3)) for _ in range(5000)]
+
+    def title():
+        words = [rng.choice(rare) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.5:
+            words.insert(0, rng.choice(COMMON))
+        return " ".join(words)
+
+    return [
+        Row(
+            bookid,
+            title(),
+            round(rng.uniform(2.5, 5.0), 1) if rng.random() > 0.02 else None,
+            rng.randint(0, 100_000),
+            rng.randint(0, 5_000),
+            rng.randint(50, 1200) if rng.random() > 0.05 else None,
+            skewed(authors, rng.randint(1, 3)),
+            skewed(genres, rng.randint(1, 8)),
+        )
+        for bookid in range(1, books + 1)
+    ]
+
+
+def listings(catalog):
+    genres = catalog.genres.keys[:3].tolist()
+    author = int(catalog.authors.keys[0])
+    return {
+        "first page": {},
+        "deep page": {"skip": 6000},
+        "title, common word": {"title": "night"},
+        "title, rare word": {"title": "kariel"},
+        "1 genre": {"genre_ids": genres[:1]},
+        "3 genres, any": {"genre_ids": genres},
+        "3 genres, all": {"genre_ids": genres, "match": "all"},
+        "author": {"author_ids": [author]},
+        "rating >= 4.5": {"min_rating": 4.5},
+        "genre + rating, by rating": {
+            "genre_ids": genres[:1],
+            "min_rating": 4.0,
+            "sort": "rating",
+        },
+        "most ratings": {"sort": "ratings"},
+    }
+
+
+def time_us(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(timings)
+
+
+def time_sql(db, query: dict, repeat: int) -> float:
+    from sqlalchemy import false
+
+    from models import BookDoc
+
+    def run():
+        q = db.query(BookDoc.bookid)
+        if query.get("title"):
+            q = q.filter(BookDoc.title.ilike(f"%{query['title']}%"))
+        for key, column in (
+            ("genre_ids", BookDoc.genre_ids),
+            ("author_ids", BookDoc.author_ids),
+        ):
+            ids = query.get(key)
+            if ids is not None:
+                all_ = query.get("match") == "all"
+                q = q.filter(
+                    column.contains(ids)
+                    if all_
+                    else column.overlap(ids) if ids else false()
+                )
+        if query.get("min_rating") is not None:
+            q = q.filter(BookDoc.averagerating >= query["min_rating"])
+        q.count()
+        column, descending = catalog_engine.SORTS[query.get("sort", "bookid")]
+        if column is not None:
+            column = getattr(BookDoc, column)
+            q = q.order_by((column.desc() if descending else column.asc()).nullslast())
+        q.order_by(BookDoc.bookid).offset(query.get("skip", 0)).limit(12).all()
+
+    return time_us(run, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory catalog")
+    parser.add_argument("--books", type=int, default=70_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--postgres", action="store_true")
+    args = parser.parse_args()
+
+    db = None
+    started = time.perf_counter()
+    if args.postgres:
+        from config import SessionLocal
+
+        db = SessionLocal()
+        rows = catalog_engine._load(db)
+        source = "book_doc"
+    else:
+        rows = synthetic_rows(args.books)
+        source = "synthetic"
+    loaded = time.perf_counter() - started
+
+    started = time.perf_counter()
+    catalog = catalog_engine.Catalog.from_rows(rows)
+    built = time.perf_counter() - started
+    links = len(catalog.authors.tags) + len(catalog.genres.tags)
+    print(f"\n📚 {len(catalog)} {source} books, {links} author/genre links")
+    print(
+        f"   loaded in {loaded:.2f}s, built in {built:.2f}s, "
+        f"{catalog.nbytes / 2**20:.1f} MiB of arrays"
+    )
+
+    changed = random.Random(1).sample(rows, min(100, len(rows)))
+    started = time.perf_counter()
+    catalog.merge(changed, [])
+    print(
+        f"   merging 100 changed books: {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+    print("=" * 60)
+
+    header = f"{'listing':<28}{'matches':>8}{'engine':>12}"
+    print(header + (f"{'postgres':>12}" if db else ""))
+    for name, query in listings(catalog).items():
+        skip = query.pop("skip", 0)
+        _, total = catalog.browse(skip, 12, **query)
+        if "title" in query:
+            # Without the title cache, as for a first search
+            first_us = time_us(
+                lambda: (
+                    catalog._title_hits.clear(),
+                    catalog.browse(skip, 12, **query),
+                ),
+                args.repeat,
+            )
+            print(f"{name + ' (first)':<28}{total:>8}{first_us:>10.0f}µs")
+        engine_us = time_us(lambda: catalog.browse(skip, 12, **query), args.repeat)
+        line = f"{name:<28}{total:>8}{engine_us:>10.0f}µs"
+        if db is not None:
+            sql_us = time_sql(db, {**query, "skip": skip}, max(args.repeat // 20, 3))
+            line += f"{sql_us / 1000:>10.1f}ms"
+        print(line)
+
+    if db is not None:
+        db.close()
+    print("\n✅ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark of multi-genre book filters against the configured database.
+
+For the 2, 3 and 4 most common genres, it times the count plus first page
+that GET /books/ runs for each way of writing the filter:
+
+    join      join bookgenre/genre by name, then DISTINCT (any, the old
+              query) / GROUP BY with HAVING count = n (all)
+    semijoin  names resolved to IDs, EXISTS (any) / grouped HAVING (all)
+    book_doc  names resolved to IDs, array overlap (any) / containment (all)
+
+    python bench_filters.py
+    python bench_filters.py --repeat 20 --genres 5
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import Session
+
+from models import Book, BookDoc, BookGenre, Genre
+
+PAGE_SIZE = 12
+
+
+def join_query(db: Session, names, ids, match):
+    query = db.query(Book).join(Book.genres).filter(Genre.name.in_(names))
+    if match == "all":
+        return query.group_by(Book.bookid).having(func.count(Genre.genreid) == len(ids))
+    return query.distinct()
+
+
+def semijoin_query(db: Session, names, ids, match):
+    if match == "all":
+        tagged = (
+            select(BookGenre.bookid)
+            .where(BookGenre.genreid.in_(ids))
+            .group_by(BookGenre.bookid)
+            .having(func.count() == len(ids))
+        )
+        return db.query(Book).filter(Book.bookid.in_(tagged))
+    return db.query(Book).filter(
+        exists().where(BookGenre.bookid == Book.bookid, BookGenre.genreid.in_(ids))
+    )
+
+
+def book_doc_query(db: Session, names, ids, match):
+    if match == "all":
+        return db.query(BookDoc).filter(BookDoc.genre_ids.contains(ids))
+    return db.query(BookDoc).filter(BookDoc.genre_ids.overlap(ids))
+
+
+STRATEGIES = {
+    "join": join_query,
+    "semijoin": semijoin_query,
+    "book_doc": book_doc_query,
+}
+
+
+def run_listing(db: Session, build, names, ids, match):
+    """What read_books does: total count, then the first page"""
+    query = build(db, names, ids, match)
+    total = query.count()
+    order = BookDoc.bookid if build is book_doc_query else Book.bookid
+    query.order_by(order).limit(PAGE_SIZE).all()
+    return total
+
+
+def time_listing(db: Session, build, names, ids, match, repeat: int):
+    run_listing(db, build, names, ids, match)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        total = run_listing(db, build, names, ids, match)
+        timings.append((time.perf_counter() - started) * 1000)
+        db.expunge_all()
+    return statistics.median(timings), total
+
+
+def main():
+    from config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Benchmark multi-genre filters")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--genres", type=int, default=4, help="largest genre set")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        popular = (
+            db.query(Genre.genreid, Genre.name)
+            .join(BookGenre, BookGenre.genreid == Genre.genreid)
+            .group_by(Genre.genreid, Genre.name)
+            .order_by(func.count().desc())
+            .limit(args.genres)
+            .all()
+        )
+        print("\n🔍 Multi-genre filter benchmark (median ms, count + first page)")
+        print("=" * 60)
+        for size in range(2, len(popular) + 1):
+            ids = [genre_id for genre_id, _ in popular[:size]]
+            names = [name for _, name in popular[:size]]
+            print(f"\n{size} genres: {', '.join(names)}")
+            for match in ("any", "all"):
+                results = {}
+                for strategy, build in STRATEGIES.items():
+                    results[strategy] = time_listing(
+                        db, build, names, ids, match, args.repeat
+                    )
+                totals = {total for _, total in results.values()}
+                check = "✅" if len(totals) == 1 else f"❌ totals differ {totals}"
+                timings = "  ".join(
+                    f"{strategy} {ms:7.1f}" for strategy, (ms, _) in results.items()
+                )
+                print(f"  match={match:<3} {timings}  {check}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Memory footprint and false-positive rate of the ISBN index (isbn_index.py)
+for a synthetic catalog, compared with a sorted array of 64-bit ISBN hashes
+and a plain Python set. Needs no database.
+
+    python bench_isbn_index.py                 # 1M books
+    python bench_isbn_index.py --books 5000000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+import isbn
+import isbn_index
+
+
+def random_isbns(count: int, seed: int) -> list:
+    """Distinct valid 978-prefixed ISBN-13s"""
+    rng = random.Random(seed)
+    bodies = {rng.randrange(10**9) for _ in range(int(count * 1.1))}
+    while len(bodies) < count:
+        bodies.add(rng.randrange(10**9))
+    return [isbn.to_isbn13(f"{body:09d}0") for body in list(bodies)[:count]]
+
+
+def measure_false_positives(probe, isbns: list) -> float:
+    return sum(1 for value in isbns if probe(value)) / len(isbns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ISBN index")
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--probes", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"\n🔍 ISBN index for {args.books:,} books")
+    print("=" * 60)
+    everything = random_isbns(args.books + args.probes, seed=412)
+    stored, new = everything[: args.books], everything[args.books :]
+
+    started = time.perf_counter()
+    keys = [key for value in stored for key in isbn_index.keys_for(value)]
+    bloom = isbn_index.BloomFilter(
+        max(len(keys) * isbn_index.GROWTH_FACTOR, isbn_index.MIN_CAPACITY)
+    )
+    for start in range(0, len(keys), isbn_index.BATCH_SIZE):
+        bloom.add_many(keys[start : start + isbn_index.BATCH_SIZE])
+    index = isbn_index.IsbnIndex(bloom)
+    build_seconds = time.perf_counter() - started
+    print(
+        f"Bloom filter: {len(keys):,} keys, {bloom.nbytes / 2**20:.2f} MiB, "
+        f"{bloom.num_hashes} hashes, built in {build_seconds:.1f}s"
+    )
+
+    missed = sum(1 for value in stored[:10_000] if not index.might_contain(value))
+    assert missed == 0, f"{missed} stored ISBNs reported as new"
+
+    started = time.perf_counter()
+    rate = measure_false_positives(index.might_contain, new)
+    probe_us = (time.perf_counter() - started) / len(new) * 1e6
+    print(
+        f"  false positives now:      {rate:.3%} measured, "
+        f"{bloom.expected_false_positive_rate():.3%} expected "
+        f"({probe_us:.1f}us per probe)"
+    )
+
+    # The filter keeps taking writes until it reaches capacity and is rebuilt
+    filler = [f"filler-{i}" for i in range(bloom.capacity - bloom.count)]
+    for start in range(0, len(filler), isbn_index.BATCH_SIZE):
+        bloom.add_many(filler[start : start + isbn_index.BATCH_SIZE])
+    rate = measure_false_positives(index.might_contain, new)
+    print(
+        f"  false positives when full: {rate:.3%} measured, "
+        f"{bloom.expected_false_positive_rate():.3%} expected"
+    )
+
+    hashes = np.sort(
+        np.array([isbn_index._hash_pair(key)[0] for key in keys], dtype=np.uint64)
+    )
+    print(
+        f"Sorted 64-bit hashes: {hashes.nbytes / 2**20:.2f} MiB "
+        f"(false positives ~{len(keys) / 2**64:.0e})"
+    )
+
+    as_set = set(keys)
+    set_bytes = sys.getsizeof(as_set) + sum(sys.getsizeof(key) for key in as_set)
+    print(f"Python set of ISBN strings: {set_bytes / 2**20:.2f} MiB")
+
+    print(
+        f"\n✅ Ingest of new books skips the duplicate query "
+        f"{1 - bloom.expected_false_positive_rate():.1%} of the time or better"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Login throughput with logging on, by number of threads.
+
+Runs routers/auth.py's login_user against a SQLite copy of the user table
+with SHA-256 password hashes, so the time per login is the request path and
+its logging rather than bcrypt. Every login logs one record, to a file:
+
+  off     logging disabled
+  inline  JSON lines formatted and written on the request thread
+  queue   logging_config: a QueueHandler, written by the listener thread
+  sampled the queue, keeping 1% of login records (LOG_SAMPLE=login=0.01)
+
+A local file is faster than stderr usually is; --sink-ms makes every write
+take that long, like a terminal or a container log pipe that is behind.
+
+    python bench_login.py
+    python bench_login.py --logins 20000 --threads 1 4 16 --sink-ms 0.2
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import logging_config
+from models import User
+from routers.auth import login_user
+
+USERS = 1000
+PASSWORD = "correct horse battery staple"
+
+
+class SlowFile:
+    """A file whose writes block for a while, like a full pipe"""
+
+    def __init__(self, file, delay_ms: float):
+        self.file = file
+        self.delay = delay_ms / 1000
+
+    def write(self, data):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+
+def _seed(path: str, pool_size: int):
+    engine = create_engine(f"sqlite:///{path}", pool_size=pool_size)
+    User.__table__.create(engine)
+    hashed = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User.__table__),
+            [
+                {"userid": i, "email": f"user{i}@example.com", "passwordhash": hashed}
+                for i in range(1, USERS + 1)
+            ],
+        )
+    return sessionmaker(bind=engine)
+
+
+def _configure(mode: str, log_file):
+    logging_config.shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if mode == "off":
+        root.setLevel(logging.CRITICAL)
+    elif mode == "inline":
+        handler = logging.StreamHandler(log_file)
+        handler.setFormatter(logging_config.JsonFormatter())
+        handler.addFilter(logging_config.RequestIdFilter())
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        sample = "login=0.01" if mode == "sampled" else ""
+        logging_config.setup_logging(stream=log_file, format_="json", sample=sample)
+        root.setLevel(logging.INFO)
+
+
+def _login(session_factory, i: int):
+    token = logging_config.request_id.set(f"bench-{i}")
+    db = session_factory()
+    try:
+        form = OAuth2PasswordRequestForm(
+            username=f"user{i % USERS + 1}@example.com", password=PASSWORD
+        )
+        return login_user(form, db)
+    finally:
+        db.close()
+        logging_config.request_id.reset(token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login with logging")
+    parser.add_argument("--logins", type=int, default=5000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--sink-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    session_factory = _seed(os.path.join(workdir, "users.db"), max(args.threads))
+    print(f"\n🔑 {args.logins} logins per run, log file in {workdir}")
+    print("=" * 60)
+
+    for threads in args.threads:
+        for mode in ("off", "inline", "queue", "sampled"):
+            log_path = os.path.join(workdir, f"{mode}-{threads}.log")
+            with open(log_path, "w") as log_file:
+                _configure(mode, SlowFile(log_file, args.sink_ms))
+                started = time.perf_counter()
+                with ThreadPoolExecutor(threads) as pool:
+                    results = list(
+                        pool.map(
+                            lambda i: _login(session_factory, i), range(args.logins)
+                        )
+                    )
+                elapsed = time.perf_counter() - started
+                # Time to drain the queue is not on the request path
+                logging_config.shutdown_logging()
+            assert all(result["access_token"] for result in results)
+            lines = sum(1 for _ in open(log_path))
+            print(
+                f"{threads:>3} threads  {mode:<8} {args.logins / elapsed:8.0f} logins/s"
+                f"  {lines:>6} log lines"
+            )
+        print("-" * 60)
+
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Microbenchmark for the cached lookup statements in statements.py.
+
+By default it runs against an in-memory SQLite copy of the lookup tables, so
+the time per call is almost all Python overhead: the legacy
+db.query(...).filter(...).first() against the lambda statement.
+
+With --postgres it also runs against the configured database, reporting the
+per-call latency and Postgres's own parse/plan time (from EXPLAIN ANALYZE),
+and, when psycopg 3 is installed, the latency with server-side prepared
+statements, which skip that parse/plan time.
+
+    python bench_statements.py
+    python bench_statements.py --postgres --calls 5000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+import statements
+from models import Author, Book, Genre, User
+
+TABLES = [User.__table__, Book.__table__, Author.__table__, Genre.__table__]
+
+
+def _seed_sqlite():
+    engine = create_engine("sqlite://")
+    for table in TABLES:
+        table.create(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User.__table__),
+            [
+                {"userid": i, "email": f"user{i}@example.com", "passwordhash": "x"}
+                for i in range(1, 1001)
+            ],
+        )
+        connection.execute(
+            insert(Book.__table__),
+            [
+                {"bookid": i, "title": f"Book {i}", "isbn": str(i)}
+                for i in range(1, 1001)
+            ],
+        )
+        connection.execute(
+            insert(Author.__table__),
+            [{"authorid": i, "name": f"Author {i}"} for i in range(1, 1001)],
+        )
+        connection.execute(
+            insert(Genre.__table__),
+            [{"genreid": i, "name": f"Genre {i}"} for i in range(1, 1001)],
+        )
+    return engine
+
+
+LEGACY = {
+    "book_by_id": lambda db, i: db.query(Book).filter(Book.bookid == i).first(),
+    "user_by_id": lambda db, i: db.query(User).filter(User.userid == i).first(),
+    "user_by_email": lambda db, i: db.query(User)
+    .filter(User.email == f"user{i}@example.com")
+    .first(),
+    "author_by_name": lambda db, i: db.query(Author)
+    .filter(Author.name == f"Author {i}")
+    .first(),
+}
+
+CACHED = {
+    "book_by_id": lambda db, i: statements.book_by_id(db, i),
+    "user_by_id": lambda db, i: statements.user_by_id(db, i),
+    "user_by_email": lambda db, i: statements.user_by_email(db, f"user{i}@example.com"),
+    "author_by_name": lambda db, i: statements.author_by_name(db, f"Author {i}"),
+}
+
+
+def time_lookups(engine, lookup, calls: int, key_space: int = 1000) -> float:
+    """Microseconds per call, with a fresh session per call as in a request"""
+    for i in range(50):
+        with Session(engine) as db:
+            lookup(db, i % key_space + 1)
+    started = time.perf_counter()
+    for i in range(calls):
+        with Session(engine) as db:
+            lookup(db, i % key_space + 1)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def planning_time(engine) -> float:
+    """Postgres parse + plan milliseconds for a primary-key lookup"""
+    with engine.connect() as connection:
+        plan = connection.execute(
+            text("EXPLAIN (ANALYZE, FORMAT JSON) SELECT * FROM book WHERE bookid = 1")
+        ).scalar()
+    return plan[0]["Planning Time"]
+
+
+def report(title: str, engine, calls: int, key_space: int) -> None:
+    print(f"\n🔍 {title}")
+    print("=" * 60)
+    print(f"{'lookup':<16} {'legacy':>10} {'cached':>10} {'saved':>8}")
+    for name in LEGACY:
+        legacy = time_lookups(engine, LEGACY[name], calls, key_space)
+        cached = time_lookups(engine, CACHED[name], calls, key_space)
+        print(
+            f"{name:<16} {legacy:8.1f}us {cached:8.1f}us "
+            f"{(1 - cached / legacy) * 100:7.0f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot lookup statements")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--postgres", action="store_true")
+    args = parser.parse_args()
+
+    report("SQLite in memory (Python overhead)", _seed_sqlite(), args.calls, 1000)
+
+    if not args.postgres:
+        return
+
+    from config import DB_PREPARE_THRESHOLD, DATABASE_URL, driver_connect_args, engine
+
+    with engine.connect() as connection:
+        key_space = connection.execute(text("SELECT count(*) FROM book")).scalar()
+    report(f"Postgres via {engine.dialect.driver}", engine, args.calls, key_space)
+    print(f"\nServer parse + plan per unprepared lookup: {planning_time(engine):.3f}ms")
+
+    try:
+        import psycopg  # noqa: F401
+    except ImportError:
+        print("\n⚠️  psycopg 3 not installed; skipping prepared statements")
+        return
+    prepared = create_engine(
+        DATABASE_URL.replace(f"+{engine.dialect.driver}", "+psycopg"),
+        connect_args=driver_connect_args("psycopg"),
+    )
+    report(
+        "Postgres via psycopg 3 with prepared statements",
+        prepared,
+        args.calls,
+        key_space,
+    )
+    print(
+        "\n✅ Prepared lookups skip the parse + plan time above after "
+        f"{DB_PREPARE_THRESHOLD} runs per connection"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Password hashing throughput of the bulk user import (user_import.py) by
+number of pool threads. Hashing dominates an import, so this is how its
+time scales with cores. Needs no database.
+
+    python bench_user_import.py                  # 2000 passwords, 1..N workers
+    python bench_user_import.py --passwords 500 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import time
+
+import user_import
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk import hashing")
+    parser.add_argument("--passwords", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    passwords = [f"partner-password-{i}" for i in range(args.passwords)]
+
+    print(f"\n🔐 Hashing {args.passwords} passwords with bcrypt, {cores} cores")
+    print("=" * 60)
+
+    baseline = None
+    for count in workers:
+        started = time.perf_counter()
+        hashes = list(user_import.hash_passwords(passwords, count))
+        elapsed = time.perf_counter() - started
+        assert len(hashes) == len(passwords)
+        rate = len(passwords) / elapsed
+        baseline = baseline or rate
+        print(
+            f"{count:>3} workers: {elapsed:7.2f}s  {rate:9.0f} hashes/s  "
+            f"{rate / baseline:4.1f}x"
+        )
+
+    print(
+        f"\n✅ At the last rate, 100k users take about "
+        f"{100_000 / rate / 60:.1f} minutes of hashing"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Rebuild of the denormalized book_doc table behind the book listings.
+
+Triggers on Book, BookAuthor, BookGenre, Author and Genre keep book_doc
+current through the book_doc_sync() SQL function (sql/DDL/11_create_bookdoc.sql).
+Use this after loading data with the triggers disabled, or to check for
+drift.
+
+    python book_doc.py              # rebuild every book
+    python book_doc.py --check      # only report books whose doc is stale
+"""
+
+import argparse
+import time
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.orm import Session
+
+from models import Book, BookAuthor, BookDoc, BookGenre
+
+BATCH_SIZE = 5000
+
+
+def rebuild(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """Resync every book's doc in batches; returns the number of books"""
+    done = 0
+    last_id = 0
+    while True:
+        book_ids = db.scalars(
+            select(Book.bookid)
+            .where(Book.bookid > last_id)
+            .order_by(Book.bookid)
+            .limit(batch_size)
+        ).all()
+        if not book_ids:
+            break
+        db.execute(text("SELECT book_doc_sync(:book_ids)"), {"book_ids": book_ids})
+        db.commit()
+        done += len(book_ids)
+        last_id = book_ids[-1]
+    # Docs of books deleted while the triggers were disabled
+    db.execute(
+        text("DELETE FROM book_doc WHERE bookid NOT IN (SELECT bookid FROM book)")
+    )
+    db.commit()
+    return done
+
+
+def stale_books(db: Session) -> list:
+    """IDs of books whose doc is missing or differs from Book"""
+    return db.scalars(
+        select(Book.bookid)
+        .outerjoin(BookDoc, BookDoc.bookid == Book.bookid)
+        .where(
+            or_(
+                BookDoc.bookid.is_(None),
+                BookDoc.title != Book.title,
+                func.coalesce(BookDoc.averagerating, -1)
+                != func.coalesce(Book.averagerating, -1),
+                func.cardinality(BookDoc.author_ids)
+                != select(func.count())
+                .where(BookAuthor.bookid == Book.bookid)
+                .scalar_subquery(),
+                func.cardinality(BookDoc.genre_ids)
+                != select(func.count())
+                .where(BookGenre.bookid == Book.bookid)
+                .scalar_subquery(),
+            )
+        )
+        .order_by(Book.bookid)
+    ).all()
+
+
+def main():
+    from config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild the book_doc table")
+    parser.add_argument("--check", action="store_true", help="report stale docs only")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        if args.check:
+            print("\n🔍 Checking book_doc against the catalog...")
+            stale = stale_books(db)
+            if stale:
+                print(f"❌ {len(stale)} stale docs, e.g. books {stale[:10]}")
+            else:
+                print("✅ book_doc is current")
+            return
+
+        print("\n🔄 Rebuilding book_doc...")
+        done = rebuild(db, args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"✅ Rebuilt {done} book docs in {elapsed:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Content-based book vectors for /books/{id}/similar.
+
+The offline build hashes each book's title, description, genres and authors
+into a sparse TF-IDF matrix, reduces it with a truncated SVD to a dense
+float32 matrix with unit-length rows and saves it as .npy files. API workers
+open the matrix with np.load(mmap_mode="r"), so every worker shares the same
+page-cache copy and startup is a single mmap.
+
+    python book_vectors.py              # build with the default settings
+    python book_vectors.py --dim 256    # larger vectors
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import BOOK_VECTORS_DIR
+
+# The manifest names the current pair of .npy files; it is replaced atomically
+# after a build so workers never pair vectors with ids from another build
+MANIFEST_FILE = "book_vectors.json"
+
+DEFAULT_DIM = 128
+# Size of the hashed feature space before the SVD
+DEFAULT_FEATURES = 2**18
+# Rows scored per matrix-vector product when searching
+SEARCH_BLOCK_ROWS = 16384
+
+TITLE_WEIGHT = 2
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+_BOOK_TEXT_SQL = """
+SELECT
+    b.bookid,
+    b.title,
+    COALESCE(b.description, ''),
+    COALESCE((SELECT string_agg(g.name, '|') FROM bookgenre bg
+              JOIN genre g ON g.genreid = bg.genreid
+              WHERE bg.bookid = b.bookid), ''),
+    COALESCE((SELECT string_agg(a.name, '|') FROM bookauthor ba
+              JOIN author a ON a.authorid = ba.authorid
+              WHERE ba.bookid = b.bookid), '')
+FROM book b
+ORDER BY b.bookid
+"""
+
+
+def _tokens(title: str, description: str, genres: str, authors: str) -> List[str]:
+    """Terms for one book; genres and authors are kept as whole-name terms"""
+    words = _TOKEN_RE.findall(title.lower()) * TITLE_WEIGHT
+    words += _TOKEN_RE.findall(description.lower())
+    words += ["g:" + name.lower() for name in genres.split("|") if name]
+    words += ["a:" + name.lower() for name in authors.split("|") if name]
+    return words
+
+
+def _hash(term: str, features: int) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(term.encode()) % features
+
+
+def build(
+    db: Session, dim: int = DEFAULT_DIM, features: int = DEFAULT_FEATURES
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute unit-length float32 vectors for every book"""
+    # Only the offline build needs SciPy
+    from scipy import sparse
+    from scipy.sparse.linalg import svds
+
+    book_ids, indptr, indices, counts = [], [0], [], []
+    for book_id, *fields in db.execute(text(_BOOK_TEXT_SQL)):
+        columns, term_counts = np.unique(
+            [_hash(term, features) for term in _tokens(*fields)], return_counts=True
+        )
+        book_ids.append(book_id)
+        indices.append(columns)
+        counts.append(term_counts)
+        indptr.append(indptr[-1] + len(columns))
+
+    tf = sparse.csr_matrix(
+        (
+            np.concatenate(counts).astype(np.float32),
+            np.concatenate(indices),
+            np.array(indptr),
+        ),
+        shape=(len(book_ids), features),
+    )
+    # Sublinear term frequency and smoothed inverse document frequency
+    tf.data = 1.0 + np.log(tf.data)
+    df = np.bincount(tf.indices, minlength=features)
+    idf = np.log((1.0 + tf.shape[0]) / (1.0 + df)) + 1.0
+    tfidf = tf @ sparse.diags(idf.astype(np.float32))
+
+    k = min(dim, min(tfidf.shape) - 1)
+    u, s, _ = svds(tfidf, k=k)
+    vectors = (u * s).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+    return np.array(book_ids, dtype=np.int64), vectors
+
+
+def save(book_ids: np.ndarray, vectors: np.ndarray, directory: str) -> None:
+    """Write a new build and point the manifest at it"""
+    os.makedirs(directory, exist_ok=True)
+    version = time.strftime("%Y%m%d%H%M%S")
+    manifest = {
+        "vectors": f"book_vectors-{version}.npy",
+        "ids": f"book_vector_ids-{version}.npy",
+        "count": int(len(book_ids)),
+        "dim": int(vectors.shape[1]),
+    }
+    np.save(os.path.join(directory, manifest["vectors"]), vectors)
+    np.save(os.path.join(directory, manifest["ids"]), book_ids)
+
+    tmp_path = os.path.join(directory, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+    # Drop builds older than the previous one; workers reopen on their next
+    # request, and an open mapping stays valid after unlink on POSIX
+    current = {manifest["vectors"], manifest["ids"]}
+    for pattern in ("book_vectors-*.npy", "book_vector_ids-*.npy"):
+        for path in sorted(glob.glob(os.path.join(directory, pattern)))[:-2]:
+            if os.path.basename(path) not in current:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class VectorIndex:
+    """Memory-mapped book vectors with blocked cosine top-K search"""
+
+    def __init__(self, directory: str, mtime: float):
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        self.vectors = np.load(
+            os.path.join(directory, manifest["vectors"]), mmap_mode="r"
+        )
+        self.book_ids = np.load(os.path.join(directory, manifest["ids"]))
+        self.mtime = mtime
+
+    def position(self, book_id: int) -> Optional[int]:
+        pos = int(np.searchsorted(self.book_ids, book_id))
+        if pos < len(self.book_ids) and self.book_ids[pos] == book_id:
+            return pos
+        return None
+
+    def similar(self, book_id: int, k: int = 10) -> List[Tuple[int, float]]:
+        """Return the k nearest books as (bookid, cosine similarity)"""
+        pos = self.position(book_id)
+        if pos is None:
+            return []
+        query = np.asarray(self.vectors[pos])
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self.book_ids), SEARCH_BLOCK_ROWS):
+            scores = self.vectors[start : start + SEARCH_BLOCK_ROWS] @ query
+            if start <= pos < start + len(scores):
+                scores[pos - start] = -np.inf
+            take = min(k, len(scores))
+            top = np.argpartition(-scores, take - 1)[:take]
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+
+        order = np.argsort(-best_scores, kind="stable")[:k]
+        return [
+            (int(self.book_ids[row]), float(score))
+            for row, score in zip(best_rows[order], best_scores[order])
+            if np.isfinite(score)
+        ]
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[VectorIndex]:
+    """Return the shared index, reopening it after a rebuild; None if unbuilt"""
+    global _index
+    try:
+        mtime = os.path.getmtime(os.path.join(BOOK_VECTORS_DIR, MANIFEST_FILE))
+    except OSError:
+        return None
+
+    with _index_lock:
+        if _index is None or _index.mtime != mtime:
+            _index = VectorIndex(BOOK_VECTORS_DIR, mtime)
+        return _index
+
+
+def main():
+    from config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Build the book vector index")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--features", type=int, default=DEFAULT_FEATURES)
+    parser.add_argument("--out", default=BOOK_VECTORS_DIR)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        print("\n🔄 Building book vectors...")
+        book_ids, vectors = build(db, dim=args.dim, features=args.features)
+        save(book_ids, vectors, args.out)
+        elapsed = time.perf_counter() - started
+        size_mb = vectors.nbytes / 1024 / 1024
+        print(
+            f"✅ {len(book_ids)} vectors x {vectors.shape[1]} dims ({size_mb:.1f} MB)"
+        )
+        print(f"   written to {args.out} in {elapsed:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
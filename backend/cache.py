@@ -0,0 +1,322 @@
+"""
+Caching helpers for derived, per-user data, with pluggable storage.
+
+CACHE_URL selects the backend that every Cache in the process stores into:
+
+    local                              per-process LRU (default)
+    redis://[:password@]host:6379/0    a Redis server
+    unix:///tmp/bookshelf-cache.sock   cache_server.py (or Redis) on a socket
+
+A shared backend holds one copy of each entry for all uvicorn workers, and an
+invalidation by any worker is seen by all of them. With the local backend
+each worker has its own copy, so invalidations are broadcast to the other
+processes with Postgres NOTIFY (see notify.py) when CACHE_BROADCAST is on.
+Writes send that NOTIFY within their own transaction (Cache.announce), so
+other workers drop their copies exactly when the write commits.
+
+Values must be JSON-serialisable, since shared backends store them as JSON.
+A failing cache backend is logged and treated as a miss, never as an error.
+"""
+
+import json
+import logging
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import notify
+from config import CACHE_BROADCAST, CACHE_MAX_ENTRIES, CACHE_URL
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "bookshelf"
+INVALIDATE_CHANNEL = "bookshelf_cache_invalidate"
+SOCKET_TIMEOUT = 0.5
+# Key suffix of the time an entry (or, after the prefix, a namespace) was
+# last invalidated
+DROPPED_SUFFIX = "#dropped"
+# Identifies this process's own broadcasts, which it has already applied
+_ORIGIN = uuid.uuid4().hex
+
+
+class CacheError(Exception):
+    """The cache backend could not be reached or rejected a command"""
+
+
+class LocalBackend:
+    """A thread-safe in-process LRU whose entries expire after their TTL"""
+
+    shared = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+
+class RespBackend:
+    """
+    A minimal client for the Redis protocol (RESP2), over TCP or a Unix socket.
+
+    Each thread keeps its own connection, so requests never share a socket.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, timeout: float = SOCKET_TIMEOUT):
+        parsed = urlparse(url)
+        self.timeout = timeout
+        self.password = unquote(parsed.password) if parsed.password else None
+        if parsed.scheme == "unix":
+            self.address = parsed.path
+            self.family = socket.AF_UNIX
+            self.db = 0
+        else:
+            self.address = (parsed.hostname or "localhost", parsed.port or 6379)
+            self.family = socket.AF_INET
+            self.db = int(parsed.path.strip("/") or 0)
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.address)
+        if self.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        self._local.connection = connection
+        if self.password:
+            self._command("AUTH", self.password)
+        if self.db:
+            self._command("SELECT", self.db)
+        return connection
+
+    def _disconnect(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection:
+            connection[1].close()
+            connection[0].close()
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise CacheError("Connection closed by cache server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise CacheError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise CacheError("Connection closed by cache server")
+            return data[:-2]
+        if kind == b"*":
+            length = int(body)
+            if length < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(length)]
+        raise CacheError(f"Unexpected reply from cache server: {line!r}")
+
+    def _command(self, *args):
+        connection = getattr(self._local, "connection", None)
+        try:
+            if connection is None:
+                connection = self._connect()
+            connection[0].sendall(self._encode(args))
+            return self._read_reply(connection[1])
+        except (OSError, CacheError) as e:
+            # The connection may be mid-reply; never reuse it
+            self._disconnect()
+            if isinstance(e, CacheError):
+                raise
+            raise CacheError(str(e)) from e
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self._command("GET", key)
+        return None if data is None else json.loads(data)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._command(
+            "SET", key, json.dumps(value, default=str), "PX", max(1, int(ttl * 1000))
+        )
+
+    def delete(self, key: str) -> None:
+        self._command("DEL", key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        cursor = "0"
+        while True:
+            cursor, keys = self._command(
+                "SCAN", cursor, "MATCH", prefix + "*", "COUNT", 1000
+            )
+            cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == "0":
+                return
+
+
+def create_backend(url: str = CACHE_URL):
+    if url in ("", "local"):
+        return LocalBackend()
+    if url.startswith(("redis://", "unix://")):
+        return RespBackend(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url!r}")
+
+
+default_backend = create_backend()
+_caches: Dict[str, "Cache"] = {}
+
+
+class Cache:
+    """A namespace of entries that expire `ttl` seconds after being set"""
+
+    def __init__(self, namespace: str, ttl: float, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = backend or default_backend
+        self.prefix = f"{KEY_PREFIX}:{namespace}:"
+        _caches[namespace] = self
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        try:
+            return self.backend.get(self._key(key))
+        except CacheError as e:
+            logger.warning("Cache get failed for %s: %s", self._key(key), e)
+            return None
+
+    def set(self, key: Hashable, value: Any, unless_dropped_within: float = 0) -> None:
+        """
+        Store a value; with `unless_dropped_within`, only if the entry was not
+        invalidated in that many seconds (the value may predate the change)
+        """
+        try:
+            if unless_dropped_within and self._dropped_within(
+                key, unless_dropped_within
+            ):
+                return
+            self.backend.set(self._key(key), value, self.ttl)
+        except CacheError as e:
+            logger.warning("Cache set failed for %s: %s", self._key(key), e)
+
+    def _dropped_within(self, key: Hashable, seconds: float) -> bool:
+        cutoff = time.time() - seconds
+        for marker in (self._key(key) + DROPPED_SUFFIX, self.prefix + DROPPED_SUFFIX):
+            dropped_at = self.backend.get(marker)
+            if dropped_at is not None and dropped_at > cutoff:
+                return True
+        return False
+
+    def invalidate(self, key: Hashable, broadcast: bool = True) -> None:
+        """
+        Drop an entry, after the write that changed it has committed; pass
+        broadcast=False if announce() already told the other processes
+        """
+        self._drop(key)
+        if broadcast:
+            self._broadcast(key)
+
+    def announce(self, key: Hashable, connection) -> None:
+        """
+        Within a write's transaction (a session or connection): have the
+        other processes drop their copy when, and only if, it commits
+        """
+        self._broadcast(key, connection)
+
+    def clear(self) -> None:
+        self._drop(None)
+        self._broadcast(None)
+
+    def _drop(self, key: Optional[Hashable]) -> None:
+        try:
+            if key is None:
+                self.backend.delete_prefix(self.prefix)
+                marker = self.prefix + DROPPED_SUFFIX
+            else:
+                self.backend.delete(self._key(key))
+                marker = self._key(key) + DROPPED_SUFFIX
+            # When it was dropped, for set(..., unless_dropped_within=...)
+            self.backend.set(marker, time.time(), self.ttl)
+        except CacheError as e:
+            logger.warning("Cache invalidation failed for %s: %s", self.prefix, e)
+
+    def _broadcast(self, key: Optional[Hashable], connection=None) -> None:
+        """Tell the other processes to drop their local copy"""
+        if self.backend.shared or not CACHE_BROADCAST:
+            return
+        payload = json.dumps({"origin": _ORIGIN, "ns": self.namespace, "key": key})
+        if connection is not None:
+            # Part of the write: its failure fails the write
+            notify.publish(INVALIDATE_CHANNEL, payload, connection)
+            return
+        try:
+            notify.publish(INVALIDATE_CHANNEL, payload)
+        except Exception as e:
+            logger.warning("Cache invalidation broadcast failed: %s", e)
+
+
+def _on_invalidate(payload: str) -> None:
+    message = json.loads(payload)
+    cache = _caches.get(message["ns"])
+    if cache is not None and message["origin"] != _ORIGIN:
+        cache._drop(message["key"])
+
+
+def _on_reconnect() -> None:
+    # Invalidations sent while the listener was down were lost
+    for cache in _caches.values():
+        cache._drop(None)
+
+
+if not default_backend.shared and CACHE_BROADCAST:
+    notify.listener.subscribe(INVALIDATE_CHANNEL, _on_invalidate, _on_reconnect)
@@ -0,0 +1,177 @@
+"""
+A small shared cache server speaking the Redis protocol.
+
+Run one per host and point every API worker at it with
+CACHE_URL=unix:///tmp/bookshelf-cache.sock, so all workers share one copy of
+each cached entry. It implements only what cache.py uses (GET, SET with
+EX/PX, DEL, SCAN, PING, FLUSHDB, AUTH and SELECT), keeps entries in an LRU
+bounded by --max-entries, and can be replaced by a real Redis at any time.
+
+    python cache_server.py                          # default Unix socket
+    python cache_server.py --port 6380              # TCP on localhost
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+DEFAULT_SOCKET = "/tmp/bookshelf-cache.sock"
+DEFAULT_MAX_ENTRIES = 100000
+
+
+class Store:
+    """LRU of bytes values with optional expiry"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[bytes, Tuple[Optional[float], bytes]]" = (
+            OrderedDict()
+        )
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: bytes, value: bytes, ttl: Optional[float]) -> None:
+        expires = time.monotonic() + ttl if ttl is not None else None
+        self.entries[key] = (expires, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def delete(self, keys) -> int:
+        return sum(self.entries.pop(key, None) is not None for key in keys)
+
+    def scan(self, pattern: bytes):
+        now = time.monotonic()
+        return [
+            key
+            for key, (expires, _) in self.entries.items()
+            if (expires is None or expires >= now)
+            and fnmatch.fnmatchcase(key.decode(), pattern.decode())
+        ]
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(values) -> bytes:
+    return b"*%d\r\n" % len(values) + b"".join(values)
+
+
+class CacheServer:
+    def __init__(self, store: Store):
+        self.store = store
+
+    async def _read_command(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, e.g. "PING" typed into a terminal
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def execute(self, args) -> bytes:
+        command = args[0].upper()
+        if command == b"GET" and len(args) == 2:
+            return _bulk(self.store.get(args[1]))
+        if command == b"SET" and len(args) >= 3:
+            ttl = None
+            options = [arg.upper() for arg in args[3:]]
+            if b"EX" in options:
+                ttl = float(args[3 + options.index(b"EX") + 1])
+            elif b"PX" in options:
+                ttl = float(args[3 + options.index(b"PX") + 1]) / 1000
+            self.store.set(args[1], args[2], ttl)
+            return b"+OK\r\n"
+        if command == b"DEL" and len(args) >= 2:
+            return b":%d\r\n" % self.store.delete(args[1:])
+        if command == b"SCAN" and len(args) >= 2:
+            options = [arg.upper() for arg in args[2:]]
+            pattern = b"*"
+            if b"MATCH" in options:
+                pattern = args[2 + options.index(b"MATCH") + 1]
+            # Everything fits in one page, so the cursor is always 0
+            keys = [_bulk(key) for key in self.store.scan(pattern)]
+            return _array([_bulk(b"0"), _array(keys)])
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command == b"FLUSHDB":
+            self.store.entries.clear()
+            return b"+OK\r\n"
+        if command in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if not args:
+                    break
+                try:
+                    reply = self.execute(args)
+                except (ValueError, IndexError):
+                    reply = b"-ERR syntax error\r\n"
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(
+    socket_path: Optional[str] = DEFAULT_SOCKET,
+    port: Optional[int] = None,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> asyncio.AbstractServer:
+    """Start listening on a Unix socket, or on localhost:port if given"""
+    server = CacheServer(Store(max_entries))
+    if port is not None:
+        return await asyncio.start_server(server.handle, "127.0.0.1", port)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    return await asyncio.start_unix_server(server.handle, socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the shared cache server")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES)
+    args = parser.parse_args()
+
+    async def run():
+        server = await serve(args.socket, args.port, args.max_entries)
+        where = f"127.0.0.1:{args.port}" if args.port else args.socket
+        print(f"\n✅ Cache server listening on {where}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n🛑 Cache server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+"""
+In-memory columnar catalog for GET /books/ (enabled with CATALOG_ENGINE=1).
+
+The whole catalog is a few MB as NumPy arrays, so each worker keeps a copy
+and answers book listings without asking Postgres to filter, count and sort
+book_doc on every browse. Each Catalog holds, one row per book in bookid
+order:
+
+- ratings, rating counts, review counts and pages as flat arrays (NULL is
+  NaN or -1);
+- book→author and book→genre links in CSR form (`indptr` offsets into a flat
+  array of IDs), plus the inverse author→books and genre→books postings;
+- the lowercased titles, joined into one string for substring search.
+
+Author and genre names resolve to IDs through interned name dictionaries of
+the full author and genre tables. A listing is then a few vectorized masks
+over the rows; only the page's books, at most `limit` rows by primary key,
+are read from book_doc. Filters the engine cannot answer exactly (titles
+with LIKE wildcards) and workers that have not loaded yet return None, and
+the route queries Postgres as before.
+
+Changes arrive through NOTIFY: triggers on book_doc
+(sql/DDL/13_create_bookdocnotify.sql) send the IDs of the changed books on
+commit, whatever wrote them. The catalog_engine_sync job reads just those
+books, every CATALOG_ENGINE_SYNC_SECONDS, and swaps in a new Catalog built
+from the old arrays and the changed rows. A Catalog is never modified once
+built, so readers need no lock. If the LISTEN connection drops, the next
+sync reloads everything, since notifications were lost meanwhile; so does
+the nightly catalog_engine_reload job. A sync with changes pending also
+reloads the author and genre names, so new and renamed ones (whose books
+book_doc's triggers rewrite, and so notify) resolve as they do in SQL. With
+nothing pending a sync sends no query.
+
+    python bench_catalog_engine.py     # browse latency over 70k books
+"""
+
+import itertools
+import re
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import notify
+from config import CATALOG_ENGINE
+from models import Author, BookDoc, Genre
+
+CHANNEL = "book_doc_changes"
+# Books read per query when loading or applying changes
+LOAD_BATCH = 5000
+# ORDER BY for each `sort` of GET /books/: (book_doc column, descending),
+# with NULLs last and ties broken by bookid
+SORTS = {
+    "bookid": (None, False),
+    "rating": ("averagerating", True),
+    "ratings": ("totalratings", True),
+    "reviews": ("reviewscount", True),
+    "pages": ("pages", False),
+}
+# Title searches whose matches each Catalog remembers, as bitmaps
+TITLE_CACHE_SIZE = 256
+# ILIKE wildcards and escapes, which only Postgres matches exactly
+_LIKE_SPECIAL = re.compile(r"[%_\\]")
+
+_COLUMNS = (
+    BookDoc.bookid,
+    BookDoc.title,
+    BookDoc.averagerating,
+    BookDoc.totalratings,
+    BookDoc.reviewscount,
+    BookDoc.pages,
+    BookDoc.author_ids,
+    BookDoc.genre_ids,
+)
+
+
+def _csr(lists: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    counts = np.fromiter((len(ids) for ids in lists), dtype=np.int64, count=len(lists))
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    tags = np.fromiter(
+        itertools.chain.from_iterable(lists), dtype=np.int32, count=int(indptr[-1])
+    )
+    return indptr, tags
+
+
+def _csr_take(
+    indptr: np.ndarray, tags: np.ndarray, rows: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """The CSR rows `rows`, in that order"""
+    counts = np.diff(indptr)[rows]
+    new_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(counts, out=new_indptr[1:])
+    index = np.repeat(indptr[:-1][rows] - new_indptr[:-1], counts) + np.arange(
+        new_indptr[-1]
+    )
+    return new_indptr, tags[index]
+
+
+def _nullable(values: Iterable, dtype, null) -> np.ndarray:
+    return np.array([null if value is None else value for value in values], dtype=dtype)
+
+
+class TagIndex:
+    """Links of each book to authors or genres, both ways"""
+
+    def __init__(self, indptr: np.ndarray, tags: np.ndarray):
+        self.indptr = indptr
+        self.tags = tags
+        # Book row of every link, then the links grouped by tag ID
+        self.owner = np.repeat(
+            np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr)
+        )
+        order = np.argsort(tags, kind="stable")
+        self.keys, starts = np.unique(tags[order], return_index=True)
+        self.starts = np.append(starts, len(tags)).astype(np.int64)
+        self.rows = self.owner[order]
+
+    def postings(self, tag_id: int) -> np.ndarray:
+        """Rows of the books with this tag"""
+        i = np.searchsorted(self.keys, tag_id)
+        if i == len(self.keys) or self.keys[i] != tag_id:
+            return self.rows[:0]
+        return self.rows[self.starts[i] : self.starts[i + 1]]
+
+    def mask(self, tag_ids: Sequence[int], match: str, size: int) -> np.ndarray:
+        """Rows tagged with any, or all, of the IDs"""
+        mask = np.zeros(size, dtype=bool)
+        if match == "all":
+            counts = np.zeros(size, dtype=np.int32)
+            for tag_id in tag_ids:
+                counts[self.postings(tag_id)] += 1
+            return counts == len(tag_ids)
+        for tag_id in tag_ids:
+            mask[self.postings(tag_id)] = True
+        return mask
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            sum(
+                a.nbytes
+                for a in (self.indptr, self.tags, self.owner, self.keys, self.starts)
+            )
+            + self.rows.nbytes
+        )
+
+
+class Catalog:
+    """Immutable columnar copy of book_doc's filter and sort columns"""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        titles: List[str],
+        averagerating: np.ndarray,
+        totalratings: np.ndarray,
+        reviewscount: np.ndarray,
+        pages: np.ndarray,
+        authors: Tuple[np.ndarray, np.ndarray],
+        genres: Tuple[np.ndarray, np.ndarray],
+    ):
+        self.ids = ids
+        self.titles = titles
+        self.averagerating = averagerating
+        self.totalratings = totalratings
+        self.reviewscount = reviewscount
+        self.pages = pages
+        self.authors = TagIndex(*authors)
+        self.genres = TagIndex(*genres)
+
+        # Titles separated by a character no search contains, and where in
+        # that string each row's title starts
+        self._blob = "\n".join(titles)
+        lengths = np.fromiter((len(t) + 1 for t in titles), np.int64, len(titles))
+        self._title_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self._orders: Dict[str, np.ndarray] = {}
+        self._title_hits: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Sequence) -> "Catalog":
+        """From (bookid, title, averagerating, ...) rows in bookid order"""
+        return cls(
+            np.fromiter((r.bookid for r in rows), dtype=np.int32, count=len(rows)),
+            [r.title.lower() for r in rows],
+            _nullable((r.averagerating for r in rows), np.float64, np.nan),
+            _nullable((r.totalratings for r in rows), np.int32, -1),
+            _nullable((r.reviewscount for r in rows), np.int32, -1),
+            _nullable((r.pages for r in rows), np.int32, -1),
+            _csr([r.author_ids or () for r in rows]),
+            _csr([r.genre_ids or () for r in rows]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def merge(self, rows: Sequence, removed: Iterable[int]) -> "Catalog":
+        """A new Catalog with `rows` added or replaced and `removed` dropped"""
+        changed = np.array(
+            sorted({r.bookid for r in rows} | set(removed)), dtype=np.int32
+        )
+        keep = np.flatnonzero(~np.isin(self.ids, changed))
+        added = Catalog.from_rows(sorted(rows, key=lambda r: r.bookid))
+
+        ids = np.concatenate((self.ids[keep], added.ids))
+        order = np.argsort(ids, kind="stable")
+        combined = np.concatenate((keep, len(self) + np.arange(len(added))))[order]
+
+        def column(name):
+            return np.concatenate((getattr(self, name), getattr(added, name)))[combined]
+
+        def links(name):
+            old, new = getattr(self, name), getattr(added, name)
+            indptr = np.concatenate((old.indptr[:-1], old.indptr[-1] + new.indptr))
+            return _csr_take(indptr, np.concatenate((old.tags, new.tags)), combined)
+
+        titles = self.titles + added.titles
+        return Catalog(
+            ids[order],
+            [titles[i] for i in combined],
+            column("averagerating"),
+            column("totalratings"),
+            column("reviewscount"),
+            column("pages"),
+            links("authors"),
+            links("genres"),
+        )
+
+    def _title_mask(self, title: str) -> np.ndarray:
+        needle = title.lower()
+        bits = self._title_hits.get(needle)
+        if bits is not None:
+            return np.unpackbits(bits, count=len(self)).astype(bool)
+        mask = np.zeros(len(self), dtype=bool)
+        if "\n" not in needle:
+            # Costs about a microsecond per match, so common words are slow
+            # and are the ones worth remembering
+            positions = [m.start() for m in re.finditer(re.escape(needle), self._blob)]
+            if positions:
+                rows = np.searchsorted(self._title_starts, positions, side="right")
+                mask[rows - 1] = True
+        if len(self._title_hits) >= TITLE_CACHE_SIZE:
+            self._title_hits.pop(next(iter(self._title_hits)), None)
+        self._title_hits[needle] = np.packbits(mask)
+        return mask
+
+    def order(self, sort: str) -> np.ndarray:
+        """Rows in the order of a `sort`; computed once per Catalog"""
+        order = self._orders.get(sort)
+        if order is None:
+            name, descending = SORTS[sort]
+            values = getattr(self, name).astype(np.float64)
+            values[(values < 0) | np.isnan(values)] = np.inf
+            if descending:
+                values = np.where(np.isinf(values), np.inf, -values)
+            order = np.lexsort((self.ids, values))
+            self._orders[sort] = order
+        return order
+
+    def browse(
+        self,
+        skip: int,
+        limit: int,
+        title: Optional[str] = None,
+        author_ids: Optional[Sequence[int]] = None,
+        genre_ids: Optional[Sequence[int]] = None,
+        match: str = "any",
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        sort: str = "bookid",
+    ) -> Tuple[List[int], int]:
+        """Book IDs of one page of the matching books, and how many match"""
+        mask = np.ones(len(self), dtype=bool)
+        if title:
+            mask &= self._title_mask(title)
+        if author_ids is not None:
+            mask &= self.authors.mask(author_ids, match, len(self))
+        if genre_ids is not None:
+            mask &= self.genres.mask(genre_ids, match, len(self))
+        # NaN compares false, like NULL
+        if min_rating is not None:
+            mask &= self.averagerating >= min_rating
+        if max_rating is not None:
+            mask &= self.averagerating <= max_rating
+
+        if sort == "bookid":
+            rows = np.flatnonzero(mask)
+        else:
+            order = self.order(sort)
+            rows = order[mask[order]]
+        page = rows[skip : skip + limit]
+        return self.ids[page].tolist(), len(rows)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.ids, self.averagerating, self.totalratings, self.reviewscount)
+        return (
+            sum(a.nbytes for a in arrays)
+            + self.pages.nbytes
+            + self.authors.nbytes
+            + self.genres.nbytes
+            + self._title_starts.nbytes
+            + len(self._blob)
+        )
+
+
+class Names:
+    """Interned author and genre names mapped to their IDs"""
+
+    def __init__(self):
+        self.authors: Dict[str, List[int]] = {}
+        self.genres: Dict[str, List[int]] = {}
+
+    @classmethod
+    def load(cls, db: Session) -> "Names":
+        """Read every author and genre"""
+        names = cls()
+        for mapping, id_column, name_column in (
+            (names.authors, Author.authorid, Author.name),
+            (names.genres, Genre.genreid, Genre.name),
+        ):
+            for tag_id, name in db.execute(
+                select(id_column, name_column).order_by(id_column)
+            ):
+                mapping.setdefault(sys.intern(name), []).append(tag_id)
+        return names
+
+    def resolve(
+        self, mapping: Dict[str, List[int]], names: Sequence[str], match: str
+    ) -> List[int]:
+        """IDs of the named authors or genres, as _ids_by_name in the router"""
+        ids = [tag_id for name in set(names) for tag_id in mapping.get(name, ())]
+        # The same test as _tag_filter; -1 is no one's ID
+        if match == "all" and len(ids) < len(set(names)):
+            return [-1]
+        return ids
+
+
+class Engine:
+    """This worker's current Catalog and the changes waiting for it"""
+
+    def __init__(self):
+        self.catalog: Optional[Catalog] = None
+        self.names = Names()
+        self._pending: Set[int] = set()
+        self._reload = True
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+        self.synced_at: Optional[float] = None
+        self.counters = {"served": 0, "fallback": 0, "reloads": 0, "changes": 0}
+
+    def changed(self, book_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._pending.update(book_ids)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._reload = True
+
+    def sync(self, db: Session) -> int:
+        """Load, or apply the pending changes; returns the books read"""
+        with self._sync_lock:
+            with self._lock:
+                reload, self._reload = self._reload, False
+                pending, self._pending = self._pending, set()
+            try:
+                if reload or self.catalog is None:
+                    rows = _load(db)
+                    self.names = Names.load(db)
+                    self.catalog = Catalog.from_rows(rows)
+                    self.loaded_at = time.time()
+                    self.counters["reloads"] += 1
+                    read = len(rows)
+                else:
+                    read = 0
+                    if pending:
+                        # New authors and genres matter once a book has them,
+                        # and renaming one changes the book_doc rows of its
+                        # books; the names are small enough to reload whole
+                        self.names = Names.load(db)
+                        rows = _load(db, sorted(pending))
+                        found = {row.bookid for row in rows}
+                        self.catalog = self.catalog.merge(rows, pending - found)
+                        self.counters["changes"] += len(pending)
+                        read = len(rows)
+            except Exception:
+                with self._lock:
+                    self._reload |= reload
+                    self._pending |= pending
+                raise
+            self.synced_at = time.time()
+            return read
+
+    def browse(
+        self,
+        skip: int,
+        limit: int,
+        title: Optional[str],
+        authors: Optional[Sequence[str]],
+        genres: Optional[Sequence[str]],
+        match: str,
+        min_rating: Optional[float],
+        max_rating: Optional[float],
+        sort: str,
+    ) -> Optional[Tuple[List[int], int]]:
+        """A page of book IDs and the total, or None to ask Postgres"""
+        catalog, names = self.catalog, self.names
+        if catalog is None or (title and _LIKE_SPECIAL.search(title)):
+            self.counters["fallback"] += 1
+            return None
+        self.counters["served"] += 1
+        return catalog.browse(
+            skip,
+            limit,
+            title=title,
+            author_ids=(
+                names.resolve(names.authors, authors, match) if authors else None
+            ),
+            genre_ids=names.resolve(names.genres, genres, match) if genres else None,
+            match=match,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            sort=sort,
+        )
+
+    def status(self) -> dict:
+        catalog = self.catalog
+        return {
+            "enabled": CATALOG_ENGINE,
+            "loaded": catalog is not None,
+            "books": len(catalog) if catalog is not None else 0,
+            "links": (
+                len(catalog.authors.tags) + len(catalog.genres.tags)
+                if catalog is not None
+                else 0
+            ),
+            "bytes": catalog.nbytes if catalog is not None else 0,
+            "pending": len(self._pending),
+            "loaded_at": self.loaded_at,
+            "synced_at": self.synced_at,
+            **self.counters,
+        }
+
+
+def _load(db: Session, book_ids: Optional[List[int]] = None) -> list:
+    """book_doc rows in bookid order: every book, or just these"""
+    if book_ids is None:
+        rows = []
+        last_id = 0
+        while True:
+            batch = db.execute(
+                select(*_COLUMNS)
+                .where(BookDoc.bookid > last_id)
+                .order_by(BookDoc.bookid)
+                .limit(LOAD_BATCH)
+            ).all()
+            if not batch:
+                return rows
+            rows.extend(batch)
+            last_id = batch[-1].bookid
+    rows = []
+    for start in range(0, len(book_ids), LOAD_BATCH):
+        chunk = book_ids[start : start + LOAD_BATCH]
+        rows.extend(
+            db.execute(
+                select(*_COLUMNS)
+                .where(BookDoc.bookid.in_(chunk))
+                .order_by(BookDoc.bookid)
+            ).all()
+        )
+    return rows
+
+
+engine = Engine()
+
+
+def _on_notify(payload: str) -> None:
+    engine.changed(int(book_id) for book_id in payload.split(",") if book_id)
+
+
+if CATALOG_ENGINE:
+    notify.listener.subscribe(CHANNEL, _on_notify, engine.invalidate)
+
+
+def browse(**filters) -> Optional[Tuple[List[int], int]]:
+    """Engine.browse when CATALOG_ENGINE is on; None otherwise"""
+    if not CATALOG_ENGINE:
+        return None
+    return engine.browse(**filters)
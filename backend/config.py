@@ -1,5 +1,10 @@
+import contextvars
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from fastapi import Request, Response
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -15,21 +20,169 @@ DB_NAME = os.getenv("DB_NAME", "bookshelf")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 
+# Database driver: "psycopg2" (default) or "psycopg" (psycopg 3, optional),
+# which prepares statements server-side once they have run
+# DB_PREPARE_THRESHOLD times on a connection
+DB_DRIVER = os.getenv("DB_DRIVER", "psycopg2")
+DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))
+
 # SQLAlchemy connection URL
 if DB_PASSWORD:
-    DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    DATABASE_URL = f"postgresql+{DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 else:
-    DATABASE_URL = f"postgresql://{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    DATABASE_URL = f"postgresql+{DB_DRIVER}://{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def driver_connect_args(driver: str = DB_DRIVER) -> dict:
+    """Driver options; psycopg 3 gets automatic server-side prepares"""
+    if driver == "psycopg":
+        return {"prepare_threshold": DB_PREPARE_THRESHOLD}
+    return {}
+
 
 # Create SQLAlchemy engine
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,  # Check connection before using from pool
+    connect_args=driver_connect_args(),
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replicas: comma-separated SQLAlchemy URLs, used round-robin
+DATABASE_URL_REPLICA = os.getenv("DATABASE_URL_REPLICA", "")
+# Replicas further behind than this are skipped in favour of the primary
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "2"))
+# After a write, the client reads from the primary for this long
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+READ_YOUR_WRITES_COOKIE = "bookshelf_primary_until"
+READ_YOUR_WRITES_HEADER = "X-Read-Primary-Until"
+
+_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """)
+
+
+class Replica:
+    """A read replica with its session factory and last measured lag"""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.session_factory = sessionmaker(
+            autocommit=False, autoflush=False, bind=self.engine
+        )
+        self.lag = 0.0
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_usable(self) -> bool:
+        """Check replication lag, at most once per REPLICA_LAG_CHECK_SECONDS"""
+        now = time.monotonic()
+        if now - self.checked_at >= REPLICA_LAG_CHECK_SECONDS and self._lock.acquire(
+            blocking=False
+        ):
+            try:
+                with self.engine.connect() as connection:
+                    self.lag = float(connection.execute(_REPLICA_LAG_SQL).scalar())
+            except Exception:
+                # Unreachable replicas are skipped until the next check
+                self.lag = float("inf")
+            finally:
+                self.checked_at = now
+                self._lock.release()
+        return self.lag <= REPLICA_MAX_LAG_SECONDS
+
+
+replicas = [
+    Replica(url.strip()) for url in DATABASE_URL_REPLICA.split(",") if url.strip()
+]
+_replica_cycle = itertools.cycle(replicas) if replicas else None
+_replica_cycle_lock = threading.Lock()
+
+# Directory holding the memory-mapped book vector index (see book_vectors.py)
+BOOK_VECTORS_DIR = os.getenv(
+    "BOOK_VECTORS_DIR", os.path.join(os.path.dirname(__file__), "data")
+)
+
+# Snapshot of the trending counters, restored at startup (see trending.py)
+TRENDING_SNAPSHOT_FILE = os.getenv(
+    "TRENDING_SNAPSHOT_FILE",
+    os.path.join(os.path.dirname(__file__), "data", "trending.json"),
+)
+
+# Cache backend shared by the derived-data caches (see cache.py): "local",
+# redis://host:port/db or unix:///path/to/socket
+CACHE_URL = os.getenv("CACHE_URL", "local")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# Broadcast local cache invalidations to other workers via Postgres NOTIFY
+CACHE_BROADCAST = os.getenv("CACHE_BROADCAST", "1") == "1"
+
+# Pool connections each worker opens during startup warmup (see warmup.py)
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+
+# Run background jobs (see jobs.py) inside each API worker; set to 0 to leave
+# them to a single dedicated process or to disable them in tests
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+
+# Limits on POST /batch (see routers/batch.py): sub-requests per batch, and
+# total cost, where each sub-request costs 1 plus 1 per 25 rows it may return
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+BATCH_MAX_COST = int(os.getenv("BATCH_MAX_COST", "60"))
+
+# Buffered reading progress updates (see progress_buffer.py): seconds between
+# flushes, and buffered items at which a request flushes without waiting
+PROGRESS_FLUSH_SECONDS = float(os.getenv("PROGRESS_FLUSH_SECONDS", "5"))
+PROGRESS_BUFFER_MAX = int(os.getenv("PROGRESS_BUFFER_MAX", "5000"))
+
+# statement_timeout per route class (see query_guard.py), in milliseconds;
+# 0 disables it. Bulk imports and the like are marked "bulk"
+STATEMENT_TIMEOUT_READ_MS = int(os.getenv("STATEMENT_TIMEOUT_READ_MS", "3000"))
+STATEMENT_TIMEOUT_WRITE_MS = int(os.getenv("STATEMENT_TIMEOUT_WRITE_MS", "10000"))
+STATEMENT_TIMEOUT_BULK_MS = int(os.getenv("STATEMENT_TIMEOUT_BULK_MS", "120000"))
+
+# Reading list change feed (see reading_events.py): hours of events kept for
+# clients resuming with Last-Event-ID, and seconds between keepalive comments
+READINGLIST_EVENT_RETENTION_HOURS = int(
+    os.getenv("READINGLIST_EVENT_RETENTION_HOURS", "24")
+)
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Threads hashing passwords during bulk user imports through the API, per
+# process (see user_import.py); at most 4 by default, to leave cores for
+# serving requests. The user_import.py command uses every core by default
+USER_IMPORT_WORKERS = int(
+    os.getenv("USER_IMPORT_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+
+# Slow query log (see slow_queries.py): statements slower than SLOW_QUERY_MS
+# are kept in a ring buffer of SLOW_QUERY_LOG_SIZE entries per worker, and this
+# fraction of the slow SELECTs is re-run under EXPLAIN (ANALYZE, BUFFERS)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", "0.1"))
+
+# Logging (see logging_config.py): root level, per-module levels and sampled
+# fractions as "name=value,..." pairs, "json" or "text" lines, and records
+# queued for the writer thread before new ones are dropped
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# In-memory catalog for GET /books/ (see catalog_engine.py): off unless set
+# to 1, and seconds between applying the book changes it has been notified of
+CATALOG_ENGINE = os.getenv("CATALOG_ENGINE", "0") == "1"
+CATALOG_ENGINE_SYNC_SECONDS = float(os.getenv("CATALOG_ENGINE_SYNC_SECONDS", "1"))
+
 # Create declarative base for ORM models
 Base = declarative_base()
 
@@ -43,6 +196,79 @@ def get_db():
         db.close()
 
 
+def _pick_replica():
+    """Return the next usable replica in round-robin order, if any"""
+    for _ in range(len(replicas)):
+        with _replica_cycle_lock:
+            replica = next(_replica_cycle)
+        if replica.is_usable():
+            return replica
+    return None
+
+
+def _reads_pinned_to_primary(request: Request) -> bool:
+    """True while the client is inside its read-your-writes window"""
+    token = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(
+        READ_YOUR_WRITES_COOKIE
+    )
+    try:
+        return token is not None and float(token) > time.time()
+    except ValueError:
+        return False
+
+
+# Set by POST /batch so that all of its sub-requests share one read session
+shared_read_session = contextvars.ContextVar("shared_read_session", default=None)
+
+
+def read_session_factory(request: Request):
+    """Session factory for reads: a usable replica, or else the primary"""
+    replica = None
+    if replicas and not _reads_pinned_to_primary(request):
+        replica = _pick_replica()
+    return replica.session_factory if replica else SessionLocal
+
+
+# Function to get a read-only database session (replica when possible)
+def get_read_db(request: Request):
+    shared = shared_read_session.get()
+    if shared is not None:
+        # Owned and closed by the batch request
+        yield shared
+        return
+
+    db = read_session_factory(request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def is_replica_session(db) -> bool:
+    """Whether a session reads from a replica rather than the primary"""
+    return db.get_bind() is not engine
+
+
+def mark_primary_reads(response: Response) -> None:
+    """
+    Pin the client's reads to the primary for READ_YOUR_WRITES_SECONDS.
+
+    Called by write routes; the token is sent both as a cookie and as a
+    response header that non-browser clients can echo back.
+    """
+    if not replicas:
+        return
+    until = str(int(time.time()) + READ_YOUR_WRITES_SECONDS)
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE,
+        until,
+        max_age=READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+        samesite="lax",
+    )
+    response.headers[READ_YOUR_WRITES_HEADER] = until
+
+
 # Function to test database connection
 def test_connection():
     """Test database connection"""
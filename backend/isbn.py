@@ -0,0 +1,68 @@
+"""
+ISBN normalization for lookups.
+
+Book.isbn and Book.isbn13 hold compact ISBNs (no hyphens or spaces), the
+first usually an ISBN-10 and the second an ISBN-13. candidates() turns any
+user-supplied form of an ISBN into every compact form it may be stored as.
+"""
+
+import re
+from typing import List, Optional
+
+_SEPARATORS = re.compile(r"[\s\-]")
+_ISBN10 = re.compile(r"^\d{9}[\dX]$")
+_ISBN13 = re.compile(r"^\d{13}$")
+
+
+def normalize(value: str) -> Optional[str]:
+    """Compact ISBN-10 or ISBN-13, or None if it is neither shape"""
+    compact = _SEPARATORS.sub("", value).upper()
+    if compact.startswith("ISBN"):
+        compact = compact[4:].lstrip(":")
+    if _ISBN10.match(compact) or _ISBN13.match(compact):
+        return compact
+    return None
+
+
+def is_valid_isbn10(isbn: str) -> bool:
+    if not _ISBN10.match(isbn):
+        return False
+    digits = [10 if char == "X" else int(char) for char in isbn]
+    return sum((10 - i) * digit for i, digit in enumerate(digits)) % 11 == 0
+
+
+def is_valid_isbn13(isbn: str) -> bool:
+    if not _ISBN13.match(isbn):
+        return False
+    return sum(int(char) * (3 if i % 2 else 1) for i, char in enumerate(isbn)) % 10 == 0
+
+
+def to_isbn13(isbn10: str) -> str:
+    body = "978" + isbn10[:9]
+    check = -sum(int(char) * (3 if i % 2 else 1) for i, char in enumerate(body)) % 10
+    return body + str(check)
+
+
+def to_isbn10(isbn13: str) -> Optional[str]:
+    """ISBN-10 for a 978-prefixed ISBN-13; 979 ISBNs have none"""
+    if not isbn13.startswith("978"):
+        return None
+    body = isbn13[3:12]
+    check = -sum((10 - i) * int(char) for i, char in enumerate(body)) % 11
+    return body + ("X" if check == 10 else str(check))
+
+
+def candidates(value: str) -> List[str]:
+    """Every compact form the ISBN may be stored as; empty if not an ISBN"""
+    isbn = normalize(value)
+    if isbn is None:
+        return []
+    forms = [isbn]
+    # Convert only valid ISBNs; an invalid one can still match exactly
+    if len(isbn) == 10 and is_valid_isbn10(isbn):
+        forms.append(to_isbn13(isbn))
+    elif len(isbn) == 13 and is_valid_isbn13(isbn):
+        isbn10 = to_isbn10(isbn)
+        if isbn10:
+            forms.append(isbn10)
+    return forms
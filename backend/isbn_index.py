@@ -0,0 +1,360 @@
+"""
+In-memory Bloom filter of every stored ISBN, so that ingest can skip the
+duplicate-ISBN query for books that are definitely new.
+
+A Bloom filter answers "definitely not stored" or "maybe stored": only the
+maybe answers (real duplicates plus about FALSE_POSITIVE_RATE of new ISBNs)
+go on to a database check. Each book adds its isbn and isbn13 in every form
+from isbn.candidates(), so an ISBN-10 and its ISBN-13 hit the same entries.
+
+The filter is built from book at startup (or restored from a snapshot in
+BOOK_VECTORS_DIR and caught up), updated by this worker's writes, and every
+30 seconds picks up books committed by other workers and loads (the
+isbn_index_poll job). Bloom filters cannot forget, so deleted and changed
+ISBNs only add false positives until the nightly rebuild. Nothing relies on
+the filter for correctness: a duplicate it misses (say, inserted by another
+worker since the last poll) still hits the unique constraint on book.isbn,
+and the routes then check the ISBNs in the database.
+
+    python isbn_index.py               # rebuild and save the snapshot
+    python bench_isbn_index.py         # size and false-positive rate at 1M+
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+import isbn
+from config import BOOK_VECTORS_DIR
+from models import Book
+
+FALSE_POSITIVE_RATE = 0.01
+# Room to grow before a rebuild, as a multiple of the keys at build time
+GROWTH_FACTOR = 2
+MIN_CAPACITY = 100_000
+SNAPSHOT_FILE = os.path.join(BOOK_VECTORS_DIR, "isbn_index.bin")
+SNAPSHOT_VERSION = 1
+BATCH_SIZE = 50_000
+# Unseen book IDs below the highest seen are re-read by polls for this long
+# (covering transactions open that long), then left to the nightly rebuild
+GAP_SECONDS = 900
+MAX_GAPS = 100
+
+_MASK64 = 2**64 - 1
+
+
+def keys_for(value: Optional[str]) -> List[str]:
+    """Filter keys for a stored or requested ISBN"""
+    if not value:
+        return []
+    return isbn.candidates(value) or [value.strip()]
+
+
+def _hash_pair(key: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    # Odd second hash, so the k probes never collapse onto one bit
+    return (
+        int.from_bytes(digest[:8], "little"),
+        int.from_bytes(digest[8:], "little") | 1,
+    )
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over blake2b"""
+
+    def __init__(self, capacity: int, false_positive_rate: float = FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.num_bits = max(
+            64, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, key: str) -> List[int]:
+        h1, h2 = _hash_pair(key)
+        return [
+            ((h1 + i * h2) & _MASK64) % self.num_bits for i in range(self.num_hashes)
+        ]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def add_many(self, keys: Sequence[str]) -> None:
+        """Vectorized add, for builds"""
+        if not keys:
+            return
+        pairs = np.array([_hash_pair(key) for key in keys], dtype=np.uint64)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        # Wraps mod 2**64, like _positions
+        with np.errstate(over="ignore"):
+            combined = pairs[:, :1] + steps * pairs[:, 1:]
+        positions = (combined % np.uint64(self.num_bits)).ravel().astype(np.int64)
+        flags = np.unpackbits(self.bits, bitorder="little")
+        flags[positions] = 1
+        self.bits = np.packbits(flags, bitorder="little")
+        self.count += len(keys)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def expected_false_positive_rate(self) -> float:
+        """For the keys added so far"""
+        return (
+            1 - math.exp(-self.num_hashes * self.count / self.num_bits)
+        ) ** self.num_hashes
+
+
+class IsbnIndex:
+    """
+    The Bloom filter plus the book IDs its polls have seen.
+
+    Book IDs are taken from the sequence at insert but become visible at
+    commit, not necessarily in ID order, so a poll cannot simply read the
+    IDs above the highest one seen. It also re-reads the gaps below it,
+    which are IDs of transactions still open at the last poll (or rolled
+    back, which is why a gap is given up after GAP_SECONDS).
+    """
+
+    def __init__(
+        self,
+        bloom: BloomFilter,
+        max_bookid: int = 0,
+        gaps: Sequence[Tuple[int, int]] = (),
+    ):
+        self.bloom = bloom
+        self.max_bookid = max_bookid
+        # (first ID, last ID, monotonic time first seen) of each unseen range
+        now = time.monotonic()
+        self.gaps: List[Tuple[int, int, float]] = [(lo, hi, now) for lo, hi in gaps]
+        # Books this worker recorded that no poll has read yet
+        self._recorded: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, db: Session, batch_size: int = BATCH_SIZE) -> "IsbnIndex":
+        rows = db.execute(select(Book.bookid, Book.isbn, Book.isbn13)).all()
+        keys = [key for row in rows for value in row[1:] for key in keys_for(value)]
+        bloom = BloomFilter(max(len(keys) * GROWTH_FACTOR, MIN_CAPACITY))
+        for start in range(0, len(keys), batch_size):
+            bloom.add_many(keys[start : start + batch_size])
+        # Older holes in the IDs are deleted books or rolled-back inserts
+        return cls(bloom, max((row.bookid for row in rows), default=0))
+
+    def might_contain(self, value: str) -> bool:
+        # Every stored ISBN is added in all its forms, so probing one form is
+        # enough, and probing more would only add false positives
+        return keys_for(value)[0] in self.bloom if value else False
+
+    def add(
+        self, values: Iterable[Optional[str]], book_id: Optional[int] = None
+    ) -> None:
+        """Add a book's ISBNs; this worker's writes pass the book ID"""
+        with self._lock:
+            self._add(values)
+            if book_id is not None:
+                self._recorded.add(book_id)
+
+    def _add(self, values: Iterable[Optional[str]]) -> None:
+        for value in values:
+            for key in keys_for(value):
+                self.bloom.add(key)
+
+    def poll(self, db: Session) -> int:
+        """Add books committed since the last poll; returns how many"""
+        with self._lock:
+            ranges = [Book.bookid.between(lo, hi) for lo, hi, _ in self.gaps]
+        rows = db.execute(
+            select(Book.bookid, Book.isbn, Book.isbn13)
+            .where(or_(Book.bookid > self.max_bookid, *ranges))
+            .order_by(Book.bookid)
+        ).all()
+        with self._lock:
+            for row in rows:
+                if row.bookid in self._recorded:
+                    # Already added when this worker wrote it
+                    self._recorded.discard(row.bookid)
+                else:
+                    self._add((row.isbn, row.isbn13))
+            self._advance([row.bookid for row in rows])
+        return len(rows)
+
+    def _advance(self, seen: Sequence[int]) -> None:
+        """Move past the IDs `seen` (sorted), keeping the ones skipped as gaps"""
+        now = time.monotonic()
+        gaps = []
+        for lo, hi, since in self.gaps:
+            if now - since > GAP_SECONDS:
+                continue
+            start = lo
+            for book_id in seen[bisect_left(seen, lo) : bisect_right(seen, hi)]:
+                if book_id > start:
+                    gaps.append((start, book_id - 1, since))
+                start = book_id + 1
+            if start <= hi:
+                gaps.append((start, hi, since))
+        for book_id in seen[bisect_right(seen, self.max_bookid) :]:
+            if book_id > self.max_bookid + 1:
+                gaps.append((self.max_bookid + 1, book_id - 1, now))
+            self.max_bookid = book_id
+        if len(gaps) > MAX_GAPS:
+            # One range over all of them reads a few more rows per poll
+            gaps = [(gaps[0][0], max(g[1] for g in gaps), max(g[2] for g in gaps))]
+        self.gaps = gaps
+        self._recorded = {
+            book_id
+            for book_id in self._recorded
+            if book_id > self.max_bookid
+            or any(lo <= book_id <= hi for lo, hi, _ in gaps)
+        }
+
+    @property
+    def full(self) -> bool:
+        return self.bloom.count > self.bloom.capacity
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps(
+            {
+                "version": SNAPSHOT_VERSION,
+                "capacity": self.bloom.capacity,
+                "num_bits": self.bloom.num_bits,
+                "num_hashes": self.bloom.num_hashes,
+                "count": self.bloom.count,
+                "max_bookid": self.max_bookid,
+                "gaps": [[lo, hi] for lo, hi, _ in self.gaps],
+            }
+        ).encode()
+        return len(header).to_bytes(4, "little") + header + self.bloom.bits.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "IsbnIndex":
+        size = int.from_bytes(data[:4], "little")
+        header = json.loads(data[4 : 4 + size])
+        if header["version"] != SNAPSHOT_VERSION:
+            raise ValueError("Unknown ISBN index snapshot version")
+        bloom = BloomFilter(header["capacity"])
+        if (bloom.num_bits, bloom.num_hashes) != (
+            header["num_bits"],
+            header["num_hashes"],
+        ):
+            raise ValueError("ISBN index snapshot was built with other parameters")
+        bits = np.frombuffer(data[4 + size :], dtype=np.uint8)
+        if bits.size != bloom.bits.size:
+            raise ValueError("Truncated ISBN index snapshot")
+        bloom.bits = bits.copy()
+        bloom.count = header["count"]
+        return cls(bloom, header["max_bookid"], header.get("gaps", ()))
+
+
+_index: Optional[IsbnIndex] = None
+_index_lock = threading.Lock()
+
+
+def refresh(
+    db: Session, rebuild: bool = False, snapshot_path: str = SNAPSHOT_FILE
+) -> None:
+    """
+    Load the index or catch it up with book.
+
+    The first call in a process restores the snapshot (or builds from book);
+    the index is rebuilt when asked to or once it outgrows its capacity.
+    """
+    global _index
+    with _index_lock:
+        index = _index
+        if index is None and not rebuild:
+            index = _load_snapshot(snapshot_path)
+        if index is None or rebuild or index.full:
+            _index = IsbnIndex.build(db)
+            return
+        _index = index
+    index.poll(db)
+
+
+def might_exist(value: str) -> bool:
+    """False only if no stored book has this ISBN; True until loaded"""
+    return _index is None or _index.might_contain(value)
+
+
+def record(values: Iterable[Optional[str]], book_id: Optional[int] = None) -> None:
+    """Add this worker's written ISBNs right away"""
+    if _index is not None:
+        _index.add(values, book_id)
+
+
+def existing(db: Session, values: Sequence[str], exact: bool = False) -> set:
+    """
+    The given ISBNs already stored in book.isbn.
+
+    Only the filter's maybe-duplicates are checked, in one query, unless
+    `exact` (after a unique violation showed the filter is behind).
+    """
+    maybe = sorted({value for value in values if exact or might_exist(value)})
+    if not maybe:
+        return set()
+    return set(db.scalars(select(Book.isbn).where(Book.isbn.in_(maybe))))
+
+
+def save_snapshot(path: str = SNAPSHOT_FILE) -> None:
+    """Write the index to disk atomically"""
+    if _index is None:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with _index._lock:
+        data = _index.to_bytes()
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _load_snapshot(path: str) -> Optional[IsbnIndex]:
+    try:
+        with open(path, "rb") as f:
+            return IsbnIndex.from_bytes(f.read())
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def main():
+    from config import SessionLocal
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        print("\n🔄 Building ISBN index...")
+        refresh(db, rebuild=True)
+        save_snapshot()
+        bloom = _index.bloom
+        elapsed = time.perf_counter() - started
+        print(
+            f"✅ Indexed {bloom.count} ISBN keys in {elapsed:.1f}s: "
+            f"{bloom.nbytes / 1024:.0f} KiB, {bloom.num_hashes} hashes, "
+            f"expected false positives {bloom.expected_false_positive_rate():.2%}"
+        )
+        print(f"   Snapshot written to {SNAPSHOT_FILE}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
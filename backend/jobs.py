@@ -0,0 +1,199 @@
+"""
+Background jobs registered with the scheduler at startup.
+
+Shared jobs (database writes, maintenance) are single-flight across workers;
+jobs that refresh a worker's own in-memory state run in every worker.
+"""
+
+from sqlalchemy import text
+
+import also_read
+import author_stats
+import catalog_engine
+import isbn_index
+import progress_buffer
+import reading_events
+import recommend
+import trending
+from config import (
+    CATALOG_ENGINE,
+    CATALOG_ENGINE_SYNC_SECONDS,
+    PROGRESS_FLUSH_SECONDS,
+    READINGLIST_EVENT_RETENTION_HOURS,
+    SessionLocal,
+    engine,
+)
+from routers import genres
+from scheduler import Scheduler
+
+
+def _with_session(func):
+    """Wrap a job body so it gets a fresh session that is always closed"""
+
+    def run():
+        db = SessionLocal()
+        try:
+            return func(db)
+        finally:
+            db.close()
+
+    return run
+
+
+def refresh_also_read(db):
+    also_read.refresh(db)
+
+
+def rebuild_also_read(db):
+    also_read.rebuild(db)
+
+
+def refresh_author_stats(db):
+    author_stats.refresh(db)
+
+
+def refresh_recommend_features(db):
+    recommend.get_features(db, refresh=True)
+
+
+def poll_trending(db):
+    trending.poll(db)
+
+
+def poll_isbn_index(db):
+    isbn_index.refresh(db)
+
+
+def rebuild_isbn_index(db):
+    isbn_index.refresh(db, rebuild=True)
+
+
+def flush_progress(db):
+    progress_buffer.flush(db)
+
+
+def prune_reading_events(db):
+    reading_events.prune(db, READINGLIST_EVENT_RETENTION_HOURS)
+
+
+def sync_catalog_engine(db):
+    catalog_engine.engine.sync(db)
+
+
+def reload_catalog_engine(db):
+    catalog_engine.engine.invalidate()
+    catalog_engine.engine.sync(db)
+
+
+def refresh_top_genres(db):
+    genres.refresh_top_genres(db)
+
+
+def analyze_tables():
+    # ANALYZE cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE"))
+
+
+def save_trending_snapshot():
+    trending.save_snapshot()
+
+
+def save_isbn_index_snapshot():
+    isbn_index.save_snapshot()
+
+
+def register_jobs(scheduler: Scheduler) -> None:
+    scheduler.add_job(
+        "also_read_refresh",
+        _with_session(refresh_also_read),
+        interval=300,
+        jitter=30,
+    )
+    scheduler.add_job(
+        "also_read_rebuild", _with_session(rebuild_also_read), cron="30 3 * * *"
+    )
+    scheduler.add_job(
+        "author_stats_refresh",
+        _with_session(refresh_author_stats),
+        interval=60,
+        jitter=10,
+    )
+    scheduler.add_job("analyze", analyze_tables, cron="0 4 * * *")
+    scheduler.add_job(
+        "recommend_features",
+        _with_session(refresh_recommend_features),
+        interval=recommend.FEATURES_MAX_AGE / 2,
+        jitter=60,
+        single_flight=False,
+        run_at_startup=True,
+    )
+    scheduler.add_job(
+        "trending_poll",
+        _with_session(poll_trending),
+        interval=10,
+        jitter=2,
+        single_flight=False,
+        run_at_startup=True,
+    )
+    # Every worker holds the same counts, so one of them writes the snapshot
+    scheduler.add_job("trending_snapshot", save_trending_snapshot, interval=300)
+    scheduler.add_job(
+        "isbn_index_poll",
+        _with_session(poll_isbn_index),
+        interval=30,
+        jitter=5,
+        single_flight=False,
+        run_at_startup=True,
+    )
+    # Drops deleted and changed ISBNs, which a Bloom filter cannot forget
+    scheduler.add_job(
+        "isbn_index_rebuild",
+        _with_session(rebuild_isbn_index),
+        cron="45 3 * * *",
+        jitter=600,
+        single_flight=False,
+    )
+    scheduler.add_job("isbn_index_snapshot", save_isbn_index_snapshot, interval=300)
+    # Each worker flushes its own buffer
+    scheduler.add_job(
+        "progress_flush",
+        _with_session(flush_progress),
+        interval=PROGRESS_FLUSH_SECONDS,
+        single_flight=False,
+    )
+    scheduler.add_job(
+        "readinglist_event_prune",
+        _with_session(prune_reading_events),
+        cron="20 * * * *",
+    )
+    scheduler.add_job(
+        "top_genres",
+        _with_session(refresh_top_genres),
+        interval=300,
+        jitter=30,
+        single_flight=False,
+        run_at_startup=True,
+    )
+    # Each worker keeps its own copy of the catalog
+    if CATALOG_ENGINE:
+        scheduler.add_job(
+            "catalog_engine_sync",
+            _with_session(sync_catalog_engine),
+            interval=CATALOG_ENGINE_SYNC_SECONDS,
+            single_flight=False,
+            run_at_startup=True,
+        )
+        scheduler.add_job(
+            "catalog_engine_reload",
+            _with_session(reload_catalog_engine),
+            cron="15 4 * * *",
+            jitter=600,
+            single_flight=False,
+        )
+
+
+def create_scheduler() -> Scheduler:
+    scheduler = Scheduler(engine)
+    register_jobs(scheduler)
+    return scheduler
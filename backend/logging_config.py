@@ -0,0 +1,200 @@
+"""
+Application logging: JSON lines written off the request thread.
+
+setup_logging() gives the root logger a QueueHandler, so a request thread
+only copies its records onto an in-memory queue; a QueueListener thread
+formats them and writes them to stderr. The queue is bounded
+(LOG_QUEUE_SIZE): when the writer cannot keep up, records are dropped and
+counted rather than blocking requests.
+
+Each record is one JSON object per line with the time, level, logger,
+message, the request ID and any fields passed in `extra`. The request ID
+comes from the X-Request-ID header, or is generated, by
+RequestIdMiddleware, which also returns it in the response.
+
+LOG_LEVEL sets the root level and LOG_LEVELS per-module levels, e.g.
+"sqlalchemy.engine=WARNING,slow_queries=INFO". LOG_SAMPLE keeps only a
+fraction of the records below ERROR for an event (the `event` extra) or a
+logger, e.g. "login=0.01,cache=0.1", for events too frequent to log every
+time. LOG_FORMAT=text gives plain lines for local development.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from config import LOG_FORMAT, LOG_LEVEL, LOG_LEVELS, LOG_QUEUE_SIZE, LOG_SAMPLE
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["_QueueHandler"] = None
+
+
+def parse_pairs(value: str) -> Dict[str, str]:
+    """'a=1,b=2' -> {'a': '1', 'b': '2'}"""
+    pairs = {}
+    for item in value.split(","):
+        name, sep, setting = item.partition("=")
+        if sep and name.strip():
+            pairs[name.strip()] = setting.strip()
+    return pairs
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != "request_id":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request's ID, on the calling thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records below ERROR of sampled events"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.rates or record.levelno >= logging.ERROR:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None:
+            rate = self.rates.get(record.name)
+        return rate is None or random.random() < rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records as they are; formatting is left to the listener"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the arguments now, since they may change after the call;
+        # the traceback stays an object and is formatted by the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(
+    stream=None, format_: str = LOG_FORMAT, sample: str = LOG_SAMPLE
+) -> None:
+    """Route all logging through the queue; safe to call more than once"""
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if format_ == "text":
+        output.setFormatter(
+            logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+            )
+        )
+    else:
+        output.setFormatter(JsonFormatter())
+
+    _handler = _QueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(RequestIdFilter())
+    rates = {name: float(rate) for name, rate in parse_pairs(sample).items()}
+    _handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL.upper())
+    for name, level in parse_pairs(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(_handler.queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out the queued records and stop the listener thread"""
+    global _listener, _handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_handler)
+    _listener = None
+    _handler = None
+
+
+def status() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
+
+
+class RequestIdMiddleware:
+    """Gives each HTTP request an ID for its log records and response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(REQUEST_ID_HEADER.lower().encode())
+        value = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = request_id.set(value)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
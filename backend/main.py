@@ -1,21 +1,75 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
-from config import get_db, test_connection
+import progress_buffer
+import slow_queries  # noqa: F401 - installs the statement timing hooks
+from config import (
+    READ_YOUR_WRITES_HEADER,
+    SCHEDULER_ENABLED,
+    SessionLocal,
+    get_db,
+    test_connection,
+)
+from jobs import create_scheduler
+from logging_config import (
+    REQUEST_ID_HEADER,
+    RequestIdMiddleware,
+    setup_logging,
+    shutdown_logging,
+)
+from notify import listener
+from query_guard import QueryGuardMiddleware, pool_exhausted, query_canceled
+from warmup import Warmup
 
 # Import all models to ensure SQLAlchemy registers them
 from models import User, Book, Author, Genre, BookAuthor, BookGenre, ReadingList
 
 # Import routers
-from routers import books, authors, genres, users, readinglist, auth
+from routers import books, authors, genres, users, readinglist, auth, admin, batch
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up before accepting requests, start background jobs and the LISTEN
+    # thread for this worker, and stop them on shutdown
+    setup_logging()
+    app.state.warmup = Warmup()
+    await asyncio.to_thread(app.state.warmup.run_core, app)
+    app.state.scheduler = create_scheduler() if SCHEDULER_ENABLED else None
+    if app.state.scheduler:
+        await app.state.scheduler.start()
+    listener.start()
+    # Caches fill in the background; /ready reports when they are done
+    warm_caches = asyncio.create_task(app.state.warmup.warm_caches(app.state.scheduler))
+    yield
+    warm_caches.cancel()
+    listener.stop()
+    if app.state.scheduler:
+        await app.state.scheduler.stop()
+    # Write out buffered reading progress once the flush job has stopped
+    await asyncio.to_thread(_flush_progress)
+    shutdown_logging()
+
+
+def _flush_progress():
+    db = SessionLocal()
+    try:
+        progress_buffer.flush(db)
+    finally:
+        db.close()
+
 
 # Initialize FastAPI application
 app = FastAPI(
     title="Online Bookshelf API",
     description="API for the Online Bookshelf web application",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -25,8 +79,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    # Response headers the browser client reads
+    expose_headers=["X-Next-Cursor", READ_YOUR_WRITES_HEADER, REQUEST_ID_HEADER],
 )
 
+# Cancel the queries of requests whose client has gone away
+app.add_middleware(QueryGuardMiddleware)
+
+# Tag log records and responses with a request ID
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(auth.router)  # Auth router first for /auth/login and /auth/register
 app.include_router(books.router)
@@ -34,6 +96,8 @@ app.include_router(authors.router)
 app.include_router(genres.router)
 app.include_router(users.router)
 app.include_router(readinglist.router)
+app.include_router(admin.router)
+app.include_router(batch.router)
 
 
 # Root endpoint
@@ -51,6 +115,16 @@ def test_db():
     return {"message": "Database connection successful"}
 
 
+# Readiness endpoint for load balancers; 503 until warmup has finished
+@app.get("/ready", tags=["root"])
+def ready(request: Request):
+    warmup = getattr(request.app.state, "warmup", None)
+    if warmup is None or not warmup.ready:
+        status = warmup.status() if warmup else {"status": "starting"}
+        return JSONResponse(status_code=503, content=status)
+    return warmup.status()
+
+
 # Remove the hardcoded endpoint
 
 
@@ -63,8 +137,31 @@ async def not_found_exception_handler(request: Request, exc: HTTPException):
     )
 
 
+def _database_unavailable(request: Request, exc: Exception):
+    """504 for statements cancelled by their timeout, 503 when the pool is dry"""
+    if query_canceled(exc):
+        return JSONResponse(
+            status_code=504,
+            content={"detail": "Query timed out", "path": request.url.path},
+        )
+    if pool_exhausted(exc):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "detail": "Database busy, retry shortly",
+                "path": request.url.path,
+            },
+            headers={"Retry-After": "1"},
+        )
+    return None
+
+
 @app.exception_handler(500)
 async def internal_error_exception_handler(request: Request, exc: HTTPException):
+    # Routes turn database errors into 500s; the cause is still attached
+    unavailable = _database_unavailable(request, exc)
+    if unavailable is not None:
+        return unavailable
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error", "path": request.url.path},
@@ -85,6 +182,9 @@ async def validation_error_handler(request: Request, exc: HTTPException):
 # Catch all other exceptions
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
+    unavailable = _database_unavailable(request, exc)
+    if unavailable is not None:
+        return unavailable
     return JSONResponse(
         status_code=500,
         content={"detail": "An unexpected error occurred", "path": request.url.path},
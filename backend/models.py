@@ -7,8 +7,12 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     CheckConstraint,
+    Index,
+    BigInteger,
+    SmallInteger,
     func,
 )
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel, Field, EmailStr, validator
 from typing import Optional, List, Dict, Any
@@ -16,7 +20,6 @@ from datetime import datetime
 
 from config import Base
 
-
 # SQLAlchemy ORM Models
 
 
@@ -123,7 +126,132 @@ class ReadingList(Base):
         ),
         CheckConstraint("progresspages >= 0", name="valid_progress"),
         CheckConstraint("userrating >= 0 AND userrating <= 5", name="valid_rating"),
+        # Backs keyset pagination of a user's reading list by (addedat, bookid)
+        Index("idx_readinglist_user_addedat", "userid", "addedat"),
+        # Backs the trending counters' rebuild and tail of recent adds
+        Index("idx_readinglist_addedat", "addedat"),
+    )
+
+
+class UserReadingStats(Base):
+    """Per-user reading list aggregates, maintained by the reading list routes"""
+
+    __tablename__ = "user_reading_stats"
+
+    userid = Column(
+        Integer, ForeignKey("User.userid", ondelete="CASCADE"), primary_key=True
     )
+    want_count = Column(Integer, nullable=False, default=0)
+    reading_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    dropped_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    pages_read = Column(Integer, nullable=False, default=0)
+    updatedat = Column(DateTime, default=func.now())
+
+
+class BookAlsoRead(Base):
+    """Precomputed "readers also shelved" neighbours, written by also_read.py"""
+
+    __tablename__ = "book_also_read"
+
+    bookid = Column(
+        Integer, ForeignKey("book.bookid", ondelete="CASCADE"), primary_key=True
+    )
+    rank = Column(Integer, primary_key=True)
+    neighborid = Column(
+        Integer, ForeignKey("book.bookid", ondelete="CASCADE"), nullable=False
+    )
+    score = Column(Float, nullable=False)
+
+
+class BookAlsoReadDirty(Base):
+    """Books whose shelves changed since their neighbours were computed"""
+
+    __tablename__ = "book_also_read_dirty"
+
+    bookid = Column(Integer, primary_key=True)
+    markedat = Column(DateTime, default=func.now())
+
+
+class AuthorStats(Base):
+    """Per-author aggregates from the author_stats materialized view"""
+
+    __tablename__ = "author_stats"
+
+    authorid = Column(Integer, primary_key=True)
+    book_count = Column(Integer, nullable=False)
+    avg_rating = Column(Float)
+    total_ratings = Column(BigInteger, nullable=False)
+    top_genres = Column(ARRAY(Text), nullable=False)
+
+
+class AuthorStatsDirty(Base):
+    """Single row set by catalog triggers until author_stats is refreshed"""
+
+    __tablename__ = "author_stats_dirty"
+
+    id = Column(SmallInteger, primary_key=True, default=1)
+    markedat = Column(DateTime, default=func.now())
+
+
+class BookDoc(Base):
+    """
+    Denormalized book with its authors and genres inlined, kept current by
+    triggers on the catalog tables. Read-only; write through Book.
+    """
+
+    __tablename__ = "book_doc"
+
+    bookid = Column(Integer, ForeignKey("book.bookid"), primary_key=True)
+    title = Column(String(500), nullable=False)
+    description = Column(Text)
+    bookformat = Column(String(50))
+    pages = Column(Integer)
+    averagerating = Column(Float)
+    totalratings = Column(Integer)
+    reviewscount = Column(Integer)
+    isbn = Column(String(20), nullable=False)
+    isbn13 = Column(String(30))
+    imageurl = Column(Text)
+    goodreadslink = Column(Text)
+    author_ids = Column(ARRAY(Integer), nullable=False)
+    author_names = Column(ARRAY(Text), nullable=False)
+    genre_ids = Column(ARRAY(Integer), nullable=False)
+    genre_names = Column(ARRAY(Text), nullable=False)
+
+    @property
+    def authors(self) -> List[Dict[str, Any]]:
+        return [
+            {"authorid": author_id, "name": name}
+            for author_id, name in zip(self.author_ids, self.author_names)
+        ]
+
+    @property
+    def genres(self) -> List[Dict[str, Any]]:
+        return [
+            {"genreid": genre_id, "name": name}
+            for genre_id, name in zip(self.genre_ids, self.genre_names)
+        ]
+
+
+class ReadingListEvent(Base):
+    """
+    A change to a reading list item, written by triggers on readinglist and
+    streamed by GET /readinglist/{user_id}/events. Read-only.
+    """
+
+    __tablename__ = "readinglist_event"
+
+    eventid = Column(BigInteger, primary_key=True)
+    userid = Column(Integer, nullable=False)
+    bookid = Column(Integer, nullable=False)
+    # add, update or remove
+    op = Column(String(10), nullable=False)
+    # The item after the change; None for removals
+    item = Column(JSONB)
+    createdat = Column(DateTime, default=func.now())
 
 
 # Pydantic Models for API request/response validation
@@ -144,6 +272,17 @@ class AuthorResponse(AuthorBase):
         from_attributes = True
 
 
+class AuthorStatsResponse(BaseModel):
+    authorid: int
+    book_count: int
+    avg_rating: Optional[float] = None
+    total_ratings: int
+    top_genres: List[str]
+
+    class Config:
+        from_attributes = True
+
+
 class GenreBase(BaseModel):
     name: str
 
@@ -205,6 +344,45 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class UserImportOutcome(BaseModel):
+    row: int
+    # created, exists, duplicate or invalid
+    status: str
+    email: Optional[str] = None
+    userid: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class UserImportResponse(BaseModel):
+    created: int
+    exists: int
+    duplicate: int
+    invalid: int
+    results: List[UserImportOutcome]
+
+
+def normalize_reading_status(v: str) -> str:
+    """Upper-case a reading list status and check it is allowed"""
+    allowed = ["WANT", "READING", "COMPLETED", "DROPPED"]
+    normalized = v.upper()
+    if normalized not in allowed:
+        allowed_display = ", ".join(a.lower() for a in allowed)
+        raise ValueError(f"Status must be one of: {allowed_display}")
+    return normalized
+
+
+def validate_user_rating(v: Optional[float]) -> Optional[float]:
+    if v is not None and (v < 0 or v > 5):
+        raise ValueError("Rating must be between 0 and 5")
+    return v
+
+
+def validate_progress_pages(v: Optional[int]) -> Optional[int]:
+    if v is not None and v < 0:
+        raise ValueError("Progress cannot be negative")
+    return v
+
+
 class ReadingListBase(BaseModel):
     status: str
     progresspages: Optional[int] = None
@@ -213,18 +391,15 @@ class ReadingListBase(BaseModel):
 
     @validator("status")
     def validate_status(cls, v):
-        allowed = ["WANT", "READING", "COMPLETED", "DROPPED"]
-        normalized = v.upper()
-        if normalized not in allowed:
-            allowed_display = ", ".join(a.lower() for a in allowed)
-            raise ValueError(f"Status must be one of: {allowed_display}")
-        return normalized
+        return normalize_reading_status(v)
+
+    @validator("progresspages")
+    def validate_progress(cls, v):
+        return validate_progress_pages(v)
 
     @validator("userrating")
     def validate_rating(cls, v):
-        if v is not None and (v < 0 or v > 5):
-            raise ValueError("Rating must be between 0 and 5")
-        return v
+        return validate_user_rating(v)
 
 
 class ReadingListCreate(ReadingListBase):
@@ -235,6 +410,18 @@ class ReadingListUpdate(ReadingListBase):
     pass
 
 
+class ReadingProgressUpdate(BaseModel):
+    progresspages: int = Field(..., ge=0)
+
+
+class ReadingProgressResponse(BaseModel):
+    userid: int
+    bookid: int
+    progresspages: int
+    # False once the update has been written to the database
+    buffered: bool
+
+
 class ReadingListResponse(ReadingListBase):
     userid: int
     bookid: int
@@ -245,6 +432,149 @@ class ReadingListResponse(ReadingListBase):
         from_attributes = True
 
 
+class ReadingListItemResponse(ReadingListBase):
+    """A reading list row without its book"""
+
+    userid: int
+    bookid: int
+    addedat: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# Maximum number of operations accepted by POST /readinglist/batch
+READING_LIST_BATCH_LIMIT = 200
+
+
+class ReadingListBatchOperation(BaseModel):
+    op: str
+    bookid: int
+    status: Optional[str] = None
+    progresspages: Optional[int] = None
+    userrating: Optional[float] = None
+    note: Optional[str] = None
+
+    @validator("op")
+    def validate_op(cls, v):
+        normalized = v.lower()
+        if normalized not in ("add", "update", "remove"):
+            raise ValueError("Operation must be one of: add, update, remove")
+        return normalized
+
+    def validation_error(self) -> Optional[str]:
+        """
+        Check the values like ReadingListBase does, normalizing the status.
+
+        Run per operation by the route, so that one invalid operation gets
+        its own 400 result instead of rejecting the whole batch.
+        """
+        try:
+            if self.status is not None:
+                self.status = normalize_reading_status(self.status)
+            validate_progress_pages(self.progresspages)
+            validate_user_rating(self.userrating)
+        except ValueError as e:
+            return str(e)
+        return None
+
+
+class ReadingListBatchRequest(BaseModel):
+    operations: List[ReadingListBatchOperation] = Field(
+        ..., min_length=1, max_length=READING_LIST_BATCH_LIMIT
+    )
+
+
+class ReadingListBatchResult(BaseModel):
+    index: int
+    op: str
+    bookid: int
+    status_code: int
+    detail: Optional[str] = None
+    item: Optional[ReadingListItemResponse] = None
+
+
+class ReadingListBatchResponse(BaseModel):
+    results: List[ReadingListBatchResult]
+    succeeded: int
+    failed: int
+
+
+class BookCompactResponse(BaseModel):
+    """Book fields without the (large) description, for list views"""
+
+    bookid: int
+    title: str
+    bookformat: Optional[str] = None
+    pages: Optional[int] = None
+    averagerating: Optional[float] = None
+    totalratings: Optional[int] = None
+    reviewscount: Optional[int] = None
+    isbn: str
+    isbn13: Optional[str] = None
+    imageurl: Optional[str] = None
+    goodreadslink: Optional[str] = None
+    authors: List[AuthorResponse] = []
+    genres: List[GenreResponse] = []
+
+    class Config:
+        from_attributes = True
+
+
+class ReadingListCompactResponse(ReadingListBase):
+    userid: int
+    bookid: int
+    addedat: datetime
+    book: BookCompactResponse
+
+    class Config:
+        from_attributes = True
+
+
+class TrendingBookResponse(BaseModel):
+    """A trending book with how many readers shelved it in the window"""
+
+    bookid: int
+    title: str
+    imageurl: Optional[str] = None
+    averagerating: Optional[float] = None
+    adds: int
+
+
+class RelatedBookResponse(BaseModel):
+    """A recommended book with its similarity score"""
+
+    bookid: int
+    title: str
+    imageurl: Optional[str] = None
+    averagerating: Optional[float] = None
+    score: float
+
+
+class BookLookupRequest(BaseModel):
+    bookids: List[int] = []
+    isbns: List[str] = Field([], description="ISBN-10 or ISBN-13, hyphens allowed")
+
+
+class BookLookupItem(BaseModel):
+    bookid: Optional[int] = None
+    isbn: Optional[str] = None
+    found: bool
+    book: Optional[BookResponse] = None
+
+
+class BookLookupResponse(BaseModel):
+    items: List[BookLookupItem]
+    missing_bookids: List[int]
+    missing_isbns: List[str]
+    invalid_isbns: List[str]
+
+
+class BookBulkResponse(BaseModel):
+    created: List[int]
+    duplicates: List[str]
+
+
 class PaginatedBookResponse(BaseModel):
     items: List[BookResponse]
     total: int
@@ -253,6 +583,26 @@ class PaginatedBookResponse(BaseModel):
     pages: int
 
 
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    path: str = Field(..., description="GET path with query string, e.g. /books/1")
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+
+class BatchItemResponse(BaseModel):
+    id: Optional[str] = None
+    path: str
+    status: int
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchItemResponse]
+
+
 # Count query function example
 def count_books(db):
     """Count the number of books in the database"""
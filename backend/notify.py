@@ -0,0 +1,154 @@
+"""
+Postgres LISTEN/NOTIFY, shared by everything in a process that needs it.
+
+One background thread per process holds a dedicated connection, LISTENs on
+every subscribed channel and calls the channel's handlers with each payload.
+If the connection drops it reconnects with backoff and calls each
+subscriber's `on_reconnect`, since notifications sent meanwhile are lost.
+"""
+
+import logging
+import select
+import threading
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from config import engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for new subscriptions and shutdown
+POLL_INTERVAL = 1.0
+MAX_BACKOFF = 30.0
+
+
+def publish(channel: str, payload: str, connection=None) -> None:
+    """
+    Send a notification.
+
+    Pass the connection (or session) of an open transaction to send it only
+    if and when that transaction commits; otherwise it is sent right away.
+    """
+    statement = text("SELECT pg_notify(:channel, :payload)")
+    params = {"channel": channel, "payload": payload}
+    if connection is not None:
+        connection.execute(statement, params)
+        return
+    with engine.begin() as conn:
+        conn.execute(statement, params)
+
+
+class Listener:
+    """Dispatches notifications on subscribed channels to their handlers"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._reconnect_handlers: List[Callable[[], None]] = []
+        self._listening: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        on_reconnect: Optional[Callable[[], None]] = None,
+    ) -> None:
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+            if on_reconnect:
+                self._reconnect_handlers.append(on_reconnect)
+
+    def start(self) -> None:
+        if self._thread is None and self._handlers:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="pg-listener", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=POLL_INTERVAL * 2)
+            self._thread = None
+
+    def _run(self) -> None:
+        backoff = 1.0
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                connection = self._connect()
+            except Exception as e:
+                logger.warning("LISTEN connection failed: %s", e)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+
+            backoff = 1.0
+            if connected_before:
+                for handler in list(self._reconnect_handlers):
+                    self._call(handler)
+            connected_before = True
+            try:
+                self._listen(connection)
+            except Exception as e:
+                logger.warning("LISTEN connection lost: %s", e)
+            finally:
+                self._listening = set()
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+    def _connect(self):
+        # A dedicated DBAPI connection, detached so the pool never reuses it
+        connection = self.engine.raw_connection()
+        connection.detach()
+        dbapi_connection = connection.driver_connection
+        dbapi_connection.autocommit = True
+        return dbapi_connection
+
+    def _listen(self, connection) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                channels = set(self._handlers) - self._listening
+            if channels:
+                with connection.cursor() as cursor:
+                    for channel in channels:
+                        cursor.execute(f'LISTEN "{channel}"')
+                self._listening |= channels
+
+            for notification in self._wait(connection):
+                with self._lock:
+                    handlers = list(self._handlers.get(notification.channel, []))
+                for handler in handlers:
+                    self._call(handler, notification.payload)
+
+    @staticmethod
+    def _wait(connection) -> list:
+        """Notifications received within POLL_INTERVAL"""
+        if hasattr(connection, "poll"):
+            # psycopg2
+            notifications = []
+            if select.select([connection], [], [], POLL_INTERVAL)[0]:
+                connection.poll()
+                while connection.notifies:
+                    notifications.append(connection.notifies.pop(0))
+            return notifications
+        # psycopg 3
+        return list(connection.notifies(timeout=POLL_INTERVAL))
+
+    @staticmethod
+    def _call(handler, *args) -> None:
+        try:
+            handler(*args)
+        except Exception:
+            logger.exception("Notification handler failed")
+
+
+listener = Listener(engine)
@@ -0,0 +1,196 @@
+"""
+Write-coalescing buffer for reading progress updates.
+
+E-reader integrations report progress on every page turn. Instead of a
+read-modify-commit per report, PATCH /readinglist/{user_id}/{book_id}/progress
+puts the page number in this worker's buffer, keyed by (user, book), where a
+newer report replaces an older one. The progress_flush job writes the buffer
+out every PROGRESS_FLUSH_SECONDS (and a request does so itself when the
+buffer is full or the job is overdue), and shutdown flushes what is left.
+A flush is one transaction: lock the affected rows, write every value with a
+single UPDATE ... FROM (VALUES ...), and move the users' pages_read counters
+with one multi-row upsert.
+
+Reads of a reading list in the same worker overlay the buffered values.
+Other writes to an item through this worker discard its buffered value
+first, waiting for a flush that is writing it, so an older page number never
+overwrites their newer value. (A client reporting progress through one
+worker and editing the item through another can still see the report land
+after the edit, within PROGRESS_FLUSH_SECONDS.) Progress for a book that is no longer
+on the list when the buffer is flushed is dropped.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import Integer, column, select, text, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+import reading_stats
+from config import PROGRESS_BUFFER_MAX, PROGRESS_FLUSH_SECONDS
+from models import ReadingList, UserReadingStats
+
+# (user_id, book_id)
+Key = Tuple[int, int]
+
+_buffer: Dict[Key, int] = {}
+_lock = threading.Lock()
+# One flush at a time per worker, so flushes apply in the order they took
+# their values
+_flush_lock = threading.Lock()
+# Keys of the batch a flush is writing
+_in_flight: Set[Key] = set()
+_last_flush = time.monotonic()
+_counts = {"accepted": 0, "flushes": 0, "rows_written": 0, "dropped": 0}
+
+
+def accept(user_id: int, book_id: int, pages: int) -> bool:
+    """Buffer a progress report; True if the caller should flush now"""
+    with _lock:
+        _buffer[(user_id, book_id)] = pages
+        _counts["accepted"] += 1
+        return (
+            len(_buffer) >= PROGRESS_BUFFER_MAX
+            or time.monotonic() - _last_flush > 2 * PROGRESS_FLUSH_SECONDS
+        )
+
+
+def discard(user_id: int, book_ids: Iterable[int]) -> None:
+    """
+    Forget buffered progress that another write supersedes.
+
+    Called before that write. If a flush is writing one of the items, this
+    waits for it to commit (or fail and put its values back), so the write
+    always lands after, and over, the buffered value.
+    """
+    keys = [(user_id, book_id) for book_id in book_ids]
+    with _lock:
+        if not _in_flight.intersection(keys):
+            for key in keys:
+                _buffer.pop(key, None)
+            return
+    with _flush_lock:
+        with _lock:
+            for key in keys:
+                _buffer.pop(key, None)
+
+
+def overlay(items: Iterable[ReadingList]) -> None:
+    """Show buffered progress on loaded items without dirtying the session"""
+    if not _buffer:
+        return
+    for item in items:
+        pages = _buffer.get((item.userid, item.bookid))
+        if pages is not None:
+            set_committed_value(item, "progresspages", pages)
+
+
+def flush(db: Session) -> int:
+    """Write out everything buffered; returns the number of rows changed"""
+    global _last_flush
+    with _flush_lock:
+        with _lock:
+            batch = dict(_buffer)
+            _buffer.clear()
+            _in_flight.update(batch)
+            _last_flush = time.monotonic()
+        if not batch:
+            return 0
+        try:
+            found, written, users = _write(db, batch)
+        except Exception:
+            db.rollback()
+            with _lock:
+                # Keep the values for the next flush, unless newer ones
+                # arrived; writes waiting in discard() drop them afterwards
+                for key, pages in batch.items():
+                    _buffer.setdefault(key, pages)
+            raise
+        finally:
+            with _lock:
+                _in_flight.clear()
+
+    with _lock:
+        _counts["flushes"] += 1
+        _counts["rows_written"] += written
+        _counts["dropped"] += len(batch) - found
+    for user_id in users:
+        reading_stats.invalidate(user_id, announced=True)
+    return written
+
+
+def _write(db: Session, batch: Dict[Key, int]) -> Tuple[int, int, set]:
+    """
+    Apply a batch in one transaction.
+
+    Returns the rows found, the rows changed and the users whose pages_read
+    moved.
+    """
+    table = ReadingList.__table__
+    # Lock the rows in a fixed order, so concurrent flushes cannot deadlock,
+    # and read the values they replace for the pages_read delta
+    current = {
+        (row.userid, row.bookid): row.progresspages
+        for row in db.execute(
+            select(table.c.userid, table.c.bookid, table.c.progresspages)
+            .where(tuple_(table.c.userid, table.c.bookid).in_(list(batch)))
+            .order_by(table.c.userid, table.c.bookid)
+            .with_for_update()
+        )
+    }
+    changed = {
+        key: pages
+        for key, pages in batch.items()
+        if key in current and current[key] != pages
+    }
+    if not changed:
+        db.commit()
+        return len(current), 0, set()
+
+    incoming = values(
+        column("userid", Integer),
+        column("bookid", Integer),
+        column("progresspages", Integer),
+        name="incoming",
+    ).data([(user_id, book_id, pages) for (user_id, book_id), pages in changed.items()])
+    db.execute(
+        update(table)
+        .where(table.c.userid == incoming.c.userid, table.c.bookid == incoming.c.bookid)
+        .values(progresspages=incoming.c.progresspages)
+    )
+
+    deltas: Dict[int, int] = {}
+    for (user_id, book_id), pages in changed.items():
+        old_pages = current[(user_id, book_id)] or 0
+        deltas[user_id] = deltas.get(user_id, 0) + pages - old_pages
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if deltas:
+        stats = UserReadingStats.__table__
+        upsert = insert(stats).values(
+            [
+                {"userid": user_id, "pages_read": delta}
+                for user_id, delta in deltas.items()
+            ]
+        )
+        db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[stats.c.userid],
+                set_={
+                    "pages_read": stats.c.pages_read + upsert.excluded.pages_read,
+                    "updatedat": text("NOW()"),
+                },
+            )
+        )
+        for user_id in deltas:
+            reading_stats.announce_change(db, user_id)
+    db.commit()
+    return len(current), len(changed), set(deltas)
+
+
+def status() -> dict:
+    """Counters since startup, for GET /admin/progress-buffer"""
+    with _lock:
+        return {**_counts, "buffered": len(_buffer)}
@@ -0,0 +1,184 @@
+"""
+Statement timeouts per route class, and cancellation of a request's queries
+when its client disconnects.
+
+Every transaction a request's sessions begin starts with SET LOCAL
+statement_timeout for the route's class: "read" for GET routes, "write" for
+the others, unless the endpoint is marked with @statement_timeout(...),
+e.g. "bulk" for imports, or None for routes that run maintenance jobs and
+must not be limited. Postgres then cancels any statement that runs longer,
+and the error handlers in main.py answer 504 instead of holding the
+connection until the query finishes on its own.
+
+QueryGuardMiddleware also watches each HTTP request for the client going
+away. If it does mid-request, the queries the request is running are
+cancelled server-side, so an abandoned request frees its pool connection
+at once instead of after its query completes.
+"""
+
+import asyncio
+import contextvars
+import threading
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from config import (
+    STATEMENT_TIMEOUT_BULK_MS,
+    STATEMENT_TIMEOUT_READ_MS,
+    STATEMENT_TIMEOUT_WRITE_MS,
+)
+
+TIMEOUTS_MS = {
+    "read": STATEMENT_TIMEOUT_READ_MS,
+    "write": STATEMENT_TIMEOUT_WRITE_MS,
+    "bulk": STATEMENT_TIMEOUT_BULK_MS,
+}
+_UNSET = object()
+# SQLSTATE of a statement cancelled by statement_timeout or a cancel request
+QUERY_CANCELED = "57014"
+
+
+def statement_timeout(route_class: Optional[str]):
+    """Mark an endpoint's route class; None exempts it from the guard"""
+    if route_class is not None and route_class not in TIMEOUTS_MS:
+        raise ValueError(f"Unknown route class {route_class!r}")
+
+    def decorate(endpoint):
+        endpoint.statement_timeout_class = route_class
+        return endpoint
+
+    return decorate
+
+
+class _RequestGuard:
+    """The DBAPI connections an HTTP request has in a transaction"""
+
+    def __init__(self, scope: dict):
+        # Routing fills in scope["endpoint"] before any session is used
+        self.scope = scope
+        self.connections = set()
+        self.lock = threading.Lock()
+
+    def route_class(self) -> Optional[str]:
+        endpoint = self.scope.get("endpoint")
+        route_class = getattr(endpoint, "statement_timeout_class", _UNSET)
+        if route_class is not _UNSET:
+            return route_class
+        return "read" if self.scope.get("method") in ("GET", "HEAD") else "write"
+
+    def cancel(self) -> None:
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.cancel()
+            except Exception:
+                pass
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("query_guard", default=None)
+
+
+@event.listens_for(Session, "after_begin")
+def _after_begin(session, transaction, connection):
+    guard = _current.get()
+    if guard is None:
+        return
+    route_class = guard.route_class()
+    if route_class is None:
+        return
+    timeout = TIMEOUTS_MS[route_class]
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+    dbapi_connection = connection.connection.driver_connection
+    session.info["query_guard"] = (guard, dbapi_connection)
+    with guard.lock:
+        guard.connections.add(dbapi_connection)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session, transaction):
+    if transaction.parent is not None:
+        return
+    registered = session.info.pop("query_guard", None)
+    if registered is not None:
+        guard, dbapi_connection = registered
+        with guard.lock:
+            guard.connections.discard(dbapi_connection)
+
+
+class QueryGuardMiddleware:
+    """Cancel a request's running queries if its client disconnects"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        guard = _RequestGuard(scope)
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = False
+
+        async def watch():
+            # Read ahead of the app, so a disconnect is seen while a sync
+            # endpoint is busy in its thread
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    await asyncio.to_thread(guard.cancel)
+                    return
+
+        async def guarded_receive():
+            if disconnected and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        token = _current.set(guard)
+        watcher = asyncio.create_task(watch())
+        try:
+            await self.app(scope, guarded_receive, send)
+        finally:
+            watcher.cancel()
+            _current.reset(token)
+
+
+def current_route() -> Optional[str]:
+    """Method and route path of the request this thread is serving, if any"""
+    guard = _current.get()
+    if guard is None:
+        return None
+    route = guard.scope.get("route")
+    path = getattr(route, "path", None) or guard.scope.get("path")
+    return f"{guard.scope.get('method')} {path}"
+
+
+def _causes(exc: BaseException):
+    while exc is not None:
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def query_canceled(exc: BaseException) -> bool:
+    """Whether exc is, or was raised while handling, a cancelled statement"""
+    for cause in _causes(exc):
+        if isinstance(cause, DBAPIError):
+            orig = cause.orig
+            code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+            if code == QUERY_CANCELED:
+                return True
+    return False
+
+
+def pool_exhausted(exc: BaseException) -> bool:
+    """Whether exc comes from waiting too long for a pool connection"""
+    return any(isinstance(cause, PoolTimeoutError) for cause in _causes(exc))
@@ -0,0 +1,179 @@
+"""
+Reading list change feed, streamed to clients as Server-Sent Events.
+
+Triggers on readinglist (sql/DDL/12_create_readinglistevent.sql) record
+every add, update and remove in readinglist_event, in the same transaction
+as the change, and NOTIFY the readinglist_events channel with the user ID.
+Each worker's shared LISTEN thread (notify.listener) wakes that user's open
+streams, and each stream reads its new events from the table. Event IDs
+are readinglist_event.EventID, so a client that reconnects with the
+standard Last-Event-ID header resumes where it left off. A client whose
+position was pruned (older than READINGLIST_EVENT_RETENTION_HOURS) gets a
+`reset` event and should reload the list.
+
+Streams hold no database connection while idle: each wakeup reads the new
+events with a short-lived session on the primary, which the notification
+proves has them.
+"""
+
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+import notify
+from config import SSE_KEEPALIVE_SECONDS, SessionLocal
+from models import ReadingListEvent
+
+CHANNEL = "readinglist_events"
+# Events read per query; a stream that is further behind reads again
+FETCH_LIMIT = 500
+# Milliseconds browsers wait before reconnecting a dropped stream
+RETRY_MS = 3000
+
+
+class ChangeFeed:
+    """This worker's open streams, woken by notifications for their user"""
+
+    def __init__(self):
+        self._waiters: Dict[
+            int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]
+        ] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self, user_id: int):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(user_id, set()).add(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(user_id, set())
+                waiters.discard(waiter)
+                if not waiters:
+                    self._waiters.pop(user_id, None)
+
+    def wake(self, user_id: Optional[int] = None) -> None:
+        """Wake a user's streams, or every stream; safe from any thread"""
+        with self._lock:
+            if user_id is None:
+                waiters = [w for group in self._waiters.values() for w in group]
+            else:
+                waiters = list(self._waiters.get(user_id, ()))
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+
+feed = ChangeFeed()
+
+
+def _on_notify(payload: str) -> None:
+    feed.wake(int(payload))
+
+
+def _on_reconnect() -> None:
+    # Notifications sent while the listener was down were lost; every
+    # stream catches up from the table
+    feed.wake()
+
+
+notify.listener.subscribe(CHANNEL, _on_notify, _on_reconnect)
+
+
+def latest_id(db: Session, user_id: int) -> int:
+    return db.scalar(
+        select(func.coalesce(func.max(ReadingListEvent.eventid), 0)).where(
+            ReadingListEvent.userid == user_id
+        )
+    )
+
+
+def is_pruned(db: Session, last_event_id: int) -> bool:
+    """Whether events after `last_event_id` may have been pruned"""
+    oldest = db.scalar(select(func.min(ReadingListEvent.eventid)))
+    return oldest is not None and last_event_id + 1 < oldest
+
+
+def fetch_since(
+    db: Session, user_id: int, last_event_id: int
+) -> List[ReadingListEvent]:
+    return db.scalars(
+        select(ReadingListEvent)
+        .where(
+            ReadingListEvent.userid == user_id,
+            ReadingListEvent.eventid > last_event_id,
+        )
+        .order_by(ReadingListEvent.eventid)
+        .limit(FETCH_LIMIT)
+    ).all()
+
+
+def prune(db: Session, retention_hours: int) -> int:
+    """Delete events older than the retention window; returns how many"""
+    cutoff = text("NOW() - make_interval(hours => :hours)").bindparams(
+        hours=retention_hours
+    )
+    result = db.execute(
+        delete(ReadingListEvent).where(ReadingListEvent.createdat < cutoff)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def _with_session(func_, *args):
+    db = SessionLocal()
+    try:
+        return func_(db, *args)
+    finally:
+        db.close()
+
+
+def _format(event: ReadingListEvent) -> str:
+    data = {
+        "bookid": event.bookid,
+        "item": event.item,
+        "at": event.createdat.isoformat() if event.createdat else None,
+    }
+    return f"id: {event.eventid}\nevent: {event.op}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream(
+    request: Request, user_id: int, last_event_id: Optional[int]
+) -> AsyncIterator[str]:
+    """SSE messages for a user's changes after `last_event_id` (or from now)"""
+    with feed.subscribe(user_id) as wakeup:
+        yield f"retry: {RETRY_MS}\n\n"
+        if last_event_id is None:
+            last_event_id = await asyncio.to_thread(_with_session, latest_id, user_id)
+        elif await asyncio.to_thread(_with_session, is_pruned, last_event_id):
+            last_event_id = await asyncio.to_thread(_with_session, latest_id, user_id)
+            yield f"id: {last_event_id}\nevent: reset\ndata: {{}}\n\n"
+
+        while True:
+            # Cleared before reading, so a change committed meanwhile wakes
+            # the next iteration instead of being missed
+            wakeup.clear()
+            events = await asyncio.to_thread(
+                _with_session, fetch_since, user_id, last_event_id
+            )
+            for event in events:
+                yield _format(event)
+                last_event_id = event.eventid
+            if len(events) == FETCH_LIMIT:
+                continue
+
+            while not wakeup.is_set():
+                try:
+                    await asyncio.wait_for(wakeup.wait(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
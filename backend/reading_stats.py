@@ -0,0 +1,233 @@
+"""
+Per-user reading statistics kept in the user_reading_stats table.
+
+The reading list routes apply the item_delta() of each change with
+apply_delta() inside their own transaction, so the stored counters always
+move together with the reading list rows. Run
+this module as a script to backfill or repair the table:
+
+    python reading_stats.py            # rebuild every user's row
+    python reading_stats.py --user 12  # rebuild selected users
+    python reading_stats.py --check    # report users whose row has drifted
+"""
+
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from cache import Cache
+from config import READ_YOUR_WRITES_SECONDS
+from models import ReadingList, UserReadingStats
+
+# (status, userrating, progresspages) of a reading list item
+ItemSnapshot = Tuple[str, Optional[float], Optional[int]]
+
+STATUS_COLUMNS = {
+    "WANT": "want_count",
+    "READING": "reading_count",
+    "COMPLETED": "completed_count",
+    "DROPPED": "dropped_count",
+}
+
+# Seconds a stats payload may be served from the in-process cache
+STATS_CACHE_TTL = 60
+
+_cache = Cache("reading_stats", STATS_CACHE_TTL)
+
+
+def snapshot(item: Optional[ReadingList]) -> Optional[ItemSnapshot]:
+    """Capture the fields of a reading list item that feed the statistics"""
+    if item is None:
+        return None
+    return (item.status, item.userrating, item.progresspages)
+
+
+def _contribution(item: Optional[ItemSnapshot]) -> Dict[str, float]:
+    """Counter values a single item adds to its user's row"""
+    values = {column: 0 for column in STATUS_COLUMNS.values()}
+    values.update(rating_sum=0, rating_count=0, pages_read=0)
+    if item is None:
+        return values
+
+    status, rating, pages = item
+    values[STATUS_COLUMNS[status]] = 1
+    if rating is not None:
+        values["rating_sum"] = float(rating)
+        values["rating_count"] = 1
+    values["pages_read"] = pages or 0
+    return values
+
+
+def item_delta(
+    old: Optional[ItemSnapshot], new: Optional[ItemSnapshot]
+) -> Dict[str, float]:
+    """Counter changes for one item going from `old` to `new`"""
+    before, after = _contribution(old), _contribution(new)
+    return {column: after[column] - before[column] for column in after}
+
+
+def apply_delta(db: Session, user_id: int, delta: Dict[str, float]) -> None:
+    """Increment a user's counters, creating the row on first use"""
+    table = UserReadingStats.__table__
+    stmt = insert(table).values(userid=user_id, **delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.userid],
+        set_={
+            **{column: table.c[column] + delta[column] for column in delta},
+            "updatedat": text("NOW()"),
+        },
+    )
+    db.execute(stmt)
+
+
+def stats_to_dict(row: Optional[UserReadingStats]) -> dict:
+    """Shape a stats row like the /readinglist/stats response"""
+    if row is None:
+        counts = {status: 0 for status in STATUS_COLUMNS}
+        rating_sum, rating_count, pages_read = 0.0, 0, 0
+    else:
+        counts = {
+            status: getattr(row, column) for status, column in STATUS_COLUMNS.items()
+        }
+        rating_sum, rating_count = row.rating_sum, row.rating_count
+        pages_read = row.pages_read
+
+    return {
+        "total_books": sum(counts.values()),
+        "average_rating": rating_sum / rating_count if rating_count else None,
+        "pages_read": pages_read,
+        "status_counts": {status.lower(): count for status, count in counts.items()},
+    }
+
+
+def get_cached(user_id: int) -> Optional[dict]:
+    """Return a cached stats payload if it is still fresh"""
+    return _cache.get(user_id)
+
+
+def set_cached(user_id: int, stats: dict, from_replica: bool = False) -> None:
+    """
+    Cache a stats payload. Stats read from a replica are not cached within
+    READ_YOUR_WRITES_SECONDS of a write, since they may predate it.
+    """
+    _cache.set(
+        user_id,
+        stats,
+        unless_dropped_within=READ_YOUR_WRITES_SECONDS if from_replica else 0,
+    )
+
+
+def announce_change(db: Session, user_id: int) -> None:
+    """Within a write: other workers drop the user's cached stats on commit"""
+    _cache.announce(user_id, db)
+
+
+def invalidate(user_id: int, announced: bool = False) -> None:
+    """
+    Drop a user's cached stats after a reading list write; `announced` if
+    the write called announce_change()
+    """
+    _cache.invalidate(user_id, broadcast=not announced)
+
+
+_REBUILD_SQL = """
+INSERT INTO user_reading_stats (
+    userid, want_count, reading_count, completed_count, dropped_count,
+    rating_sum, rating_count, pages_read, updatedat
+)
+SELECT
+    u.userid,
+    COUNT(*) FILTER (WHERE r.status = 'WANT'),
+    COUNT(*) FILTER (WHERE r.status = 'READING'),
+    COUNT(*) FILTER (WHERE r.status = 'COMPLETED'),
+    COUNT(*) FILTER (WHERE r.status = 'DROPPED'),
+    COALESCE(SUM(r.userrating), 0),
+    COUNT(r.userrating),
+    COALESCE(SUM(r.progresspages), 0),
+    NOW()
+FROM "User" u
+LEFT JOIN readinglist r ON r.userid = u.userid
+{where}
+GROUP BY u.userid
+ON CONFLICT (userid) DO UPDATE SET
+    want_count = EXCLUDED.want_count,
+    reading_count = EXCLUDED.reading_count,
+    completed_count = EXCLUDED.completed_count,
+    dropped_count = EXCLUDED.dropped_count,
+    rating_sum = EXCLUDED.rating_sum,
+    rating_count = EXCLUDED.rating_count,
+    pages_read = EXCLUDED.pages_read,
+    updatedat = EXCLUDED.updatedat
+"""
+
+_DRIFT_SQL = """
+SELECT u.userid
+FROM "User" u
+LEFT JOIN readinglist r ON r.userid = u.userid
+LEFT JOIN user_reading_stats s ON s.userid = u.userid
+GROUP BY u.userid, s.userid
+HAVING s.userid IS NULL AND COUNT(r.bookid) > 0
+    OR MAX(s.want_count) <> COUNT(*) FILTER (WHERE r.status = 'WANT')
+    OR MAX(s.reading_count) <> COUNT(*) FILTER (WHERE r.status = 'READING')
+    OR MAX(s.completed_count) <> COUNT(*) FILTER (WHERE r.status = 'COMPLETED')
+    OR MAX(s.dropped_count) <> COUNT(*) FILTER (WHERE r.status = 'DROPPED')
+    OR MAX(s.rating_count) <> COUNT(r.userrating)
+    OR ABS(MAX(s.rating_sum) - COALESCE(SUM(r.userrating), 0)) > 0.001
+    OR MAX(s.pages_read) <> COALESCE(SUM(r.progresspages), 0)
+ORDER BY u.userid
+"""
+
+
+def rebuild_stats(db: Session, user_ids: Optional[Sequence[int]] = None) -> int:
+    """Recompute stats rows from the reading list; returns rows written"""
+    if user_ids:
+        sql = _REBUILD_SQL.format(where="WHERE u.userid = ANY(:user_ids)")
+        result = db.execute(text(sql), {"user_ids": list(user_ids)})
+        for user_id in user_ids:
+            announce_change(db, user_id)
+        db.commit()
+        for user_id in user_ids:
+            invalidate(user_id, announced=True)
+    else:
+        result = db.execute(text(_REBUILD_SQL.format(where="")))
+        db.commit()
+        _cache.clear()
+    return result.rowcount
+
+
+def find_drift(db: Session) -> List[int]:
+    """Return the users whose stored stats disagree with their reading list"""
+    return [row.userid for row in db.execute(text(_DRIFT_SQL))]
+
+
+def main():
+    from config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Backfill user_reading_stats")
+    parser.add_argument("--user", type=int, action="append", help="user id")
+    parser.add_argument(
+        "--check", action="store_true", help="only report drifted users"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.check:
+            drifted = find_drift(db)
+            print(f"\n📊 {len(drifted)} users with drifted reading stats")
+            if drifted:
+                print("   " + ", ".join(str(user_id) for user_id in drifted[:50]))
+            return
+
+        print("\n🔄 Rebuilding reading stats...")
+        written = rebuild_stats(db, args.user)
+        print(f"✅ Rebuilt stats for {written} users")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Personalised "for you" recommendations for a user's reading list.
+
+A user's taste is summarised as genre and author affinity vectors, taken from
+their COMPLETED items and anything they rated highly. Every book in the
+catalog is scored at once with sparse matrix-vector products against
+precomputed (L2-normalised) book x genre and book x author matrices, blended
+with a global popularity prior from averagerating and totalratings. Books
+already on the list are excluded.
+"""
+
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from cache import Cache
+from config import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+GENRE_WEIGHT = 0.5
+AUTHOR_WEIGHT = 0.3
+POPULARITY_WEIGHT = 0.2
+# Ratings at or above this count towards the profile whatever the status
+HIGH_RATING = 4.0
+# Results are computed and cached for this many books; requests slice them
+MAX_RECOMMENDATIONS = 50
+RECOMMENDATIONS_CACHE_TTL = 600
+# Catalog features older than this are rebuilt in the background
+FEATURES_MAX_AGE = 3600
+
+
+class CatalogFeatures:
+    """Per-book genre/author matrices and popularity prior for scoring"""
+
+    def __init__(self, db: Session):
+        book_rows = db.execute(
+            text("SELECT bookid, averagerating, totalratings FROM book ORDER BY bookid")
+        ).all()
+        self.book_ids = np.array([row[0] for row in book_rows], dtype=np.int64)
+        rating = np.array([row[1] or 0 for row in book_rows], dtype=np.float32)
+        votes = np.array([row[2] or 0 for row in book_rows], dtype=np.float32)
+
+        popularity = rating * np.log1p(votes)
+        peak = popularity.max() if len(popularity) else 0
+        self.popularity = popularity / peak if peak > 0 else popularity
+
+        self.genres = self._link_matrix(db, "bookgenre", "genreid")
+        self.authors = self._link_matrix(db, "bookauthor", "authorid")
+        self.built_at = time.monotonic()
+
+    def _link_matrix(self, db: Session, table: str, column: str) -> sparse.csr_matrix:
+        """Book x tag matrix with unit-length rows"""
+        links = np.array(
+            db.execute(text(f"SELECT bookid, {column} FROM {table}")).all(),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        rows, known = self.locate(links[:, 0])
+        matrix = sparse.csr_matrix(
+            (
+                np.ones(int(known.sum()), dtype=np.float32),
+                (rows[known], links[known, 1]),
+            ),
+            shape=(len(self.book_ids), int(links[:, 1].max(initial=0)) + 1),
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        return sparse.diags(1 / np.where(norms == 0, 1, norms)) @ matrix
+
+    def locate(self, book_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Row index of each book, and a mask of which books are in the catalog"""
+        if len(self.book_ids) == 0:
+            return np.zeros(len(book_ids), np.int64), np.zeros(len(book_ids), bool)
+        rows = np.minimum(
+            np.searchsorted(self.book_ids, book_ids), len(self.book_ids) - 1
+        )
+        return rows, self.book_ids[rows] == book_ids
+
+
+_features: Optional[CatalogFeatures] = None
+_features_lock = threading.Lock()
+_cache = Cache("recommendations", RECOMMENDATIONS_CACHE_TTL)
+
+
+def get_features(db: Session, refresh: bool = False) -> CatalogFeatures:
+    """
+    Return the shared catalog features, building them on first use.
+
+    Stale features are still served, so a request never waits for a rebuild;
+    the recommend_features job rebuilds them (refresh=True), or a background
+    thread does when the job has not run in time.
+    """
+    global _features
+    features = _features
+    if features is not None and not refresh:
+        if time.monotonic() - features.built_at > FEATURES_MAX_AGE:
+            _rebuild_in_background()
+        return features
+    with _features_lock:
+        if _features is None or refresh:
+            _features = CatalogFeatures(db)
+        return _features
+
+
+def _rebuild_in_background() -> None:
+    if not _features_lock.acquire(blocking=False):
+        # Already being rebuilt
+        return
+
+    def rebuild():
+        global _features
+        db = SessionLocal()
+        try:
+            _features = CatalogFeatures(db)
+        except Exception:
+            logger.exception("Rebuilding recommendation features failed")
+        finally:
+            db.close()
+            _features_lock.release()
+
+    threading.Thread(target=rebuild, name="recommend-features", daemon=True).start()
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def score_books(
+    features: CatalogFeatures,
+    book_ids: np.ndarray,
+    statuses: np.ndarray,
+    ratings: np.ndarray,
+    k: int = MAX_RECOMMENDATIONS,
+) -> List[Tuple[int, float]]:
+    """Rank unshelved books for a user given their reading list items"""
+    rated = ~np.isnan(ratings)
+    liked = (statuses == "COMPLETED") | (rated & (ratings >= HIGH_RATING))
+    # Completed-but-unrated items count as mildly positive (3.5 of 5)
+    weights = np.where(rated, ratings, 3.5)[liked] / 5.0
+    liked_rows, found = features.locate(book_ids[liked])
+    liked_rows, weights = liked_rows[found], weights[found]
+
+    scores = POPULARITY_WEIGHT * features.popularity
+    if len(liked_rows):
+        genre_taste = _unit(features.genres[liked_rows].T @ weights)
+        author_taste = _unit(features.authors[liked_rows].T @ weights)
+        scores = (
+            scores
+            + GENRE_WEIGHT * (features.genres @ genre_taste)
+            + AUTHOR_WEIGHT * (features.authors @ author_taste)
+        )
+
+    scores = scores.astype(np.float32, copy=True)
+    shelved_rows, found = features.locate(book_ids)
+    scores[shelved_rows[found]] = -np.inf
+    take = min(k, len(scores))
+    if take == 0:
+        return []
+    top = np.argpartition(-scores, take - 1)[:take]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [
+        (int(features.book_ids[row]), float(scores[row]))
+        for row in top
+        if np.isfinite(scores[row])
+    ]
+
+
+def recommend_for_user(db: Session, user_id: int) -> List[Tuple[int, float]]:
+    """Top MAX_RECOMMENDATIONS (bookid, score) pairs for a user"""
+    items = db.execute(
+        text(
+            "SELECT bookid, status, userrating FROM readinglist WHERE userid = :user_id"
+        ),
+        {"user_id": user_id},
+    ).all()
+    book_ids = np.array([row[0] for row in items], dtype=np.int64)
+    statuses = np.array([row[1] for row in items], dtype=object)
+    ratings = np.array(
+        [np.nan if row[2] is None else float(row[2]) for row in items],
+        dtype=np.float32,
+    )
+    return score_books(get_features(db), book_ids, statuses, ratings)
+
+
+def get_cached(user_id: int) -> Optional[list]:
+    return _cache.get(user_id)
+
+
+def set_cached(user_id: int, recommendations: list) -> None:
+    _cache.set(user_id, recommendations)
+
+
+def announce_change(db: Session, user_id: int) -> None:
+    """Within a write: other workers drop the user's recommendations on commit"""
+    _cache.announce(user_id, db)
+
+
+def invalidate(user_id: int, announced: bool = False) -> None:
+    """
+    Drop a user's cached recommendations after a reading list write;
+    `announced` if the write called announce_change()
+    """
+    _cache.invalidate(user_id, broadcast=not announced)
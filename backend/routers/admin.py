@@ -0,0 +1,111 @@
+"""
+Admin router for operational status and maintenance
+"""
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+import catalog_engine
+import logging_config
+import progress_buffer
+import query_guard
+import slow_queries
+from auth import get_current_admin
+from models import User
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def _get_scheduler(request: Request):
+    scheduler = getattr(request.app.state, "scheduler", None)
+    if scheduler is None:
+        raise HTTPException(status_code=503, detail="Scheduler is not running")
+    return scheduler
+
+
+@router.get("/jobs", response_model=List[dict])
+def read_jobs(request: Request, admin: User = Depends(get_current_admin)):
+    """
+    Get the status and timing metrics of every background job in this worker.
+    """
+    return _get_scheduler(request).status()
+
+
+@router.post("/jobs/{job_name}/run", response_model=dict)
+# Jobs set their own limits and finish even if the caller goes away
+@query_guard.statement_timeout(None)
+async def run_job(
+    job_name: str, request: Request, admin: User = Depends(get_current_admin)
+):
+    """
+    Run a background job now (e.g. ANALYZE after a bulk load).
+    """
+    scheduler = _get_scheduler(request)
+    job = scheduler.jobs.get(job_name)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    ran = await scheduler.run_job(job)
+    if not ran:
+        raise HTTPException(
+            status_code=409, detail="Job is already running in another worker"
+        )
+    return job.status()
+
+
+@router.get("/progress-buffer", response_model=dict)
+def read_progress_buffer(admin: User = Depends(get_current_admin)):
+    """
+    Get this worker's buffered reading progress counters: updates accepted,
+    flushes, rows written, and updates dropped because the book had left
+    the reading list.
+    """
+    return progress_buffer.status()
+
+
+@router.get("/catalog-engine", response_model=dict)
+def read_catalog_engine(admin: User = Depends(get_current_admin)):
+    """
+    Get this worker's in-memory catalog: books and links loaded, its size,
+    changes waiting to be applied, and listings it served or left to the
+    database.
+    """
+    return catalog_engine.engine.status()
+
+
+@router.get("/logging", response_model=dict)
+def read_logging(admin: User = Depends(get_current_admin)):
+    """
+    Get this worker's log queue: records waiting for the writer thread, and
+    records dropped because the queue was full.
+    """
+    return logging_config.status()
+
+
+@router.get("/slow-queries", response_model=dict)
+def read_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    min_ms: float = Query(0, ge=0),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Get this worker's recent slow statements, newest first, with their route,
+    parameter types, duration and, for a sample, the EXPLAIN ANALYZE plan.
+    """
+    return {
+        **slow_queries.status(),
+        "queries": slow_queries.entries(limit=limit, min_ms=min_ms),
+    }
+
+
+@router.delete("/slow-queries", status_code=204)
+def clear_slow_queries(admin: User = Depends(get_current_admin)):
+    """
+    Empty this worker's slow query log.
+    """
+    slow_queries.clear()
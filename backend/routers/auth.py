@@ -2,6 +2,7 @@
 Authentication router for user registration and login
 """
 
+import logging
 from datetime import timedelta
 from typing import Optional
 
@@ -22,9 +23,12 @@ from auth import (
     create_access_token,
     get_password_hash,
 )
+import statements
 from config import get_db
 from models import User, UserCreate
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/auth",
     tags=["auth"],
@@ -38,7 +42,7 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     try:
         # Check if user already exists
-        db_user = db.query(User).filter(User.email == user.email).first()
+        db_user = statements.user_by_email(db, user.email)
         if db_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,19 +50,9 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
             )
 
         # Hash the password
-        print(f"Hashing password for {user.email}")
-        # For testing purposes only, use a simple hash if bcrypt fails
-        try:
-            hashed_password = get_password_hash(user.password)
-        except Exception as hash_err:
-            print(f"Error with bcrypt: {str(hash_err)}")
-            import hashlib
-
-            # Simple fallback hashing for testing
-            hashed_password = hashlib.sha256(user.password.encode()).hexdigest()
+        hashed_password = get_password_hash(user.password)
 
         # Create new user
-        print(f"Creating user object for {user.email}")
         display_name = (
             user.displayname or user.email.split("@")[0]
         )  # Default to username part of email
@@ -70,16 +64,13 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
             role="USER",  # Default role
         )
 
-        print(f"Adding user to session: {user.email}")
         db.add(db_user)
-
-        print("Committing to database")
         db.commit()
-
-        print("Refreshing user object")
         db.refresh(db_user)
 
-        print("Registration successful")
+        logger.info(
+            "User registered", extra={"event": "register", "userid": db_user.userid}
+        )
         return {
             "userid": db_user.userid,
             "email": db_user.email,
@@ -89,18 +80,14 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
     except SQLAlchemyError as e:
         db.rollback()
-        print(f"SQLAlchemy error: {str(e)}")
+        logger.exception("Registration failed", extra={"event": "register"})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(e)}",
         )
     except Exception as e:
         db.rollback()
-        print(f"Unexpected error: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-
-        traceback.print_exc()
+        logger.exception("Registration failed", extra={"event": "register"})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error: {str(e)}",
@@ -116,9 +103,11 @@ def login_user(
     Authenticate a user and return a JWT token
     """
     try:
-        print(f"Attempting to authenticate: {form_data.username}")
         user = authenticate_user(db, form_data.username, form_data.password)
         if not user:
+            logger.info(
+                "Login rejected", extra={"event": "login", "outcome": "rejected"}
+            )
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -131,16 +120,19 @@ def login_user(
             data={"sub": str(user.userid)},
             expires_delta=access_token_expires,
         )
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Login error: {str(e)}")
-        import traceback
-
-        traceback.print_exc()
+        logger.exception("Login failed", extra={"event": "login"})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Login error: {str(e)}",
         )
 
+    logger.info(
+        "Login succeeded",
+        extra={"event": "login", "outcome": "ok", "userid": user.userid},
+    )
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -3,9 +3,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
 
-from config import get_db
-from models import Author, BookAuthor, Book
-from models import AuthorResponse, AuthorCreate, BookResponse
+import statements
+from config import get_db, get_read_db
+from models import Author, AuthorStats, BookAuthor, BookDoc
+from models import AuthorResponse, AuthorCreate, AuthorStatsResponse, BookResponse
 
 router = APIRouter(
     prefix="/authors",
@@ -17,12 +18,16 @@ router = APIRouter(
 @router.get("/", response_model=List[AuthorResponse])
 def read_authors(
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=10000),
+    limit: int = Query(100, ge=1, le=1000),
     name: Optional[str] = None,
-    db: Session = Depends(get_db),
+    sort: Optional[str] = Query(None, pattern="^(name|popularity)$"),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get all authors with optional filtering by name.
+
+    sort=popularity orders by total ratings across the author's books (from
+    author_stats); sort=name orders alphabetically.
     """
     query = db.query(Author)
 
@@ -30,13 +35,21 @@ def read_authors(
     if name:
         query = query.filter(Author.name.ilike(f"%{name}%"))
 
+    # Apply ordering if requested
+    if sort == "popularity":
+        query = query.outerjoin(
+            AuthorStats, AuthorStats.authorid == Author.authorid
+        ).order_by(AuthorStats.total_ratings.desc().nulls_last(), Author.authorid)
+    elif sort == "name":
+        query = query.order_by(Author.name)
+
     # Apply pagination
     authors = query.offset(skip).limit(limit).all()
     return authors
 
 
 @router.get("/{author_id}", response_model=AuthorResponse)
-def read_author(author_id: int, db: Session = Depends(get_db)):
+def read_author(author_id: int, db: Session = Depends(get_read_db)):
     """
     Get an author by ID.
     """
@@ -46,12 +59,32 @@ def read_author(author_id: int, db: Session = Depends(get_db)):
     return author
 
 
+@router.get("/{author_id}/stats", response_model=AuthorStatsResponse)
+def read_author_stats(author_id: int, db: Session = Depends(get_read_db)):
+    """
+    Get aggregate statistics for an author: book count, mean rating, total
+    ratings and top genres. Served from the author_stats materialized view,
+    so figures can lag catalog writes by up to a minute.
+    """
+    stats = db.get(AuthorStats, author_id)
+    if stats is not None:
+        return stats
+
+    # Authors added since the last refresh have no row yet
+    author = db.query(Author).filter(Author.authorid == author_id).first()
+    if author is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return AuthorStatsResponse(
+        authorid=author_id, book_count=0, total_ratings=0, top_genres=[]
+    )
+
+
 @router.get("/{author_id}/books", response_model=List[BookResponse])
 def read_author_books(
     author_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get all books by a specific author.
@@ -63,9 +96,9 @@ def read_author_books(
 
     # Get books for this author
     books = (
-        db.query(Book)
-        .join(BookAuthor, BookAuthor.bookid == Book.bookid)
-        .filter(BookAuthor.authorid == author_id)
+        db.query(BookDoc)
+        .filter(BookDoc.author_ids.contains([author_id]))
+        .order_by(BookDoc.bookid)
         .offset(skip)
         .limit(limit)
         .all()
@@ -81,7 +114,7 @@ def create_author(author: AuthorCreate, db: Session = Depends(get_db)):
     """
     try:
         # Check if the author already exists
-        existing_author = db.query(Author).filter(Author.name == author.name).first()
+        existing_author = statements.author_by_name(db, author.name)
         if existing_author:
             raise HTTPException(
                 status_code=400,
@@ -113,9 +146,7 @@ def update_author(author_id: int, author: AuthorCreate, db: Session = Depends(ge
 
         # Check if the new name conflicts with an existing author
         if author.name != db_author.name:
-            existing_author = (
-                db.query(Author).filter(Author.name == author.name).first()
-            )
+            existing_author = statements.author_by_name(db, author.name)
             if existing_author:
                 raise HTTPException(
                     status_code=400,
@@ -165,7 +196,7 @@ def delete_author(author_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/count", response_model=dict)
-def count_authors(db: Session = Depends(get_db)):
+def count_authors(db: Session = Depends(get_read_db)):
     """
     Get the total number of authors in the database.
     """
@@ -0,0 +1,145 @@
+"""
+Batch router: several GET requests in one round trip
+"""
+
+import asyncio
+import json
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from fastapi import APIRouter, HTTPException, Request
+
+import query_guard
+from config import (
+    BATCH_MAX_COST,
+    BATCH_MAX_REQUESTS,
+    READ_YOUR_WRITES_HEADER,
+    read_session_factory,
+    shared_read_session,
+)
+from models import BatchRequest, BatchResponse
+
+router = APIRouter(tags=["batch"])
+
+# Client headers passed on to each sub-request (auth and read-your-writes)
+FORWARDED_HEADERS = {
+    b"authorization",
+    b"cookie",
+    READ_YOUR_WRITES_HEADER.lower().encode(),
+}
+# Rows per extra unit of cost for sub-requests with a `limit`
+ROWS_PER_COST = 25
+
+
+def _cost(query: str) -> int:
+    try:
+        limit = int(parse_qs(query).get("limit", ["0"])[0])
+    except ValueError:
+        limit = 0
+    return 1 + max(limit, 0) // ROWS_PER_COST
+
+
+async def _dispatch(request: Request, path: str, query: str):
+    """Run a GET through the app in-process; returns (status, body)"""
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.url.scheme,
+        "path": unquote(path),
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": request.scope.get("root_path", ""),
+        "headers": [
+            (name, value)
+            for name, value in request.headers.raw
+            if name in FORWARDED_HEADERS
+        ],
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+        "state": dict(request.scope.get("state", {})),
+    }
+    status = 500
+    body = bytearray()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # Unhandled errors are re-raised after their 500 response was sent
+        status = 500
+
+    try:
+        return status, json.loads(body) if body else None
+    except ValueError:
+        return status, body.decode(errors="replace")
+
+
+@router.post("/batch", response_model=BatchResponse)
+@query_guard.statement_timeout("read")
+async def batch(batch_request: BatchRequest, request: Request):
+    """
+    Run several GET requests in one round trip.
+
+    Each item is a path with its query string, e.g. `/books/1` or
+    `/genres/top/?limit=10`; results come back in request order with their own
+    status codes. The sub-requests run one after another on a single shared
+    read session, so the whole batch checks out one database connection.
+    Limited to BATCH_MAX_REQUESTS items and BATCH_MAX_COST total cost (1 per
+    item, plus 1 per 25 rows of `limit`).
+    """
+    items = batch_request.requests
+    if not items:
+        return {"responses": []}
+    if len(items) > BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch has {len(items)} requests; the limit is {BATCH_MAX_REQUESTS}",
+        )
+
+    targets = []
+    for item in items:
+        url = urlsplit(item.path)
+        if url.scheme or url.netloc or not url.path.startswith("/"):
+            raise HTTPException(status_code=400, detail=f"Not an API path: {item.path}")
+        if url.path.rstrip("/") == "/batch":
+            raise HTTPException(status_code=400, detail="Batches cannot be nested")
+        if url.path.rstrip("/").endswith("/events"):
+            # Server-Sent Event streams never end
+            raise HTTPException(
+                status_code=400, detail="Event streams cannot be batched"
+            )
+        targets.append((url.path, url.query))
+
+    cost = sum(_cost(query) for _, query in targets)
+    if cost > BATCH_MAX_COST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch cost {cost} exceeds the limit of {BATCH_MAX_COST}",
+        )
+
+    db = read_session_factory(request)()
+    token = shared_read_session.set(db)
+    try:
+        responses = []
+        for item, (path, query) in zip(items, targets):
+            status, body = await _dispatch(request, path, query)
+            if status >= 500:
+                # Leave no failed transaction for the next sub-request
+                await asyncio.to_thread(db.rollback)
+            responses.append(
+                {"id": item.id, "path": item.path, "status": status, "body": body}
+            )
+    finally:
+        shared_read_session.reset(token)
+        await asyncio.to_thread(db.close)
+    return {"responses": responses}
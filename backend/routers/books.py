@@ -1,11 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import false, or_
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from typing import List, Optional
 
-from config import get_db
-from models import Book, Author, BookAuthor, Genre, BookGenre
+import book_vectors
+import catalog_engine
+import isbn
+import isbn_index
+import query_guard
+import statements
+import trending
+from auth import get_current_admin
+from config import SessionLocal, get_db, get_read_db, is_replica_session
+from models import Book, Author, BookAuthor, Genre, BookGenre, BookAlsoRead, BookDoc
 from models import BookResponse, BookCreate, PaginatedBookResponse
+from models import BookLookupRequest, BookLookupResponse, BookBulkResponse, User
+from models import RelatedBookResponse, TrendingBookResponse
+
+# Most book IDs plus ISBNs in one POST /books/lookup
+MAX_LOOKUP = 100
+# Most books in one POST /books/bulk
+MAX_BULK_BOOKS = 1000
 
 router = APIRouter(
     prefix="/books",
@@ -14,6 +30,35 @@ router = APIRouter(
 )
 
 
+def _ids_by_name(db: Session, id_column, name_column, names: List[str]) -> List[int]:
+    """IDs of the named authors or genres; unknown names are skipped"""
+    return [row[0] for row in db.query(id_column).filter(name_column.in_(names))]
+
+
+def _tag_filter(ids_column, ids: List[int], names: List[str], match: str):
+    """Books tagged with any (overlap) or all (containment) of the IDs"""
+    if match == "all":
+        # An unknown name can never be matched, so neither can all of them
+        if len(ids) < len(set(names)):
+            return false()
+        return ids_column.contains(ids)
+    return ids_column.overlap(ids) if ids else false()
+
+
+def _page(books, total: int, skip: int, limit: int) -> dict:
+    """The paginated response for one page of `books` out of `total`"""
+    page = (skip // limit) + 1
+    pages = (total + limit - 1) // limit if limit > 0 else 0
+
+    return {
+        "items": books,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "pages": pages,
+    }
+
+
 @router.get("/", response_model=PaginatedBookResponse)
 def read_books(
     skip: int = Query(0, ge=0),
@@ -21,72 +66,263 @@ def read_books(
     title: Optional[str] = None,
     author: Optional[List[str]] = Query(None),
     genre: Optional[List[str]] = Query(None),
+    match: str = Query("any", pattern="^(any|all)$"),
     min_rating: Optional[float] = None,
     max_rating: Optional[float] = None,
-    db: Session = Depends(get_db),
+    sort: str = Query("bookid", pattern="^(bookid|rating|ratings|reviews|pages)$"),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get all books with optional filtering and pagination.
+
+    With several authors or genres, `match=any` (default) returns books with
+    at least one of them and `match=all` only books with every one. Names are
+    resolved to IDs first, then matched by array overlap or containment on the
+    denormalized book_doc table, one row per book with no joins to deduplicate.
+    `sort` orders by book ID (default), highest rating, most ratings or
+    reviews, or fewest pages.
+
+    With CATALOG_ENGINE=1 the filtering, counting and sorting run on this
+    worker's in-memory copy of the catalog (catalog_engine.py), and only the
+    page's books are read from the database.
     """
-    query = db.query(Book)
+    served = catalog_engine.browse(
+        skip=skip,
+        limit=limit,
+        title=title,
+        authors=author,
+        genres=genre,
+        match=match,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        sort=sort,
+    )
+    if served is not None:
+        book_ids, total = served
+        rows = {
+            doc.bookid: doc
+            for doc in db.query(BookDoc).filter(BookDoc.bookid.in_(book_ids))
+        }
+        missing = [book_id for book_id in book_ids if book_id not in rows]
+        if missing and is_replica_session(db):
+            # The engine hears of changes from the primary, which a lagging
+            # replica may not have replayed yet
+            with SessionLocal() as primary:
+                rows.update(
+                    (doc.bookid, doc)
+                    for doc in primary.query(BookDoc).filter(
+                        BookDoc.bookid.in_(missing)
+                    )
+                )
+        # A book deleted since the engine's last sync is left out of the page
+        books = [rows[book_id] for book_id in book_ids if book_id in rows]
+        return _page(books, total, skip, limit)
+
+    query = db.query(BookDoc)
 
     # Apply filters if provided
     if title:
-        query = query.filter(Book.title.ilike(f"%{title}%"))
+        query = query.filter(BookDoc.title.ilike(f"%{title}%"))
 
     if author:
-        query = query.join(Book.authors).filter(Author.name.in_(author)).distinct()
+        author_ids = _ids_by_name(db, Author.authorid, Author.name, author)
+        query = query.filter(_tag_filter(BookDoc.author_ids, author_ids, author, match))
 
     if genre:
-        query = query.join(Book.genres).filter(Genre.name.in_(genre)).distinct()
+        genre_ids = _ids_by_name(db, Genre.genreid, Genre.name, genre)
+        query = query.filter(_tag_filter(BookDoc.genre_ids, genre_ids, genre, match))
 
     if min_rating is not None:
-        query = query.filter(Book.averagerating >= min_rating)
+        query = query.filter(BookDoc.averagerating >= min_rating)
 
     if max_rating is not None:
-        query = query.filter(Book.averagerating <= max_rating)
+        query = query.filter(BookDoc.averagerating <= max_rating)
 
     # Get total count before pagination
     total = query.count()
 
     # Apply pagination
-    books = query.offset(skip).limit(limit).all()
+    column, descending = catalog_engine.SORTS[sort]
+    if column is not None:
+        column = getattr(BookDoc, column)
+        query = query.order_by(
+            (column.desc() if descending else column.asc()).nullslast()
+        )
+    books = query.order_by(BookDoc.bookid).offset(skip).limit(limit).all()
+    return _page(books, total, skip, limit)
 
-    page = (skip // limit) + 1
-    pages = (total + limit - 1) // limit if limit > 0 else 0
 
-    return {
-        "items": books,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": pages,
+@router.get("/trending", response_model=List[TrendingBookResponse])
+def read_trending_books(
+    window: str = Query("24h", pattern="^(24h|7d|30d)$"),
+    limit: int = Query(20, ge=1, le=trending.MAX_TRENDING),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get the books most often added to reading lists in the last 24h, 7d or 30d.
+
+    Ranked from in-memory counters kept by trending.py, not by scanning the
+    reading lists.
+    """
+    trending.ensure_polled(db)
+    ranked = trending.top(window, limit)
+    if not ranked:
+        return []
+
+    books = {
+        row.bookid: row
+        for row in db.query(
+            Book.bookid, Book.title, Book.imageurl, Book.averagerating
+        ).filter(Book.bookid.in_([book_id for book_id, _ in ranked]))
     }
+    return [
+        {**books[book_id]._asdict(), "adds": adds}
+        for book_id, adds in ranked
+        if book_id in books
+    ]
 
 
 @router.get("/{book_id}", response_model=BookResponse)
-def read_book(book_id: int, db: Session = Depends(get_db)):
+def read_book(book_id: int, db: Session = Depends(get_read_db)):
     """
     Get a book by ID.
     """
-    book = db.query(Book).filter(Book.bookid == book_id).first()
+    book = statements.book_by_id(db, book_id)
     if book is None:
         raise HTTPException(status_code=404, detail="Book not found")
     return book
 
 
+@router.get("/{book_id}/also-read", response_model=List[RelatedBookResponse])
+def read_also_read(
+    book_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get books most often shelved by readers of this book.
+
+    Served from the precomputed book_also_read table (see also_read.py).
+    """
+    neighbors = (
+        db.query(
+            Book.bookid,
+            Book.title,
+            Book.imageurl,
+            Book.averagerating,
+            BookAlsoRead.score,
+        )
+        .join(BookAlsoRead, BookAlsoRead.neighborid == Book.bookid)
+        .filter(BookAlsoRead.bookid == book_id)
+        .order_by(BookAlsoRead.rank)
+        .limit(limit)
+        .all()
+    )
+    return neighbors
+
+
+@router.get("/{book_id}/similar", response_model=List[RelatedBookResponse])
+def read_similar_books(
+    book_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get books with similar descriptions, genres and authors.
+
+    Scored against the memory-mapped vector index built by book_vectors.py.
+    """
+    index = book_vectors.get_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Similarity index not built")
+
+    neighbors = index.similar(book_id, limit)
+    if not neighbors:
+        raise HTTPException(status_code=404, detail="Book not in similarity index")
+
+    books = {
+        row.bookid: row
+        for row in db.query(
+            Book.bookid, Book.title, Book.imageurl, Book.averagerating
+        ).filter(Book.bookid.in_([neighbor_id for neighbor_id, _ in neighbors]))
+    }
+    return [
+        {**books[neighbor_id]._asdict(), "score": score}
+        for neighbor_id, score in neighbors
+        if neighbor_id in books
+    ]
+
+
+@router.post("/lookup", response_model=BookLookupResponse)
+@query_guard.statement_timeout("read")
+def lookup_books(lookup: BookLookupRequest, db: Session = Depends(get_read_db)):
+    """
+    Get many books at once by ID and/or ISBN.
+
+    ISBNs may be ISBN-10 or ISBN-13, with or without hyphens, and match
+    either stored form. One query against book_doc returns every book fully
+    hydrated; items come back in request order (IDs first, then ISBNs) and
+    misses are listed explicitly. At most MAX_LOOKUP keys per request.
+    """
+    if len(lookup.bookids) + len(lookup.isbns) > MAX_LOOKUP:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_LOOKUP} book IDs and ISBNs"
+        )
+
+    forms = {value: isbn.candidates(value) for value in lookup.isbns}
+    isbn_keys = list({form for candidates in forms.values() for form in candidates})
+
+    conditions = []
+    if lookup.bookids:
+        conditions.append(BookDoc.bookid.in_(lookup.bookids))
+    if isbn_keys:
+        conditions.append(BookDoc.isbn.in_(isbn_keys))
+        conditions.append(BookDoc.isbn13.in_(isbn_keys))
+    books = db.query(BookDoc).filter(or_(*conditions)).all() if conditions else []
+
+    by_id = {book.bookid: book for book in books}
+    by_isbn = {}
+    for book in books:
+        for stored in (book.isbn, book.isbn13):
+            if stored:
+                by_isbn[stored] = book
+
+    items = []
+    for book_id in lookup.bookids:
+        book = by_id.get(book_id)
+        items.append({"bookid": book_id, "found": book is not None, "book": book})
+    for value in lookup.isbns:
+        book = next((by_isbn[f] for f in forms[value] if f in by_isbn), None)
+        items.append({"isbn": value, "found": book is not None, "book": book})
+
+    return {
+        "items": items,
+        "missing_bookids": [
+            item["bookid"] for item in items[: len(lookup.bookids)] if not item["found"]
+        ],
+        "missing_isbns": [
+            item["isbn"]
+            for item in items[len(lookup.bookids) :]
+            if not item["found"] and forms[item["isbn"]]
+        ],
+        "invalid_isbns": [value for value in lookup.isbns if not forms[value]],
+    }
+
+
 @router.post("/", response_model=BookResponse, status_code=201)
 def create_book(book: BookCreate, db: Session = Depends(get_db)):
     """
     Create a new book.
     """
     try:
-        # Check if the book already exists
-        existing_book = db.query(Book).filter(Book.isbn == book.isbn).first()
-        if existing_book:
-            raise HTTPException(
-                status_code=400, detail=f"Book with ISBN {book.isbn} already exists"
-            )
+        # Check if the book already exists, unless the ISBN index rules it out
+        if isbn_index.might_exist(book.isbn):
+            existing_book = db.query(Book).filter(Book.isbn == book.isbn).first()
+            if existing_book:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Book with ISBN {book.isbn} already exists",
+                )
 
         # Create the book object from the request data
         db_book = Book(
@@ -110,7 +346,7 @@ def create_book(book: BookCreate, db: Session = Depends(get_db)):
         # Process authors
         for author_name in book.authors:
             # Check if author exists, if not create it
-            author = db.query(Author).filter(Author.name == author_name).first()
+            author = statements.author_by_name(db, author_name)
             if not author:
                 author = Author(name=author_name)
                 db.add(author)
@@ -123,7 +359,7 @@ def create_book(book: BookCreate, db: Session = Depends(get_db)):
         # Process genres
         for genre_name in book.genres:
             # Check if genre exists, if not create it
-            genre = db.query(Genre).filter(Genre.name == genre_name).first()
+            genre = statements.genre_by_name(db, genre_name)
             if not genre:
                 genre = Genre(name=genre_name)
                 db.add(genre)
@@ -135,14 +371,123 @@ def create_book(book: BookCreate, db: Session = Depends(get_db)):
 
         # Commit all changes
         db.commit()
+        isbn_index.record((db_book.isbn, db_book.isbn13), db_book.bookid)
         db.refresh(db_book)
         return db_book
 
+    except IntegrityError as e:
+        db.rollback()
+        # A duplicate the ISBN index had not seen yet, e.g. just added by
+        # another worker
+        if db.query(Book.bookid).filter(Book.isbn == book.isbn).first():
+            isbn_index.record([book.isbn])
+            raise HTTPException(
+                status_code=400, detail=f"Book with ISBN {book.isbn} already exists"
+            )
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@router.post("/bulk", response_model=BookBulkResponse, status_code=201)
+@query_guard.statement_timeout("bulk")
+def create_books_bulk(
+    books: List[BookCreate],
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Create many books in one transaction (admin only).
+
+    Books whose ISBN is already stored, or repeated within the request, are
+    skipped and reported. Only the ISBNs the ISBN index cannot rule out are
+    checked against the database, in a single query; if a duplicate slips
+    past the index, every ISBN is checked and the import is retried once.
+    """
+    if len(books) > MAX_BULK_BOOKS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BULK_BOOKS} books per request"
+        )
+
+    isbns = [book.isbn for book in books]
+    try:
+        try:
+            return _create_books(db, books, isbn_index.existing(db, isbns))
+        except IntegrityError:
+            db.rollback()
+            # A duplicate the ISBN index had not seen yet, e.g. just added by
+            # another worker: check every ISBN in the database and try again
+            stored = isbn_index.existing(db, isbns, exact=True)
+            isbn_index.record(stored)
+            return _create_books(db, books, stored)
+
+    except IntegrityError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Books changed while importing, retry: {str(e)}",
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+def _create_books(db: Session, books: List[BookCreate], stored: set) -> dict:
+    """Insert the books whose ISBN is not in `stored` and commit"""
+    new_books, duplicates, seen = [], [], set()
+    for book in books:
+        if book.isbn in stored or book.isbn in seen:
+            duplicates.append(book.isbn)
+        else:
+            seen.add(book.isbn)
+            new_books.append(book)
+
+    authors = _get_or_create_by_name(
+        db, Author, {name for book in new_books for name in book.authors}
+    )
+    genres = _get_or_create_by_name(
+        db, Genre, {name for book in new_books for name in book.genres}
+    )
+
+    db_books = [
+        Book(**book.model_dump(exclude={"authors", "genres"})) for book in new_books
+    ]
+    db.add_all(db_books)
+    db.flush()  # Flush to get the book IDs
+
+    for book, db_book in zip(new_books, db_books):
+        db.add_all(
+            BookAuthor(bookid=db_book.bookid, authorid=authors[name].authorid)
+            for name in set(book.authors)
+        )
+        db.add_all(
+            BookGenre(bookid=db_book.bookid, genreid=genres[name].genreid)
+            for name in set(book.genres)
+        )
+
+    db.commit()
+    for db_book in db_books:
+        isbn_index.record((db_book.isbn, db_book.isbn13), db_book.bookid)
+    return {
+        "created": [db_book.bookid for db_book in db_books],
+        "duplicates": duplicates,
+    }
+
+
+def _get_or_create_by_name(db: Session, model, names) -> dict:
+    """Authors or genres by name, creating the missing ones"""
+    if not names:
+        return {}
+    found = {row.name: row for row in db.query(model).filter(model.name.in_(names))}
+    missing = [model(name=name) for name in names if name not in found]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        found.update((row.name, row) for row in missing)
+    return found
+
+
 @router.put("/{book_id}", response_model=BookResponse)
 def update_book(book_id: int, book: BookCreate, db: Session = Depends(get_db)):
     """
@@ -150,7 +495,7 @@ def update_book(book_id: int, book: BookCreate, db: Session = Depends(get_db)):
     """
     try:
         # Check if the book exists
-        db_book = db.query(Book).filter(Book.bookid == book_id).first()
+        db_book = statements.book_by_id(db, book_id)
         if db_book is None:
             raise HTTPException(status_code=404, detail="Book not found")
 
@@ -173,7 +518,7 @@ def update_book(book_id: int, book: BookCreate, db: Session = Depends(get_db)):
         # Process authors
         for author_name in book.authors:
             # Check if author exists, if not create it
-            author = db.query(Author).filter(Author.name == author_name).first()
+            author = statements.author_by_name(db, author_name)
             if not author:
                 author = Author(name=author_name)
                 db.add(author)
@@ -189,7 +534,7 @@ def update_book(book_id: int, book: BookCreate, db: Session = Depends(get_db)):
         # Process genres
         for genre_name in book.genres:
             # Check if genre exists, if not create it
-            genre = db.query(Genre).filter(Genre.name == genre_name).first()
+            genre = statements.genre_by_name(db, genre_name)
             if not genre:
                 genre = Genre(name=genre_name)
                 db.add(genre)
@@ -201,6 +546,7 @@ def update_book(book_id: int, book: BookCreate, db: Session = Depends(get_db)):
 
         # Commit all changes
         db.commit()
+        isbn_index.record((db_book.isbn, db_book.isbn13), db_book.bookid)
         db.refresh(db_book)
         return db_book
 
@@ -216,7 +562,7 @@ def delete_book(book_id: int, db: Session = Depends(get_db)):
     """
     try:
         # Check if the book exists
-        db_book = db.query(Book).filter(Book.bookid == book_id).first()
+        db_book = statements.book_by_id(db, book_id)
         if db_book is None:
             raise HTTPException(status_code=404, detail="Book not found")
 
@@ -231,7 +577,7 @@ def delete_book(book_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/count/", response_model=dict)
-def count_books(db: Session = Depends(get_db)):
+def count_books(db: Session = Depends(get_read_db)):
     """
     Get the total number of books in the database.
     """
@@ -3,8 +3,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
 
-from config import get_db
-from models import Genre, BookGenre, Book
+import statements
+from config import get_db, get_read_db
+from models import Genre, BookGenre, BookDoc
 from models import GenreResponse, GenreCreate, BookResponse
 
 router = APIRouter(
@@ -17,9 +18,9 @@ router = APIRouter(
 @router.get("/", response_model=List[GenreResponse])
 def read_genres(
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=10000),
+    limit: int = Query(100, ge=1, le=1000),
     name: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get all genres with optional filtering by name.
@@ -36,7 +37,7 @@ def read_genres(
 
 
 @router.get("/{genre_id}", response_model=GenreResponse)
-def read_genre(genre_id: int, db: Session = Depends(get_db)):
+def read_genre(genre_id: int, db: Session = Depends(get_read_db)):
     """
     Get a genre by ID.
     """
@@ -51,7 +52,7 @@ def read_genre_books(
     genre_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get all books in a specific genre.
@@ -63,9 +64,9 @@ def read_genre_books(
 
     # Get books for this genre
     books = (
-        db.query(Book)
-        .join(BookGenre, BookGenre.bookid == Book.bookid)
-        .filter(BookGenre.genreid == genre_id)
+        db.query(BookDoc)
+        .filter(BookDoc.genre_ids.contains([genre_id]))
+        .order_by(BookDoc.bookid)
         .offset(skip)
         .limit(limit)
         .all()
@@ -81,7 +82,7 @@ def create_genre(genre: GenreCreate, db: Session = Depends(get_db)):
     """
     try:
         # Check if the genre already exists
-        existing_genre = db.query(Genre).filter(Genre.name == genre.name).first()
+        existing_genre = statements.genre_by_name(db, genre.name)
         if existing_genre:
             raise HTTPException(
                 status_code=400, detail=f"Genre with name '{genre.name}' already exists"
@@ -112,7 +113,7 @@ def update_genre(genre_id: int, genre: GenreCreate, db: Session = Depends(get_db
 
         # Check if the new name conflicts with an existing genre
         if genre.name != db_genre.name:
-            existing_genre = db.query(Genre).filter(Genre.name == genre.name).first()
+            existing_genre = statements.genre_by_name(db, genre.name)
             if existing_genre:
                 raise HTTPException(
                     status_code=400,
@@ -159,11 +160,14 @@ def delete_genre(genre_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@router.get("/top/", response_model=List[dict])
-def get_top_genres(db: Session = Depends(get_db), limit: int = 10):
-    """
-    Get top genres by number of books.
-    """
+# Precomputed by the "top_genres" background job; the route serves slices of
+# it and only queries the database before the first run
+TOP_GENRES_PRECOMPUTED = 100
+_top_genres: Optional[List[dict]] = None
+
+
+def compute_top_genres(db: Session, limit: int) -> List[dict]:
+    """Genres ordered by number of books"""
     from sqlalchemy import func, desc
 
     top_genres = (
@@ -177,16 +181,33 @@ def get_top_genres(db: Session = Depends(get_db), limit: int = 10):
         .all()
     )
 
-    result = [
+    return [
         {"id": g.genreid, "name": g.name, "book_count": g.book_count}
         for g in top_genres
     ]
 
-    return result
+
+def refresh_top_genres(db: Session) -> None:
+    global _top_genres
+    _top_genres = compute_top_genres(db, TOP_GENRES_PRECOMPUTED)
+
+
+@router.get("/top/", response_model=List[dict])
+def get_top_genres(
+    db: Session = Depends(get_read_db),
+    limit: int = Query(10, ge=1, le=TOP_GENRES_PRECOMPUTED),
+):
+    """
+    Get top genres by number of books.
+    """
+    cached = _top_genres
+    if cached is not None:
+        return cached[:limit]
+    return compute_top_genres(db, limit)
 
 
 @router.get("/count", response_model=dict)
-def count_genres(db: Session = Depends(get_db)):
+def count_genres(db: Session = Depends(get_read_db)):
     """
     Get the total number of genres in the database.
     """
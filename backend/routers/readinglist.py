@@ -1,11 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional
-
-from config import get_db
-from models import ReadingList, User, Book
+import asyncio
+import base64
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from typing import List, Optional, Tuple
+
+import progress_buffer
+import reading_events
+import reading_stats
+import recommend
+import statements
+import trending
+from config import (
+    SessionLocal,
+    get_db,
+    get_read_db,
+    is_replica_session,
+    mark_primary_reads,
+)
+from models import ReadingList, Book, BookDoc, UserReadingStats, BookAlsoReadDirty
 from models import ReadingListResponse, ReadingListCreate, ReadingListUpdate
+from models import ReadingListCompactResponse, ReadingListItemResponse
+from models import ReadingListBatchRequest, ReadingListBatchResponse
+from models import ReadingListBatchResult, RelatedBookResponse
+from models import ReadingProgressUpdate, ReadingProgressResponse
 
 router = APIRouter(
     prefix="/readinglist",
@@ -14,22 +37,52 @@ router = APIRouter(
 )
 
 
+def _encode_cursor(item: ReadingList) -> str:
+    """Encode the (addedat, bookid) position of a reading list item"""
+    raw = f"{item.addedat.isoformat()}|{item.bookid}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by _encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        added_at, book_id = raw.split("|")
+        return datetime.fromisoformat(added_at), int(book_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _with_book(query, compact: bool = False):
+    """Eager-load each item's book with its authors and genres"""
+    book_load = joinedload(ReadingList.book)
+    if compact:
+        book_load = book_load.defer(Book.description, raiseload=True)
+    return query.options(
+        book_load.selectinload(Book.authors),
+        book_load.selectinload(Book.genres),
+    )
+
+
 @router.get("/{user_id}", response_model=List[ReadingListResponse])
 def read_user_reading_list(
     user_id: int,
+    response: Response,
     status: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    compact: bool = False,
+    db: Session = Depends(get_read_db),
 ):
     """
     Get a user's reading list with optional filtering by status.
-    """
-    # Check if the user exists
-    user = db.query(User).filter(User.userid == user_id).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
 
+    Items are returned newest first. Pass the `X-Next-Cursor` response header
+    back as `cursor` to fetch the next page; keyset pagination on
+    (addedat, bookid) costs the same on every page, unlike `skip`.
+    `compact=true` leaves out book descriptions.
+    """
     # Query reading list
     query = db.query(ReadingList).filter(ReadingList.userid == user_id)
 
@@ -40,21 +93,160 @@ def read_user_reading_list(
                 status_code=400,
                 detail="Invalid status. Must be one of: want, reading, completed, dropped",
             )
-        query = query.filter(ReadingList.status == status.lower())
+        query = query.filter(ReadingList.status == status.upper())
+
+    # Load the book and its authors/genres with the page: one joined query for
+    # items + books, then one IN query each for authors and genres
+    query = _with_book(query, compact)
 
     # Apply pagination
-    reading_list = query.offset(skip).limit(limit).all()
+    query = query.order_by(ReadingList.addedat.desc(), ReadingList.bookid.desc())
+    if cursor:
+        added_at, book_id = _decode_cursor(cursor)
+        query = query.filter(
+            tuple_(ReadingList.addedat, ReadingList.bookid) < (added_at, book_id)
+        )
+    else:
+        query = query.offset(skip)
+    reading_list = query.limit(limit).all()
+
+    # Only an empty page needs to tell a missing user from an empty list
+    if not reading_list:
+        if not statements.user_exists(db, user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+
+    progress_buffer.overlay(reading_list)
+    headers = {}
+    if len(reading_list) == limit:
+        headers["X-Next-Cursor"] = _encode_cursor(reading_list[-1])
+
+    if compact:
+        items = [
+            ReadingListCompactResponse.model_validate(item).model_dump(mode="json")
+            for item in reading_list
+        ]
+        return JSONResponse(content=items, headers=headers)
+
+    response.headers.update(headers)
     return reading_list
 
 
+# Declared before /{user_id}/{book_id}, which would otherwise match /stats/{id}
+@router.get("/stats/{user_id}", response_model=dict)
+def get_reading_stats(user_id: int, db: Session = Depends(get_read_db)):
+    """
+    Get statistics about a user's reading list.
+
+    Served from the user_reading_stats row (a primary-key read) and cached
+    briefly in process; reading list writes invalidate the cache.
+    """
+    cached = reading_stats.get_cached(user_id)
+    if cached is not None:
+        return cached
+
+    row = db.get(UserReadingStats, user_id)
+    if row is None:
+        # No row yet means an empty reading list, unless the user is missing
+        if not statements.user_exists(db, user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+
+    stats = reading_stats.stats_to_dict(row)
+    reading_stats.set_cached(user_id, stats, from_replica=is_replica_session(db))
+    return stats
+
+
+# Also declared before /{user_id}/{book_id}
+@router.get("/{user_id}/recommendations", response_model=List[RelatedBookResponse])
+def get_recommendations(
+    user_id: int,
+    limit: int = Query(10, ge=1, le=recommend.MAX_RECOMMENDATIONS),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Suggest books to read next, from the genres and authors of books the user
+    completed or rated highly, blended with overall popularity.
+
+    Results are cached per user until their reading list changes.
+    """
+    cached = recommend.get_cached(user_id)
+    if cached is not None:
+        return cached[:limit]
+
+    # The popularity prior ranks books even for an unknown user
+    if not statements.user_exists(db, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    ranked = recommend.recommend_for_user(db, user_id)
+
+    books = {
+        row.bookid: row
+        for row in db.query(
+            Book.bookid, Book.title, Book.imageurl, Book.averagerating
+        ).filter(Book.bookid.in_([book_id for book_id, _ in ranked]))
+    }
+    recommendations = [
+        {**books[book_id]._asdict(), "score": score}
+        for book_id, score in ranked
+        if book_id in books
+    ]
+    recommend.set_cached(user_id, recommendations)
+    return recommendations[:limit]
+
+
+# Also declared before /{user_id}/{book_id}
+@router.get("/{user_id}/events", response_class=StreamingResponse)
+async def stream_reading_list_events(
+    user_id: int,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Stream changes to a user's reading list as Server-Sent Events, instead of
+    polling the list and its stats.
+
+    Each event is named `add`, `update` or `remove`, with data
+    `{"bookid", "item", "at"}` where `item` is the item's status, progress,
+    rating, note and addedat after the change (null for removals). Events
+    carry IDs, so a reconnecting EventSource resumes from its `Last-Event-ID`.
+    Without one the stream starts with changes from now on. A `reset` event
+    means the resume point has expired; reload the list. Pushed through
+    Postgres NOTIFY when each write commits; no database connection is held
+    while the stream is idle.
+    """
+    resume_from = None
+    if last_event_id:
+        try:
+            resume_from = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    def user_exists():
+        db = SessionLocal()
+        try:
+            return statements.user_exists(db, user_id)
+        finally:
+            db.close()
+
+    if not await asyncio.to_thread(user_exists):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return StreamingResponse(
+        reading_events.stream(request, user_id, resume_from),
+        media_type="text/event-stream",
+        # No caching, and no response buffering in nginx
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{user_id}/{book_id}", response_model=ReadingListResponse)
-def read_user_book_status(user_id: int, book_id: int, db: Session = Depends(get_db)):
+def read_user_book_status(
+    user_id: int, book_id: int, db: Session = Depends(get_read_db)
+):
     """
     Get a specific book from a user's reading list.
     """
     # Check if the record exists
     reading_list_item = (
-        db.query(ReadingList)
+        _with_book(db.query(ReadingList))
         .filter(ReadingList.userid == user_id, ReadingList.bookid == book_id)
         .first()
     )
@@ -65,71 +257,182 @@ def read_user_book_status(user_id: int, book_id: int, db: Session = Depends(get_
             detail=f"Book {book_id} not found in user {user_id}'s reading list",
         )
 
+    progress_buffer.overlay([reading_list_item])
     return reading_list_item
 
 
+def _mark_also_read_dirty(db: Session, book_ids) -> None:
+    """Queue books whose set of readers changed for the next also-read refresh"""
+    if not book_ids:
+        return
+    table = BookAlsoReadDirty.__table__
+    stmt = insert(table).values([{"bookid": book_id} for book_id in book_ids])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.bookid], set_={"markedat": func.now()}
+    )
+    db.execute(stmt)
+
+
+def _shelved(item: Optional[reading_stats.ItemSnapshot]) -> bool:
+    """Whether an item counts as shelved for also-read recommendations"""
+    return item is not None and item[0] != "DROPPED"
+
+
+def _record_changes(db: Session, user_id: int, changes) -> None:
+    """
+    Update everything derived from reading list items, inside the write.
+
+    `changes` holds (book_id, old_snapshot, new_snapshot) per changed item.
+    """
+    delta = {}
+    dirty_books = []
+    for book_id, old, new in changes:
+        for column, value in reading_stats.item_delta(old, new).items():
+            delta[column] = delta.get(column, 0) + value
+        if _shelved(old) != _shelved(new):
+            dirty_books.append(book_id)
+
+    if any(delta.values()):
+        reading_stats.apply_delta(db, user_id, delta)
+    _mark_also_read_dirty(db, dirty_books)
+    reading_stats.announce_change(db, user_id)
+    recommend.announce_change(db, user_id)
+
+
+def _after_commit(user_id: int, response: Response, added=()) -> None:
+    """
+    Drop caches of the user's derived data once a write is committed.
+
+    `added` holds (book_id, addedat) for books newly put on the list.
+    """
+    reading_stats.invalidate(user_id, announced=True)
+    recommend.invalidate(user_id, announced=True)
+    trending.record_adds(user_id, added)
+    mark_primary_reads(response)
+
+
+def _integrity_error_response(e: IntegrityError) -> HTTPException:
+    """Translate a constraint violation from a reading list write"""
+    constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", "") or ""
+    if "userid" in constraint:
+        return HTTPException(status_code=404, detail="User not found")
+    if "bookid" in constraint:
+        return HTTPException(status_code=404, detail="Book not found")
+    return HTTPException(status_code=400, detail=f"Invalid reading list item: {e.orig}")
+
+
 @router.post("/", response_model=ReadingListResponse, status_code=201)
 def add_to_reading_list(
-    item: ReadingListCreate, user_id: int, db: Session = Depends(get_db)
+    item: ReadingListCreate,
+    user_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
 ):
     """
     Add a book to a user's reading list.
+
+    Adding a book that is already on the list updates it instead (status,
+    plus any of progress, rating and note that are given) and returns 200.
+    A new item is written with a single INSERT ... ON CONFLICT DO NOTHING;
+    missing users and books are reported from the foreign key violations.
     """
+    table = ReadingList.__table__
+    progress_buffer.discard(user_id, [item.bookid])
     try:
-        # Check if the user exists
-        user = db.query(User).filter(User.userid == user_id).first()
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Check if the book exists
-        book = db.query(Book).filter(Book.bookid == item.bookid).first()
-        if book is None:
-            raise HTTPException(status_code=404, detail="Book not found")
-
-        # Check if the book is already in the user's reading list
-        existing_item = (
-            db.query(ReadingList)
-            .filter(ReadingList.userid == user_id, ReadingList.bookid == item.bookid)
-            .first()
-        )
-
-        if existing_item:
-            raise HTTPException(
-                status_code=400, detail="Book already exists in the user's reading list"
+        # A concurrent add of the same book makes the insert wait for that
+        # transaction and then insert nothing, so only one of them counts the
+        # item as new in the stats
+        inserted = db.execute(
+            insert(table)
+            .values(
+                userid=user_id,
+                bookid=item.bookid,
+                status=item.status,
+                progresspages=item.progresspages,
+                userrating=item.userrating,
+                note=item.note,
             )
-
-        # Create new reading list item
-        db_item = ReadingList(
-            userid=user_id,
-            bookid=item.bookid,
-            status=item.status,
-            progresspages=item.progresspages,
-            userrating=item.userrating,
-            note=item.note,
-        )
-
-        db.add(db_item)
+            .on_conflict_do_nothing(index_elements=[table.c.userid, table.c.bookid])
+            .returning(*table.c)
+        ).first()
+
+        if inserted is not None:
+            old_snapshot = None
+            new_snapshot = (
+                inserted.status,
+                inserted.userrating,
+                inserted.progresspages,
+            )
+            added = [(item.bookid, inserted.addedat)]
+            written = inserted
+        else:
+            # Already on the list: update the row, locking it so the stats
+            # delta is exact
+            db_item = (
+                db.query(ReadingList)
+                .filter(
+                    ReadingList.userid == user_id, ReadingList.bookid == item.bookid
+                )
+                .with_for_update()
+                .first()
+            )
+            if db_item is None:
+                # Removed by a concurrent request since the insert
+                raise HTTPException(
+                    status_code=409,
+                    detail="Reading list item changed concurrently, retry",
+                )
+            old_snapshot = reading_stats.snapshot(db_item)
+            db_item.status = item.status
+            if item.progresspages is not None:
+                db_item.progresspages = item.progresspages
+            if item.userrating is not None:
+                db_item.userrating = item.userrating
+            if item.note is not None:
+                db_item.note = item.note
+            new_snapshot = reading_stats.snapshot(db_item)
+            response.status_code = 200
+            added = []
+            written = db_item
+
+        # Answer from the row just written; the book cannot be deleted before
+        # the commit, as the item's foreign key (or row lock) holds it. Both
+        # are read now, so the commit's expiry sends no further query
+        result = {column.name: getattr(written, column.name) for column in table.c}
+        result["book"] = db.get(BookDoc, item.bookid)
+        db.expunge(result["book"])
+        _record_changes(db, user_id, [(item.bookid, old_snapshot, new_snapshot)])
         db.commit()
-        db.refresh(db_item)
-        return db_item
+        _after_commit(user_id, response, added)
 
+    except IntegrityError as e:
+        db.rollback()
+        raise _integrity_error_response(e)
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+    return result
+
 
 @router.patch("/{user_id}/{book_id}", response_model=ReadingListResponse)
 def update_reading_list_item(
-    user_id: int, book_id: int, item: ReadingListUpdate, db: Session = Depends(get_db)
+    user_id: int,
+    book_id: int,
+    item: ReadingListUpdate,
+    response: Response,
+    db: Session = Depends(get_db),
 ):
     """
     Update a book's status, progress, rating, or note in a user's reading list.
     """
+    progress_buffer.discard(user_id, [book_id])
     try:
-        # Check if the record exists
+        # Check if the record exists, locking it so the stats delta is exact
         db_item = (
             db.query(ReadingList)
             .filter(ReadingList.userid == user_id, ReadingList.bookid == book_id)
+            .with_for_update()
             .first()
         )
 
@@ -138,6 +441,7 @@ def update_reading_list_item(
                 status_code=404,
                 detail=f"Book {book_id} not found in user {user_id}'s reading list",
             )
+        old_snapshot = reading_stats.snapshot(db_item)
 
         # Update fields
         db_item.status = item.status
@@ -148,7 +452,10 @@ def update_reading_list_item(
         if item.note is not None:
             db_item.note = item.note
 
+        new_snapshot = reading_stats.snapshot(db_item)
+        _record_changes(db, user_id, [(book_id, old_snapshot, new_snapshot)])
         db.commit()
+        _after_commit(user_id, response)
         db.refresh(db_item)
         return db_item
 
@@ -157,16 +464,57 @@ def update_reading_list_item(
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@router.patch(
+    "/{user_id}/{book_id}/progress",
+    response_model=ReadingProgressResponse,
+    status_code=202,
+)
+def update_reading_progress(
+    user_id: int,
+    book_id: int,
+    update: ReadingProgressUpdate,
+    db: Session = Depends(get_db),
+):
+    """
+    Record how far into a book the user has read, for clients that report
+    progress often (e.g. on every page turn).
+
+    Updates are buffered in memory and written in batches every few seconds,
+    the latest value per book winning; reads of the reading list show the
+    buffered value meanwhile. Returns 202, with `buffered: false` if this
+    request happened to write the buffer out. Progress for a book that is
+    not on the user's reading list is discarded when the buffer is written.
+    """
+    buffered = True
+    if progress_buffer.accept(user_id, book_id, update.progresspages):
+        try:
+            progress_buffer.flush(db)
+            buffered = False
+        except SQLAlchemyError:
+            # The update stays buffered and the flush job retries (and logs)
+            pass
+    return {
+        "userid": user_id,
+        "bookid": book_id,
+        "progresspages": update.progresspages,
+        "buffered": buffered,
+    }
+
+
 @router.delete("/{user_id}/{book_id}", status_code=204)
-def delete_reading_list_item(user_id: int, book_id: int, db: Session = Depends(get_db)):
+def delete_reading_list_item(
+    user_id: int, book_id: int, response: Response, db: Session = Depends(get_db)
+):
     """
     Remove a book from a user's reading list.
     """
+    progress_buffer.discard(user_id, [book_id])
     try:
-        # Check if the record exists
+        # Check if the record exists, locking it so the stats delta is exact
         db_item = (
             db.query(ReadingList)
             .filter(ReadingList.userid == user_id, ReadingList.bookid == book_id)
+            .with_for_update()
             .first()
         )
 
@@ -177,8 +525,10 @@ def delete_reading_list_item(user_id: int, book_id: int, db: Session = Depends(g
             )
 
         # Delete the reading list item
+        _record_changes(db, user_id, [(book_id, reading_stats.snapshot(db_item), None)])
         db.delete(db_item)
         db.commit()
+        _after_commit(user_id, response)
         return None
 
     except SQLAlchemyError as e:
@@ -186,46 +536,168 @@ def delete_reading_list_item(user_id: int, book_id: int, db: Session = Depends(g
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@router.get("/stats/{user_id}", response_model=dict)
-def get_reading_stats(user_id: int, db: Session = Depends(get_db)):
+def _stats_snapshot(values: Optional[dict]) -> Optional[reading_stats.ItemSnapshot]:
+    if values is None:
+        return None
+    return (values["status"], values["userrating"], values["progresspages"])
+
+
+@router.post("/batch", response_model=ReadingListBatchResponse)
+def batch_update_reading_list(
+    batch: ReadingListBatchRequest,
+    user_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+):
     """
-    Get statistics about a user's reading list.
+    Apply several add, update and remove operations to a user's reading list.
+
+    Operations run in order within one transaction and each gets its own
+    result; an operation that fails (unknown book, book not on the list)
+    does not stop the others. Book IDs are validated with one IN query and
+    the changes are written with one multi-row upsert and one delete.
     """
-    from sqlalchemy import func
+    operations = batch.operations
+    book_ids = {operation.bookid for operation in operations}
+    table = ReadingList.__table__
+    progress_buffer.discard(user_id, book_ids)
 
-    # Check if the user exists
-    user = db.query(User).filter(User.userid == user_id).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        # Check if the user exists
+        if not statements.user_exists(db, user_id):
+            raise HTTPException(status_code=404, detail="User not found")
 
-    # Get counts by status
-    status_counts = (
-        db.query(ReadingList.status, func.count(ReadingList.bookid).label("count"))
-        .filter(ReadingList.userid == user_id)
-        .group_by(ReadingList.status)
-        .all()
-    )
+        known_books = set(
+            db.scalars(select(Book.bookid).where(Book.bookid.in_(book_ids)))
+        )
+        existing = {
+            row.bookid: row
+            for row in db.execute(
+                select(table)
+                .where(table.c.userid == user_id, table.c.bookid.in_(book_ids))
+                .with_for_update()
+            )
+        }
+
+        # Replay the operations against an in-memory view of the affected rows
+        fields = ("status", "progresspages", "userrating", "note")
+        original = {
+            book_id: {field: getattr(row, field) for field in fields}
+            for book_id, row in existing.items()
+        }
+        state = dict(original)
+        results = []
+        item_values = {}
+
+        for index, operation in enumerate(operations):
+            result = ReadingListBatchResult(
+                index=index, op=operation.op, bookid=operation.bookid, status_code=200
+            )
+            results.append(result)
+            current = state.get(operation.bookid)
+
+            if operation.bookid not in known_books:
+                result.status_code, result.detail = 404, "Book not found"
+                continue
+
+            if operation.op == "remove":
+                if current is None:
+                    result.status_code = 404
+                    result.detail = "Book not found in the user's reading list"
+                    continue
+                state[operation.bookid] = None
+                result.status_code = 204
+                continue
+
+            invalid = operation.validation_error()
+            if invalid is not None:
+                result.status_code, result.detail = 400, invalid
+                continue
+            if operation.op == "update" and current is None:
+                result.status_code = 404
+                result.detail = "Book not found in the user's reading list"
+                continue
+            if operation.op == "add" and operation.status is None:
+                result.status_code, result.detail = 400, "Status is required to add"
+                continue
+
+            values = dict(current) if current else {field: None for field in fields}
+            for field in fields:
+                value = getattr(operation, field)
+                if value is not None:
+                    values[field] = value
+            state[operation.bookid] = values
+            if current is None:
+                result.status_code = 201
+            item_values[index] = values
+
+        # Write the final state of every book that changed
+        upserts = [
+            {"userid": user_id, "bookid": book_id, **values}
+            for book_id, values in state.items()
+            if values is not None and values != original.get(book_id)
+        ]
+        removals = [
+            book_id
+            for book_id, values in state.items()
+            if values is None and book_id in original
+        ]
+
+        added_at = {book_id: row.addedat for book_id, row in existing.items()}
+        if upserts:
+            upsert = insert(table).values(upserts)
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[table.c.userid, table.c.bookid],
+                set_={field: upsert.excluded[field] for field in fields},
+            )
+            for row in db.execute(upsert.returning(table.c.bookid, table.c.addedat)):
+                added_at[row.bookid] = row.addedat
+        if removals:
+            db.execute(
+                delete(table).where(
+                    table.c.userid == user_id, table.c.bookid.in_(removals)
+                )
+            )
 
-    # Convert to dictionary
-    status_dict = {status: count for status, count in status_counts}
+        _record_changes(
+            db,
+            user_id,
+            [
+                (
+                    book_id,
+                    _stats_snapshot(original.get(book_id)),
+                    _stats_snapshot(state.get(book_id)),
+                )
+                for book_id in book_ids
+                if original.get(book_id) != state.get(book_id)
+            ],
+        )
+        db.commit()
+        _after_commit(
+            user_id,
+            response,
+            [
+                (book_id, added_at[book_id])
+                for book_id in book_ids
+                if book_id not in existing and state.get(book_id) is not None
+            ],
+        )
 
-    # Get average rating given by user
-    avg_rating = (
-        db.query(func.avg(ReadingList.userrating).label("avg_rating"))
-        .filter(ReadingList.userid == user_id, ReadingList.userrating.isnot(None))
-        .scalar()
-    )
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-    # Get total number of books in reading list
-    total_books = db.query(ReadingList).filter(ReadingList.userid == user_id).count()
+    for index, values in item_values.items():
+        result = results[index]
+        # An item added and removed again in the same batch has no row
+        if state.get(result.bookid) is None:
+            continue
+        result.item = ReadingListItemResponse(
+            userid=user_id,
+            bookid=result.bookid,
+            addedat=added_at[result.bookid],
+            **values,
+        )
 
-    return {
-        "total_books": total_books,
-        "average_rating": float(avg_rating) if avg_rating else None,
-        "status_counts": {
-            "want": status_dict.get("want", 0),
-            "reading": status_dict.get("reading", 0),
-            "completed": status_dict.get("completed", 0),
-            "dropped": status_dict.get("dropped", 0),
-        },
-    }
+    failed = sum(1 for result in results if result.status_code >= 400)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import csv
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
 
-from config import get_db
+import query_guard
+import statements
+import user_import
+from auth import get_current_admin
+from config import get_db, get_read_db
 from models import User, ReadingList
-from models import UserResponse, UserCreate
+from models import UserResponse, UserCreate, UserImportResponse
+
+# Most rows in one POST /users/import; larger files go through the CLI
+MAX_IMPORT_ROWS = 10_000
 
 router = APIRouter(
     prefix="/users",
@@ -18,7 +29,7 @@ router = APIRouter(
 def read_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get all users with pagination.
@@ -28,22 +39,22 @@ def read_users(
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def read_user(user_id: int, db: Session = Depends(get_db)):
+def read_user(user_id: int, db: Session = Depends(get_read_db)):
     """
     Get a user by ID.
     """
-    user = db.query(User).filter(User.userid == user_id).first()
+    user = statements.user_by_id(db, user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @router.get("/email/{email}", response_model=UserResponse)
-def read_user_by_email(email: str, db: Session = Depends(get_db)):
+def read_user_by_email(email: str, db: Session = Depends(get_read_db)):
     """
     Get a user by email.
     """
-    user = db.query(User).filter(User.email == email).first()
+    user = statements.user_by_email(db, email)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -57,7 +68,7 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     try:
         # Check if the user already exists
-        existing_user = db.query(User).filter(User.email == user.email).first()
+        existing_user = statements.user_by_email(db, user.email)
         if existing_user:
             raise HTTPException(
                 status_code=400, detail=f"User with email '{user.email}' already exists"
@@ -83,6 +94,47 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@router.post("/import", response_model=UserImportResponse)
+@query_guard.statement_timeout("bulk")
+async def import_users(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Create many users from a CSV or NDJSON request body (admin only).
+
+    Each row has `email`, `password` and optionally `displayname`; CSV needs
+    a header row. Emails are checked against existing users in one pass,
+    passwords are hashed with bcrypt on a small shared thread pool, and
+    users are inserted with multi-row statements. Returns an outcome per row: created,
+    exists, duplicate (repeated earlier in the body) or invalid.
+    """
+    try:
+        data = (await request.body()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8")
+    if data.count("\n") > MAX_IMPORT_ROWS + 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_IMPORT_ROWS} rows per request; use user_import.py",
+        )
+
+    try:
+        outcomes = await asyncio.to_thread(user_import.import_users, db, data, format)
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {str(e)}")
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return {
+        **user_import.summarize(outcomes),
+        "results": [asdict(outcome) for outcome in outcomes],
+    }
+
+
 @router.put("/{user_id}", response_model=UserResponse)
 def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
     """
@@ -91,13 +143,13 @@ def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
     """
     try:
         # Check if the user exists
-        db_user = db.query(User).filter(User.userid == user_id).first()
+        db_user = statements.user_by_id(db, user_id)
         if db_user is None:
             raise HTTPException(status_code=404, detail="User not found")
 
         # Check if the email is already in use by another user
         if user.email != db_user.email:
-            existing_user = db.query(User).filter(User.email == user.email).first()
+            existing_user = statements.user_by_email(db, user.email)
             if existing_user:
                 raise HTTPException(
                     status_code=400, detail=f"Email '{user.email}' is already in use"
@@ -127,7 +179,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     """
     try:
         # Check if the user exists
-        db_user = db.query(User).filter(User.userid == user_id).first()
+        db_user = statements.user_by_id(db, user_id)
         if db_user is None:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -154,7 +206,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/count", response_model=dict)
-def count_users(db: Session = Depends(get_db)):
+def count_users(db: Session = Depends(get_read_db)):
     """
     Get the total number of users in the database.
     """
@@ -0,0 +1,258 @@
+"""
+In-process background job scheduler.
+
+Jobs run on the event loop of each API worker (started and stopped by the
+app lifespan) and execute in a worker thread. A job is scheduled either every
+`interval` seconds or by a five-field cron expression ("m h dom mon dow"),
+with optional random jitter so workers do not wake in lockstep.
+
+Single-flight jobs take a Postgres advisory lock for the duration of the run,
+so with several uvicorn workers only one of them runs the job at a time; the
+others record the run as skipped. Jobs that refresh per-process state (caches,
+in-memory indexes) are not single-flight and run in every worker.
+"""
+
+import asyncio
+import logging
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class CronSchedule:
+    """A minimal cron expression: numbers, *, */n, a-b, a-b/n and lists"""
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(field, low, high)
+            for field, (low, high) in zip(fields, self.RANGES)
+        )
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/")
+                step = int(step_text)
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(value) for value in part.split("-"))
+            else:
+                start = end = int(part)
+            if start < low or end > high or step < 1:
+                raise ValueError(f"Cron field out of range: {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        # Cron weekdays count from Sunday = 0
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """The first matching minute strictly after `moment`"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1) + timedelta(days=32)).replace(
+                    day=1, hour=0, minute=0
+                )
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+class Job:
+    """A scheduled callable plus its run statistics"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], object],
+        interval: Optional[float] = None,
+        cron: Optional[str] = None,
+        jitter: float = 0.0,
+        single_flight: bool = True,
+        run_at_startup: bool = False,
+    ):
+        if (interval is None) == (cron is None):
+            raise ValueError("A job needs exactly one of interval or cron")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        self.single_flight = single_flight
+        self.run_at_startup = run_at_startup
+        # Advisory lock key shared by every worker running this job
+        self.lock_key = zlib.crc32(f"bookshelf-job:{name}".encode())
+
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last_duration: Optional[float] = None
+        self.last_started: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[datetime] = None
+
+    def delay_until_next(self) -> float:
+        """Seconds to sleep before the next run, including jitter"""
+        now = datetime.now()
+        if self.cron:
+            delay = (self.cron.next_after(now) - now).total_seconds()
+        else:
+            delay = self.interval
+        delay += random.uniform(0, self.jitter)
+        self.next_run = now + timedelta(seconds=delay)
+        return delay
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "schedule": (
+                self.cron.expression if self.cron else f"every {self.interval}s"
+            ),
+            "single_flight": self.single_flight,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started": self.last_started,
+            "last_duration": self.last_duration,
+            "avg_duration": self.total_duration / self.runs if self.runs else None,
+            "max_duration": self.max_duration if self.runs else None,
+            "last_error": self.last_error,
+            "next_run": self.next_run,
+        }
+
+
+class Scheduler:
+    """Runs registered jobs on the event loop until stopped"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._startup_runs: List[asyncio.Event] = []
+
+    def add_job(self, name: str, func: Callable[[], object], **options) -> Job:
+        job = Job(name, func, **options)
+        self.jobs[name] = job
+        return job
+
+    async def start(self) -> None:
+        for job in self.jobs.values():
+            started = asyncio.Event()
+            if job.run_at_startup:
+                self._startup_runs.append(started)
+            self._tasks.append(asyncio.create_task(self._loop(job, started)))
+
+    async def wait_for_startup_jobs(self) -> None:
+        """Wait until every run_at_startup job has finished its first run"""
+        await asyncio.gather(*(event.wait() for event in self._startup_runs))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _loop(self, job: Job, started: asyncio.Event) -> None:
+        if job.run_at_startup:
+            await self._safe_run(job)
+            started.set()
+        while True:
+            await asyncio.sleep(job.delay_until_next())
+            await self._safe_run(job)
+
+    async def _safe_run(self, job: Job) -> None:
+        try:
+            await self.run_job(job)
+        except Exception as e:
+            # e.g. the database is unreachable for the advisory lock; keep
+            # the schedule and try again next time
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Could not run scheduled job %s", job.name)
+
+    async def run_job(self, job: Job) -> bool:
+        """Run a job now in a worker thread; False if it did not run"""
+        if job.running:
+            job.skipped += 1
+            return False
+        return await asyncio.to_thread(self._execute, job)
+
+    def _execute(self, job: Job) -> bool:
+        if not job.single_flight:
+            self._timed(job)
+            return True
+
+        # Hold a session-level advisory lock on a dedicated connection
+        with self.engine.connect() as connection:
+            locked = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": job.lock_key}
+            ).scalar()
+            if not locked:
+                job.skipped += 1
+                return False
+            try:
+                self._timed(job)
+            finally:
+                connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": job.lock_key}
+                )
+                connection.commit()
+        return True
+
+    def _timed(self, job: Job) -> None:
+        job.running = True
+        job.last_started = datetime.now()
+        started = time.perf_counter()
+        try:
+            job.func()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Scheduled job %s failed", job.name)
+        finally:
+            duration = time.perf_counter() - started
+            job.running = False
+            job.runs += 1
+            job.total_duration += duration
+            job.max_duration = max(job.max_duration, duration)
+            job.last_duration = duration
+
+    def status(self) -> List[dict]:
+        return [job.status() for job in self.jobs.values()]
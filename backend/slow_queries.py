@@ -0,0 +1,300 @@
+"""
+Slow query log.
+
+Engine event hooks time every statement the application sends, on the
+primary and the replicas alike. Statements slower than SLOW_QUERY_MS,
+including ones cancelled by their statement_timeout, go into a bounded
+in-memory ring buffer of this worker with the route that ran them, the
+shape of their parameters (types and list lengths, never values) and their
+duration, and are logged as a warning with the same fields in `extra`.
+
+A sampled fraction (SLOW_QUERY_EXPLAIN_SAMPLE) of slow SELECTs is run again
+under EXPLAIN (ANALYZE, BUFFERS) by a background thread on its own pooled
+connection, in a read-only transaction that is rolled back, and the plan is
+attached to the entry. Statements that were cancelled get a plain EXPLAIN,
+since analyzing them would only time out again. Plain EXPLAIN needs no more
+privileges than the query itself, unlike auto_explain, which needs a
+superuser to load. psycopg2 binds parameters client-side, so plans show
+them as literals: string literals, and numbers in conditions and filters,
+are replaced with ? before a plan is kept, and plans are never logged.
+
+GET /admin/slow-queries shows the buffer.
+"""
+
+import hashlib
+import itertools
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import query_guard
+from config import (
+    SLOW_QUERY_EXPLAIN_SAMPLE,
+    SLOW_QUERY_LOG_SIZE,
+    SLOW_QUERY_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text kept per entry
+STATEMENT_MAX_CHARS = 4000
+# The same statement is explained at most once per this many seconds
+EXPLAIN_COOLDOWN_SECONDS = 60
+# Plans waiting for the explain thread; more slow queries are not sampled
+EXPLAIN_QUEUE_SIZE = 16
+# statement_timeout for a re-run: twice the original duration, within bounds
+EXPLAIN_TIMEOUT_MIN_MS = 1000
+EXPLAIN_TIMEOUT_MAX_MS = 30000
+# Execution option that keeps a statement out of the log (the explains)
+SKIP_OPTION = "slow_query_log"
+
+_entries: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_explained_at: Dict[str, float] = {}
+_explain_queue: queue.Queue = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+_explain_thread: Optional[threading.Thread] = None
+_counters = {"slow": 0, "explained": 0, "explain_failed": 0}
+
+# Literals in plan text: quoted strings anywhere (also arrays, '{...}'), and
+# numbers on the lines holding conditions and filters (elsewhere they are
+# costs, row counts and timings)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?(?![\w.])")
+_CONDITION_LINE = re.compile(r"(?<!Removed by )(Cond|Filter|Key): ")
+
+
+def _type_name(value) -> str:
+    if isinstance(value, (list, tuple)):
+        inner = type(value[0]).__name__ if value else "empty"
+        return f"{inner}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Types (and list lengths) of a statement's parameters, without values"""
+    if executemany:
+        rows = list(parameters or ())
+        first = parameter_shape(rows[0]) if rows else None
+        return {"rows": len(rows), "row": first}
+    if isinstance(parameters, dict):
+        return {name: _type_name(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_type_name(value) for value in parameters]
+    return None
+
+
+def fingerprint(statement: str) -> str:
+    """Short stable key for the statement text, whitespace-insensitive"""
+    normalized = " ".join(statement.split())
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def redact_plan(lines: List[str]) -> List[str]:
+    """Plan lines with the statement's parameter values replaced by ?"""
+    redacted = []
+    for line in lines:
+        line = _STRING_LITERAL.sub("'?'", line)
+        match = _CONDITION_LINE.search(line)
+        if match:
+            head, tail = line[: match.end()], line[match.end() :]
+            line = head + _NUMBER_LITERAL.sub("?", tail)
+        redacted.append(line)
+    return redacted
+
+
+def explainable(statement: str) -> bool:
+    """Whether re-running the statement under EXPLAIN ANALYZE is harmless"""
+    head = statement.lstrip().upper()
+    if not head.startswith(("SELECT", "WITH")):
+        return False
+    # The read-only transaction stops writes, but session-level advisory
+    # locks would outlive it on the pooled connection
+    return "PG_ADVISORY" not in head
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish(conn, statement, parameters, context, executemany, None)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A statement cancelled by its statement_timeout never reaches
+    # after_cursor_execute, and is the slowest of all
+    context = exception_context.execution_context
+    if context is None or exception_context.statement is None:
+        return
+    _finish(
+        exception_context.connection,
+        exception_context.statement,
+        exception_context.parameters,
+        context,
+        context.executemany,
+        exception_context.original_exception,
+    )
+
+
+def _finish(conn, statement, parameters, context, executemany, error) -> None:
+    started = getattr(context, "_slow_query_started", None)
+    if started is None:
+        return
+    context._slow_query_started = None
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < SLOW_QUERY_MS or conn is None:
+        return
+    if not conn.get_execution_options().get(SKIP_OPTION, True):
+        return
+    _record(conn.engine, statement, parameters, executemany, duration_ms, error)
+
+
+def _record(engine, statement, parameters, executemany, duration_ms, error) -> None:
+    key = fingerprint(statement)
+    url = engine.url
+    entry = {
+        "id": next(_ids),
+        "at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration_ms, 1),
+        "route": query_guard.current_route(),
+        "database": f"{url.host}/{url.database}",
+        "fingerprint": key,
+        "statement": statement[:STATEMENT_MAX_CHARS],
+        "parameters": parameter_shape(parameters, executemany),
+        "error": None if error is None else type(error).__name__,
+        "explain": None,
+    }
+    with _lock:
+        _counters["slow"] += 1
+        _entries.append(entry)
+        sample = _should_explain(key, statement, executemany)
+    logger.warning(
+        "Slow query %s: %.1f ms on %s",
+        key,
+        duration_ms,
+        entry["route"] or "background",
+        extra={"slow_query": {k: v for k, v in entry.items() if k != "explain"}},
+    )
+    if sample:
+        _queue_explain(entry, engine, statement, parameters, analyze=error is None)
+
+
+def _should_explain(key: str, statement: str, executemany: bool) -> bool:
+    """Called under _lock"""
+    if executemany or not explainable(statement):
+        return False
+    if random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE:
+        return False
+    now = time.monotonic()
+    if (
+        now - _explained_at.get(key, -EXPLAIN_COOLDOWN_SECONDS)
+        < EXPLAIN_COOLDOWN_SECONDS
+    ):
+        return False
+    _explained_at[key] = now
+    if len(_explained_at) > SLOW_QUERY_LOG_SIZE * 4:
+        cutoff = now - EXPLAIN_COOLDOWN_SECONDS
+        for old in [k for k, at in _explained_at.items() if at < cutoff]:
+            del _explained_at[old]
+    return True
+
+
+def _queue_explain(entry, engine, statement, parameters, analyze: bool) -> None:
+    global _explain_thread
+    entry["explain"] = {"status": "pending"}
+    try:
+        _explain_queue.put_nowait((entry, engine, statement, parameters, analyze))
+    except queue.Full:
+        entry["explain"] = None
+        return
+    with _lock:
+        if _explain_thread is None or not _explain_thread.is_alive():
+            _explain_thread = threading.Thread(
+                target=_explain_worker, name="slow-query-explain", daemon=True
+            )
+            _explain_thread.start()
+
+
+def _explain_worker() -> None:
+    while True:
+        entry, engine, statement, parameters, analyze = _explain_queue.get()
+        try:
+            plan = explain(engine, statement, parameters, entry["duration_ms"], analyze)
+        except Exception as e:
+            # The driver's message only: SQLAlchemy's adds the parameters
+            error = str(getattr(e, "orig", None) or type(e).__name__)
+            error = _STRING_LITERAL.sub("'?'", error.strip().split("\n")[0])[:500]
+            _counters["explain_failed"] += 1
+            entry["explain"] = {"status": "failed", "error": error}
+            logger.warning(
+                "Could not explain slow query %s: %s", entry["fingerprint"], error
+            )
+            continue
+        _counters["explained"] += 1
+        entry["explain"] = {"status": "done", "analyze": analyze, "plan": plan}
+        logger.info(
+            "Explained slow query %s (entry %s)", entry["fingerprint"], entry["id"]
+        )
+
+
+def explain(
+    engine: Engine, statement: str, parameters, duration_ms: float, analyze: bool
+) -> List[str]:
+    """
+    Plan of a statement as text lines, in a rolled-back read-only transaction,
+    with the parameter values redacted
+    """
+    timeout_ms = int(
+        min(max(duration_ms * 2, EXPLAIN_TIMEOUT_MIN_MS), EXPLAIN_TIMEOUT_MAX_MS)
+    )
+    options = "ANALYZE, BUFFERS" if analyze else "BUFFERS"
+    with engine.connect() as connection:
+        connection = connection.execution_options(**{SKIP_OPTION: False})
+        transaction = connection.begin()
+        try:
+            connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+            rows = connection.exec_driver_sql(
+                f"EXPLAIN ({options}) {statement}", parameters or ()
+            ).fetchall()
+        finally:
+            transaction.rollback()
+    return redact_plan([row[0] for row in rows])
+
+
+def entries(limit: int = 50, min_ms: float = 0) -> List[dict]:
+    """Recorded slow queries, newest first"""
+    with _lock:
+        recorded = list(_entries)
+    recorded = [entry for entry in reversed(recorded) if entry["duration_ms"] >= min_ms]
+    return [dict(entry) for entry in recorded[:limit]]
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def status() -> dict:
+    return {
+        "threshold_ms": SLOW_QUERY_MS,
+        "explain_sample": SLOW_QUERY_EXPLAIN_SAMPLE,
+        "capacity": _entries.maxlen,
+        "buffered": len(_entries),
+        "explain_queue": _explain_queue.qsize(),
+        **_counters,
+    }
@@ -0,0 +1,93 @@
+"""
+Profile API worker cold start: the slowest imports of `main` and the time
+of each warmup step.
+
+    python startup_profile.py              # top 20 imports and warmup steps
+    python startup_profile.py --top 40
+    python startup_profile.py --no-db      # skip the database steps
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_imports(module: str = "main") -> Tuple[float, List[Tuple[str, int, int]]]:
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Returns the total import seconds and (module, self us, cumulative us) for
+    every module imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "SCHEDULER_ENABLED": "0"},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    total = next((row[2] for row in rows if row[0] == module), 0)
+    return total / 1e6, rows
+
+
+def profile_warmup(connect: bool = True) -> Tuple[float, List[dict]]:
+    """Import the app in this process and run its pre-request warmup steps"""
+    sys.path.insert(0, BACKEND_DIR)
+    started = time.perf_counter()
+    import main
+    from warmup import Warmup
+
+    imported = time.perf_counter() - started
+    warmup = Warmup()
+    warmup.run_core(main.app, connect=connect)
+    return imported, warmup.steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API worker startup")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--no-db", action="store_true", help="skip pool warmup")
+    args = parser.parse_args()
+
+    print(f"\n🔍 Profiling import of {args.module}")
+    print("=" * 60)
+    total, rows = profile_imports(args.module)
+    print(f"Total import time: {total:.3f}s\n")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[
+        : args.top
+    ]:
+        print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:8.1f}ms  {name}")
+
+    print("\nSlowest by self time:")
+    for name, self_us, _ in sorted(rows, key=lambda row: -row[1])[: args.top // 2]:
+        print(f"{self_us / 1000:10.1f}ms  {name}")
+
+    print("\n🔍 Profiling warmup steps")
+    print("=" * 60)
+    imported, steps = profile_warmup(connect=not args.no_db)
+    print(f"{imported * 1000:10.1f}ms  import main (warm interpreter)")
+    for step in steps:
+        status = f"  ❌ {step['error'].splitlines()[0]}" if step["error"] else ""
+        print(f"{step['seconds'] * 1000:10.1f}ms  {step['name']}{status}")
+    warmup_total = sum(step["seconds"] for step in steps)
+    print(f"\n✅ Cold start: {total + warmup_total:.3f}s before serving requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Cached statements for the hottest single-row lookups.
+
+Each lookup is a lambda_stmt: SQLAlchemy builds and compiles the SELECT once
+per call site and afterwards only extracts the new parameter values from the
+closure, skipping the Query construction and cache-key generation that
+db.query(...).filter(...) repeats on every call. With DB_DRIVER=psycopg the
+driver also prepares them server-side after DB_PREPARE_THRESHOLD executions,
+so Postgres skips parsing and planning too (see config.py).
+
+    python bench_statements.py    # compare with the legacy query API
+"""
+
+from typing import Optional
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.orm import Session
+
+from models import Author, Book, Genre, User
+
+
+def book_by_id(db: Session, book_id: int) -> Optional[Book]:
+    return db.scalars(
+        lambda_stmt(lambda: select(Book).where(Book.bookid == book_id))
+    ).first()
+
+
+def user_by_id(db: Session, user_id: int) -> Optional[User]:
+    return db.scalars(
+        lambda_stmt(lambda: select(User).where(User.userid == user_id))
+    ).first()
+
+
+def user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.scalars(
+        lambda_stmt(lambda: select(User).where(User.email == email))
+    ).first()
+
+
+def user_exists(db: Session, user_id: int) -> bool:
+    return (
+        db.scalars(
+            lambda_stmt(lambda: select(User.userid).where(User.userid == user_id))
+        ).first()
+        is not None
+    )
+
+
+def author_by_name(db: Session, name: str) -> Optional[Author]:
+    return db.scalars(
+        lambda_stmt(lambda: select(Author).where(Author.name == name))
+    ).first()
+
+
+def genre_by_name(db: Session, name: str) -> Optional[Genre]:
+    return db.scalars(
+        lambda_stmt(lambda: select(Genre).where(Genre.name == name))
+    ).first()
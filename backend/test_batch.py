@@ -0,0 +1,62 @@
+"""
+Batch Endpoint Tests
+Runs POST /batch against routes that need no database.
+
+    python -m pytest test_batch.py
+"""
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from config import BATCH_MAX_REQUESTS, get_read_db
+from routers import batch
+
+app = FastAPI()
+app.include_router(batch.router)
+
+
+@app.get("/echo/{value}")
+def echo(value: str, limit: int = 1, db=Depends(get_read_db)):
+    return {"value": value, "limit": limit, "session": id(db)}
+
+
+@app.get("/fail")
+def fail():
+    raise HTTPException(status_code=418, detail="teapot")
+
+
+client = TestClient(app)
+
+
+def post(paths):
+    return client.post(
+        "/batch",
+        json={"requests": [{"id": str(i), "path": p} for i, p in enumerate(paths)]},
+    )
+
+
+def test_results_in_order_with_own_status():
+    response = post(["/echo/a?limit=5", "/fail", "/missing", "/echo/b%20c"])
+    assert response.status_code == 200
+    items = response.json()["responses"]
+    assert [item["id"] for item in items] == ["0", "1", "2", "3"]
+    assert [item["status"] for item in items] == [200, 418, 404, 200]
+    assert items[0]["body"]["limit"] == 5
+    assert items[1]["body"] == {"detail": "teapot"}
+    assert items[3]["body"]["value"] == "b c"
+
+
+def test_sub_requests_share_one_read_session():
+    items = post(["/echo/a", "/echo/b", "/echo/c"]).json()["responses"]
+    assert len({item["body"]["session"] for item in items}) == 1
+    # Outside a batch each request gets its own session
+    assert client.get("/echo/a").json()["session"] != items[0]["body"]["session"]
+
+
+def test_limits():
+    assert post(["/echo/a"] * (BATCH_MAX_REQUESTS + 1)).status_code == 400
+    assert post(["/echo/a?limit=10000"]).status_code == 400
+    assert post(["/batch"]).status_code == 400
+    assert post(["http://example.com/echo/a"]).status_code == 400
+    assert post(["/readinglist/1/events"]).status_code == 400
+    assert post([]).json() == {"responses": []}
@@ -0,0 +1,133 @@
+"""
+Cache Backend Tests
+Runs the cache backends against an in-process cache_server.py; no database
+or API server needed.
+
+    python -m pytest test_cache.py
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from cache import INVALIDATE_CHANNEL, Cache, LocalBackend, RespBackend
+from cache_server import serve
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    """Run cache_server.py on a temporary Unix socket in a background thread"""
+    socket_path = os.path.join(tempfile.mkdtemp(), "cache.sock")
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(serve(socket_path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"unix://{socket_path}"
+
+    async def shutdown():
+        server.close()
+        handlers = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_local_backend_evicts_least_recently_used():
+    backend = LocalBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    backend.get("a")
+    backend.set("c", 3, ttl=60)
+    assert backend.get("a") == 1
+    assert backend.get("b") is None
+    assert backend.get("c") == 3
+
+
+def test_local_backend_expires_entries():
+    backend = LocalBackend()
+    backend.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("a") is None
+
+
+def test_resp_backend_round_trip(server_url):
+    backend = RespBackend(server_url)
+    backend.set("bookshelf:test:1", {"total_books": 3, "ids": [1, 2]}, ttl=60)
+    assert backend.get("bookshelf:test:1") == {"total_books": 3, "ids": [1, 2]}
+    backend.delete("bookshelf:test:1")
+    assert backend.get("bookshelf:test:1") is None
+
+
+def test_resp_backend_expires_entries(server_url):
+    backend = RespBackend(server_url)
+    backend.set("bookshelf:test:short", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("bookshelf:test:short") is None
+
+
+def test_workers_share_entries_and_invalidations(server_url):
+    # Two "workers", each with its own connection to the shared server
+    first = Cache("shared", 60, backend=RespBackend(server_url))
+    second = Cache("shared", 60, backend=RespBackend(server_url))
+    first.set(7, [[1, 0.5]])
+    assert second.get(7) == [[1, 0.5]]
+    second.invalidate(7)
+    assert first.get(7) is None
+
+
+def test_recently_invalidated_entry_is_not_set_from_stale_reads(server_url):
+    first = Cache("settled", 60, backend=RespBackend(server_url))
+    second = Cache("settled", 60, backend=RespBackend(server_url))
+    first.invalidate(3)
+    second.set(3, "maybe stale", unless_dropped_within=10)
+    assert second.get(3) is None
+    second.set(4, "fresh", unless_dropped_within=10)
+    assert second.get(4) == "fresh"
+
+
+def test_clear_only_drops_own_namespace(server_url):
+    backend = RespBackend(server_url)
+    stats = Cache("stats_clear", 60, backend=backend)
+    other = Cache("other_clear", 60, backend=backend)
+    for user_id in range(5):
+        stats.set(user_id, user_id)
+    other.set(1, "kept")
+    stats.clear()
+    assert all(stats.get(user_id) is None for user_id in range(5))
+    assert other.get(1) == "kept"
+
+
+def test_announce_notifies_within_the_writes_transaction():
+    class Transaction:
+        def __init__(self):
+            self.statements = []
+
+        def execute(self, statement, params):
+            self.statements.append(params)
+
+    cache = Cache("announced", 60, backend=LocalBackend())
+    cache.set(1, "old")
+    transaction = Transaction()
+    cache.announce(1, transaction)
+    assert transaction.statements[0]["channel"] == INVALIDATE_CHANNEL
+    # This process drops its own copy once the write has committed
+    assert cache.get(1) == "old"
+    cache.invalidate(1, broadcast=False)
+    assert cache.get(1) is None
+
+
+def test_unreachable_server_is_a_miss():
+    cache = Cache("down", 60, backend=RespBackend("unix:///nonexistent/cache.sock"))
+    cache.set(1, "value")
+    assert cache.get(1) is None
@@ -0,0 +1,206 @@
+"""
+Catalog Engine Tests
+Listings from the in-memory catalog against a plain Python reference of
+read_books's SQL, on a random catalog, before and after merging changes.
+
+    python -m pytest test_catalog_engine.py
+"""
+
+import random
+from collections import namedtuple
+
+import pytest
+
+import catalog_engine
+
+Row = namedtuple(
+    "Row",
+    "bookid title averagerating totalratings reviewscount pages author_ids genre_ids",
+)
+WORDS = ["the", "night", "garden", "river", "house", "Star", "war", "ocean"]
+
+
+def random_row(rng, bookid):
+    def maybe(value):
+        return None if rng.random() < 0.1 else value
+
+    return Row(
+        bookid,
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))),
+        maybe(rng.randint(0, 50) / 10),
+        maybe(rng.randint(0, 5000)),
+        maybe(rng.randint(0, 500)),
+        maybe(rng.randint(10, 900)),
+        sorted(rng.sample(range(1, 40), rng.randint(0, 3))),
+        sorted(rng.sample(range(1, 15), rng.randint(0, 4))),
+    )
+
+
+def reference(
+    rows,
+    skip,
+    limit,
+    title=None,
+    author_ids=None,
+    genre_ids=None,
+    match="any",
+    min_rating=None,
+    max_rating=None,
+    sort="bookid",
+):
+    def tagged(ids, wanted):
+        return (
+            set(wanted) <= set(ids) if match == "all" else bool(set(ids) & set(wanted))
+        )
+
+    hits = [
+        r
+        for r in rows
+        if (not title or title.lower() in r.title.lower())
+        and (author_ids is None or tagged(r.author_ids, author_ids))
+        and (genre_ids is None or tagged(r.genre_ids, genre_ids))
+        and (
+            min_rating is None
+            or (r.averagerating is not None and r.averagerating >= min_rating)
+        )
+        and (
+            max_rating is None
+            or (r.averagerating is not None and r.averagerating <= max_rating)
+        )
+    ]
+    column, descending = catalog_engine.SORTS[sort]
+    if column is None:
+        hits.sort(key=lambda r: r.bookid)
+    else:
+
+        def key(r):
+            value = getattr(r, column)
+            if value is None:
+                return (1, 0, r.bookid)
+            return (0, -value if descending else value, r.bookid)
+
+        hits.sort(key=key)
+    return [r.bookid for r in hits[skip : skip + limit]], len(hits)
+
+
+QUERIES = [
+    {},
+    {"title": "night"},
+    {"title": "STAR war"},
+    {"author_ids": [3, 7]},
+    {"author_ids": [3, 7], "match": "all"},
+    {"genre_ids": [2]},
+    {"genre_ids": [1, 2, 5], "match": "all"},
+    {"genre_ids": []},
+    {"genre_ids": [-1], "match": "all"},
+    {"min_rating": 3.5},
+    {"min_rating": 2.0, "max_rating": 4.2, "genre_ids": [4, 9]},
+    {"sort": "rating"},
+    {"sort": "ratings", "title": "the"},
+    {"sort": "reviews", "genre_ids": [3]},
+    {"sort": "pages", "min_rating": 1.0},
+]
+
+
+def check(catalog, rows):
+    for query in QUERIES:
+        for skip, limit in ((0, 12), (24, 12), (0, 100), (10_000, 5)):
+            assert catalog.browse(skip, limit, **query) == reference(
+                rows, skip, limit, **query
+            ), query
+
+
+@pytest.fixture
+def rows():
+    rng = random.Random(412)
+    return [random_row(rng, bookid) for bookid in rng.sample(range(1, 5000), 1500)]
+
+
+def test_browse_matches_reference(rows):
+    rows.sort(key=lambda r: r.bookid)
+    check(catalog_engine.Catalog.from_rows(rows), rows)
+
+
+def test_merge_matches_rebuild(rows):
+    rng = random.Random(7)
+    rows.sort(key=lambda r: r.bookid)
+    catalog = catalog_engine.Catalog.from_rows(rows)
+
+    removed = {r.bookid for r in rng.sample(rows, 100)}
+    updated = [random_row(rng, r.bookid) for r in rng.sample(rows, 100)]
+    added = [random_row(rng, bookid) for bookid in range(6000, 6050)]
+    changes = [r for r in updated + added if r.bookid not in removed]
+
+    merged = catalog.merge(changes, removed)
+    by_id = {r.bookid: r for r in rows if r.bookid not in removed}
+    by_id.update({r.bookid: r for r in changes})
+    expected = [by_id[bookid] for bookid in sorted(by_id)]
+
+    assert merged.ids.tolist() == sorted(by_id)
+    check(merged, expected)
+    # The original is left as it was for requests still reading it
+    check(catalog, rows)
+
+
+def test_names_resolve_like_the_router():
+    names = catalog_engine.Names()
+    names.authors = {"Ann": [1, 4], "Bo": [2]}
+    assert sorted(names.resolve(names.authors, ["Ann", "Bo"], "any")) == [1, 2, 4]
+    assert names.resolve(names.authors, ["Bo", "Nobody"], "any") == [2]
+    assert names.resolve(names.authors, ["Bo", "Nobody"], "all") == [-1]
+    # Two authors named Ann outnumber the one unknown name, as in _tag_filter
+    assert sorted(names.resolve(names.authors, ["Ann", "Nobody"], "all")) == [1, 4]
+
+
+def test_engine_falls_back_until_loaded_and_for_wildcards(rows):
+    engine = catalog_engine.Engine()
+    filters = dict(
+        skip=0,
+        limit=12,
+        title=None,
+        authors=None,
+        genres=None,
+        match="any",
+        min_rating=None,
+        max_rating=None,
+        sort="bookid",
+    )
+    assert engine.browse(**filters) is None
+
+    rows.sort(key=lambda r: r.bookid)
+    engine.catalog = catalog_engine.Catalog.from_rows(rows)
+    assert engine.browse(**filters)[1] == len(rows)
+    assert engine.browse(**{**filters, "title": "100%"}) is None
+    assert engine.status()["fallback"] == 2
+
+
+def test_sync_with_changes_reloads_renamed_names(rows, monkeypatch):
+    rows.sort(key=lambda r: r.bookid)
+    old, new = catalog_engine.Names(), catalog_engine.Names()
+    old.authors = {"Old Name": [3]}
+    new.authors = {"New Name": [3]}
+    loads = {"names": old, "rows": rows}
+    monkeypatch.setattr(catalog_engine.Names, "load", lambda db: loads["names"])
+    monkeypatch.setattr(catalog_engine, "_load", lambda db, ids=None: loads["rows"])
+    engine = catalog_engine.Engine()
+    assert engine.sync(db=None) == len(rows)
+    filters = dict(
+        skip=0,
+        limit=5000,
+        title=None,
+        genres=None,
+        match="any",
+        min_rating=None,
+        max_rating=None,
+        sort="bookid",
+    )
+    written = len([r for r in rows if 3 in r.author_ids])
+    assert engine.browse(authors=["Old Name"], **filters)[1] == written
+
+    # The rename rewrote book_doc for the author's books, which notified
+    loads["names"] = new
+    loads["rows"] = [r for r in rows if 3 in r.author_ids]
+    engine.changed(r.bookid for r in loads["rows"])
+    assert engine.sync(db=None) == written
+    assert engine.browse(authors=["New Name"], **filters)[1] == written
+    assert engine.browse(authors=["Old Name"], **filters)[1] == 0
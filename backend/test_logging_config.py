@@ -0,0 +1,89 @@
+"""
+Logging Tests
+JSON lines through the queue, request IDs and sampling.
+
+    python -m pytest test_logging_config.py
+"""
+
+import io
+import json
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import logging_config
+
+logger = logging.getLogger("test_logging_config")
+
+app = FastAPI()
+app.add_middleware(logging_config.RequestIdMiddleware)
+
+
+@app.get("/hello")
+def hello():
+    logger.warning("Hello %s", "there", extra={"event": "hello", "userid": 7})
+    return {"ok": True}
+
+
+def _lines(run, sample=""):
+    stream = io.StringIO()
+    logging_config.setup_logging(stream=stream, format_="json", sample=sample)
+    try:
+        run()
+    finally:
+        logging_config.shutdown_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines_with_request_id():
+    client = TestClient(app)
+    responses = []
+    lines = _lines(
+        lambda: responses.append(
+            client.get("/hello", headers={"X-Request-ID": "abc123"})
+        )
+    )
+    assert responses[0].headers["X-Request-ID"] == "abc123"
+    record = next(line for line in lines if line["logger"] == "test_logging_config")
+    assert record["message"] == "Hello there"
+    assert record["request_id"] == "abc123"
+    assert record["event"] == "hello"
+    assert record["userid"] == 7
+    assert record["level"] == "WARNING"
+
+
+def test_generated_request_id():
+    response = TestClient(app).get("/hello")
+    assert len(response.headers["X-Request-ID"]) == 32
+
+
+def test_exception_formatted_by_listener():
+    def run():
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed")
+
+    record = next(line for line in _lines(run) if line["message"] == "Failed")
+    assert "ValueError: boom" in record["exc"]
+    assert "request_id" not in record
+
+
+def test_sampling_keeps_errors():
+    def run():
+        for _ in range(200):
+            logger.warning("Frequent", extra={"event": "login"})
+        logger.error("Rare", extra={"event": "login"})
+
+    lines = _lines(run, sample="login=0")
+    messages = [line["message"] for line in lines]
+    assert "Frequent" not in messages
+    assert "Rare" in messages
+
+
+def test_parse_pairs():
+    assert logging_config.parse_pairs("a=1, b.c = DEBUG,bad,") == {
+        "a": "1",
+        "b.c": "DEBUG",
+    }
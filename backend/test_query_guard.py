@@ -0,0 +1,128 @@
+"""
+Query Guard Tests
+Route classes, cancellation on client disconnect and error mapping, with
+stand-ins for the database connection.
+
+    python -m pytest test_query_guard.py
+"""
+
+import asyncio
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+import query_guard
+
+app = FastAPI()
+app.add_middleware(query_guard.QueryGuardMiddleware)
+
+
+@app.get("/class")
+def read_class():
+    return {"class": query_guard._current.get().route_class()}
+
+
+@app.post("/class")
+def write_class():
+    return {"class": query_guard._current.get().route_class()}
+
+
+@app.post("/bulk")
+@query_guard.statement_timeout("bulk")
+def bulk_class():
+    return {"class": query_guard._current.get().route_class()}
+
+
+class FakeConnection:
+    """Blocks like a running query until cancelled"""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+connection = FakeConnection()
+
+
+@app.get("/slow")
+def slow():
+    guard = query_guard._current.get()
+    guard.connections.add(connection)
+    finished = connection.cancelled.wait(timeout=5)
+    return {"cancelled": finished}
+
+
+client = TestClient(app)
+
+
+def test_route_classes():
+    assert client.get("/class").json() == {"class": "read"}
+    assert client.post("/class").json() == {"class": "write"}
+    assert client.post("/bulk").json() == {"class": "bulk"}
+
+
+def test_disconnect_cancels_running_queries():
+    async def run():
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/slow",
+            "raw_path": b"/slow",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [],
+            "client": ("test", 1),
+            "server": ("test", 80),
+        }
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        gone = asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        request = asyncio.create_task(app(scope, receive, send))
+        await asyncio.sleep(0.2)
+        assert not connection.cancelled.is_set()
+        gone.set()
+        await asyncio.wait_for(request, timeout=5)
+        return sent
+
+    sent = asyncio.run(run())
+    assert connection.cancelled.is_set()
+    assert b'"cancelled":true' in sent[-1]["body"]
+
+
+class FakeDriverError(Exception):
+    def __init__(self, pgcode):
+        self.pgcode = pgcode
+
+
+def test_error_mapping():
+    timeout = OperationalError("SELECT 1", {}, FakeDriverError("57014"))
+    other = OperationalError("SELECT 1", {}, FakeDriverError("08006"))
+    assert query_guard.query_canceled(timeout)
+    assert not query_guard.query_canceled(other)
+
+    # Routes re-raise database errors as HTTP 500s
+    try:
+        try:
+            raise timeout
+        except OperationalError:
+            raise RuntimeError("Database error")
+    except RuntimeError as wrapped:
+        assert query_guard.query_canceled(wrapped)
@@ -0,0 +1,85 @@
+"""
+Slow Query Log Tests
+Statement timing, the ring buffer and parameter shapes, against an
+in-memory SQLite engine.
+
+    python -m pytest test_slow_queries.py
+"""
+
+from sqlalchemy import create_engine, text
+
+import slow_queries
+
+engine = create_engine("sqlite://")
+
+
+def run(sql, **params):
+    with engine.connect() as connection:
+        return connection.execute(text(sql), params).fetchall()
+
+
+def test_records_statements_over_threshold(monkeypatch):
+    slow_queries.clear()
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_EXPLAIN_SAMPLE", 0)
+    run("SELECT :title, :ids", title="Dune", ids=3)
+
+    entry = slow_queries.entries(limit=1)[0]
+    assert entry["statement"].startswith("SELECT")
+    # SQLite binds positionally; psycopg2 by name
+    shape = entry["parameters"]
+    assert list(shape.values() if isinstance(shape, dict) else shape) == ["str", "int"]
+    assert entry["route"] is None
+    assert entry["explain"] is None
+    assert "Dune" not in repr(entry)
+
+
+def test_fast_statements_are_not_kept(monkeypatch):
+    slow_queries.clear()
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 60_000)
+    run("SELECT 1")
+    assert slow_queries.entries() == []
+
+
+def test_ring_buffer_is_bounded(monkeypatch):
+    slow_queries.clear()
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_EXPLAIN_SAMPLE", 0)
+    for i in range(slow_queries._entries.maxlen + 5):
+        run(f"SELECT {i}")
+    recorded = slow_queries.entries(limit=10_000)
+    assert len(recorded) == slow_queries._entries.maxlen
+    assert recorded[0]["id"] > recorded[-1]["id"]
+
+
+def test_shapes_and_explainable():
+    assert slow_queries.parameter_shape({"ids": [1, 2, 3]}) == {"ids": "int[3]"}
+    assert slow_queries.parameter_shape([{"a": 1}, {"a": 2}], executemany=True) == {
+        "rows": 2,
+        "row": {"a": "int"},
+    }
+    assert slow_queries.explainable("  select * from book")
+    assert slow_queries.explainable("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert not slow_queries.explainable("UPDATE book SET title = 'x'")
+    assert not slow_queries.explainable("SELECT pg_advisory_lock(1)")
+    assert slow_queries.fingerprint("SELECT  1\n") == slow_queries.fingerprint(
+        "SELECT 1"
+    )
+
+
+def test_plans_are_redacted():
+    plan = [
+        "Index Scan using user_email_key on users  (cost=0.28..8.29 rows=1 width=72)",
+        "  Index Cond: ((email)::text = 'reader@example.com'::text)",
+        "  Filter: ((userid > 42) AND (rating >= 4.5) AND (t2.col3 = $1))",
+        "  Rows Removed by Filter: 3",
+        "        Filter: ((isbn)::text = ANY ('{0306406152,0140449132}'::text[]))",
+    ]
+    redacted = slow_queries.redact_plan(plan)
+    assert redacted[0] == plan[0]
+    assert redacted[1] == "  Index Cond: ((email)::text = '?'::text)"
+    assert (
+        redacted[2] == "  Filter: ((userid > ?) AND (rating >= ?) AND (t2.col3 = $1))"
+    )
+    assert redacted[3] == plan[3]
+    assert "0306406152" not in redacted[4]
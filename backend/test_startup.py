@@ -0,0 +1,55 @@
+"""
+Startup Budget Tests
+Fails when API worker cold start regresses past its budget. Needs no
+database (the pool warmup step is skipped).
+
+    python -m pytest test_startup.py
+"""
+
+import os
+
+from startup_profile import profile_imports, profile_warmup
+
+# Seconds allowed for `import main` in a fresh interpreter
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3.0"))
+# Seconds allowed for the warmup steps that run before serving requests
+WARMUP_BUDGET_SECONDS = float(os.getenv("WARMUP_BUDGET_SECONDS", "1.0"))
+
+
+def test_import_within_budget():
+    total, rows = profile_imports("main")
+    slowest = sorted(rows, key=lambda row: -row[1])[:10]
+    assert total <= IMPORT_BUDGET_SECONDS, (
+        f"import main took {total:.2f}s (budget {IMPORT_BUDGET_SECONDS}s); "
+        f"slowest: {[(name, f'{self_us / 1000:.0f}ms') for name, self_us, _ in slowest]}"
+    )
+
+
+def test_warmup_within_budget():
+    _, steps = profile_warmup(connect=False)
+    total = sum(step["seconds"] for step in steps)
+    assert total <= WARMUP_BUDGET_SECONDS, f"warmup took {total:.2f}s: {steps}"
+    # A step that fails returns at once and would pass the budget
+    assert all(step["error"] is None for step in steps), steps
+
+
+def test_ready_only_after_warmup(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    import warmup
+
+    monkeypatch.setattr(main, "SCHEDULER_ENABLED", False)
+    monkeypatch.setattr(warmup, "open_pool_connections", lambda: None)
+    app = main.app
+    assert TestClient(app).get("/ready").status_code == 503
+    with TestClient(app) as client:
+        response = client.get("/ready")
+    assert response.status_code == 200
+    steps = response.json()["steps"]
+    assert {step["name"] for step in steps} >= {
+        "bcrypt_backend",
+        "configure_mappers",
+        "openapi_schema",
+    }
+    assert all(step["error"] is None for step in steps), steps
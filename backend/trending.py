@@ -0,0 +1,292 @@
+"""
+Trending books: shelving counts over sliding 24h, 7d and 30d windows.
+
+Each window keeps per-bucket counters (minutes for 24h, hours for 7d and
+30d) plus a running total per book, so adding an event and expiring a bucket
+only touch the books involved. The ranked top list of each window is
+recomputed at most every TOP_REFRESH_SECONDS, so /books/trending just slices
+a cached list.
+
+Events reach the counters in two ways: this worker's reading list adds are
+recorded as soon as they commit, and a background job tails readinglist by
+addedat to pick up adds made through other workers (already counted events
+are deduplicated). At startup the counters are restored from the last
+snapshot and caught up from the database, or rebuilt from the last 30 days
+of readinglist if there is no usable snapshot. Without the job (e.g.
+SCHEDULER_ENABLED=0), /books/trending polls itself, at most every
+LAZY_POLL_SECONDS.
+
+All timestamps are on the database clock (readinglist.addedat and
+LOCALTIMESTAMP), so app servers with a different clock or time zone do not
+skew the windows.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import TRENDING_SNAPSHOT_FILE
+
+# (window name, bucket size in seconds, number of buckets)
+WINDOWS = {
+    "24h": (60, 24 * 60),
+    "7d": (3600, 7 * 24),
+    "30d": (3600, 30 * 24),
+}
+MAX_TRENDING = 100
+TOP_REFRESH_SECONDS = 30
+# Re-read this much history on every poll, since a row's addedat is its
+# transaction's start time and it may commit after a poll has moved past it
+POLL_OVERLAP = timedelta(seconds=60)
+# Seconds after which a request polls itself when the trending_poll job has
+# not (it runs every 10s when the scheduler is enabled in this process)
+LAZY_POLL_SECONDS = 30
+SNAPSHOT_FILE = TRENDING_SNAPSHOT_FILE
+SNAPSHOT_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1)
+
+Event = Tuple[int, int, datetime]
+
+
+def _seconds(moment: datetime) -> int:
+    return int((moment - _EPOCH).total_seconds())
+
+
+class Window:
+    """Bucketed shelving counts and per-book totals over a sliding span"""
+
+    def __init__(self, bucket_seconds: int, span: int):
+        self.bucket_seconds = bucket_seconds
+        self.span = span
+        self.buckets: Dict[int, Counter] = {}
+        self.totals: Counter = Counter()
+        # Bucket indexes in a heap, so expiry pops the oldest first
+        self._order: List[int] = []
+        self._cutoff: Optional[int] = None
+        self._top: List[Tuple[int, int]] = []
+        self._top_at = 0.0
+
+    def add(self, book_id: int, moment: datetime, count: int = 1) -> None:
+        bucket = _seconds(moment) // self.bucket_seconds
+        if self._cutoff is not None and bucket <= self._cutoff:
+            return
+        counts = self.buckets.get(bucket)
+        if counts is None:
+            counts = self.buckets[bucket] = Counter()
+            heapq.heappush(self._order, bucket)
+        counts[book_id] += count
+        self.totals[book_id] += count
+
+    def advance(self, now: datetime) -> None:
+        """Expire buckets that have slid out of the window ending at `now`"""
+        cutoff = _seconds(now) // self.bucket_seconds - self.span
+        if self._cutoff is not None and cutoff <= self._cutoff:
+            return
+        self._cutoff = cutoff
+        while self._order and self._order[0] <= cutoff:
+            for book_id, count in self.buckets.pop(heapq.heappop(self._order)).items():
+                remaining = self.totals[book_id] - count
+                if remaining > 0:
+                    self.totals[book_id] = remaining
+                else:
+                    del self.totals[book_id]
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        """(bookid, adds) pairs, most added first; ranked at most every few seconds"""
+        if time.monotonic() - self._top_at > TOP_REFRESH_SECONDS:
+            self._top = heapq.nlargest(
+                MAX_TRENDING, self.totals.items(), key=lambda item: (item[1], -item[0])
+            )
+            self._top_at = time.monotonic()
+        return self._top[:limit]
+
+
+class TrendingCounter:
+    """All trending windows plus the bookkeeping to feed them exactly once"""
+
+    def __init__(self):
+        self.windows = {
+            name: Window(bucket_seconds, span)
+            for name, (bucket_seconds, span) in WINDOWS.items()
+        }
+        # Latest database time seen; the windows end here
+        self.clock: Optional[datetime] = None
+        # Start of the next tail poll
+        self.since: Optional[datetime] = None
+        # Events newer than the poll overlap, to skip them if seen again
+        self._recent: Dict[Event, None] = {}
+        self._lock = threading.Lock()
+        self.polled_at = 0.0
+
+    def _add(self, event: Event) -> None:
+        if event in self._recent:
+            return
+        self._recent[event] = None
+        for window in self.windows.values():
+            window.add(event[1], event[2])
+
+    def record(self, events: Iterable[Event]) -> None:
+        """Count (userid, bookid, addedat) adds not counted before"""
+        with self._lock:
+            for event in events:
+                self._add(event)
+
+    def advance(self, now: datetime) -> None:
+        with self._lock:
+            self.clock = max(now, self.clock) if self.clock else now
+            for window in self.windows.values():
+                window.advance(self.clock)
+            horizon = self.clock - POLL_OVERLAP * 2
+            self._recent = {
+                event: None for event in self._recent if event[2] >= horizon
+            }
+
+    def top(self, window: str, limit: int) -> List[Tuple[int, int]]:
+        with self._lock:
+            return self.windows[window].top(limit)
+
+    def poll(self, db: Session) -> int:
+        """Count adds committed since the last poll; returns rows read"""
+        now = db.scalar(text("SELECT LOCALTIMESTAMP"))
+        since = now - _longest_span()
+        if self.since:
+            since = max(since, self.since - POLL_OVERLAP)
+        rows = db.execute(
+            text(
+                "SELECT userid, bookid, addedat FROM readinglist "
+                "WHERE addedat > :since"
+            ),
+            {"since": since},
+        ).all()
+        self.record((row[0], row[1], row[2]) for row in rows)
+        self.since = now
+        self.advance(now)
+        self.polled_at = time.monotonic()
+        return len(rows)
+
+    def to_snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "version": SNAPSHOT_VERSION,
+                "clock": self.clock.isoformat() if self.clock else None,
+                "since": self.since.isoformat() if self.since else None,
+                "windows": {
+                    name: [
+                        [bucket, list(counts.items())]
+                        for bucket, counts in window.buckets.items()
+                    ]
+                    for name, window in self.windows.items()
+                },
+                "recent": [
+                    [user_id, book_id, added_at.isoformat()]
+                    for user_id, book_id, added_at in self._recent
+                ],
+            }
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "TrendingCounter":
+        counter = cls()
+        if data.get("version") != SNAPSHOT_VERSION or not data.get("since"):
+            raise ValueError("Unusable trending snapshot")
+        for name, buckets in data["windows"].items():
+            window = counter.windows[name]
+            for bucket, counts in buckets:
+                moment = _EPOCH + timedelta(seconds=bucket * window.bucket_seconds)
+                for book_id, count in counts:
+                    window.add(book_id, moment, count)
+        counter._recent = {
+            (user_id, book_id, datetime.fromisoformat(added_at)): None
+            for user_id, book_id, added_at in data["recent"]
+        }
+        counter.since = datetime.fromisoformat(data["since"])
+        counter.advance(datetime.fromisoformat(data["clock"]))
+        return counter
+
+
+def _longest_span() -> timedelta:
+    return max(
+        timedelta(seconds=bucket_seconds * span)
+        for bucket_seconds, span in WINDOWS.values()
+    )
+
+
+_counter: Optional[TrendingCounter] = None
+_counter_lock = threading.Lock()
+_lazy_poll_lock = threading.Lock()
+
+
+def save_snapshot(path: str = SNAPSHOT_FILE) -> None:
+    """Write the counters to disk atomically"""
+    if _counter is None:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(_counter.to_snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def _load_snapshot(path: str) -> Optional[TrendingCounter]:
+    try:
+        with open(path) as f:
+            return TrendingCounter.from_snapshot(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def poll(db: Session, snapshot_path: str = SNAPSHOT_FILE) -> int:
+    """
+    Catch the counters up with readinglist.
+
+    The first call in a process restores the snapshot (or starts empty, which
+    makes the poll rebuild from the last 30 days of readinglist).
+    """
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            counter = _load_snapshot(snapshot_path) or TrendingCounter()
+            read = counter.poll(db)
+            _counter = counter
+            return read
+    return _counter.poll(db)
+
+
+def ensure_polled(db: Session) -> None:
+    """
+    Poll from a request if no poll has run lately, e.g. with
+    SCHEDULER_ENABLED=0; the first request of the process loads the counters.
+    """
+    counter = _counter
+    if counter is None:
+        poll(db)
+        return
+    if time.monotonic() - counter.polled_at < LAZY_POLL_SECONDS:
+        return
+    # Concurrent requests serve the current counts instead of polling again
+    if _lazy_poll_lock.acquire(blocking=False):
+        try:
+            poll(db)
+        finally:
+            _lazy_poll_lock.release()
+
+
+def record_adds(user_id: int, added: Iterable[Tuple[int, datetime]]) -> None:
+    """Count this worker's committed adds right away"""
+    if _counter is not None:
+        _counter.record((user_id, book_id, added_at) for book_id, added_at in added)
+
+
+def top(window: str, limit: int) -> Optional[List[Tuple[int, int]]]:
+    """Top (bookid, adds) for a window; None until the counters are loaded"""
+    if _counter is None:
+        return None
+    return _counter.top(window, limit)
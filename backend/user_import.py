@@ -0,0 +1,274 @@
+"""
+Bulk import of user accounts from CSV or NDJSON, for partner onboarding.
+
+Each row has an email and a password, and optionally a displayname (CSV
+needs a header row naming the columns). Rows are validated as UserCreate,
+the emails are checked against User in one pass, and passwords are hashed
+with bcrypt on a pool of USER_IMPORT_WORKERS threads (one per core when run
+from the command line). bcrypt is CPU-bound but releases the GIL while
+hashing, so the threads use that many cores without starting processes
+inside an API worker; the pool is shared, so concurrent imports in one
+process never hash on more threads than that. A hashing failure fails the
+import. Hashed users are inserted
+INSERT_BATCH at a time with multi-row INSERT ... ON CONFLICT DO NOTHING,
+committing each batch while the pool keeps hashing, so an interrupted
+import can simply be run again: users already created are reported as
+existing.
+
+Every row gets an outcome: created, exists (email already registered),
+duplicate (email repeated earlier in the file) or invalid.
+
+    python user_import.py partner.csv
+    python user_import.py partner.ndjson --workers 8 --report outcomes.ndjson
+    python bench_user_import.py         # hashing throughput per worker count
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from auth import get_password_hash
+from config import USER_IMPORT_WORKERS
+from models import User, UserCreate
+
+FORMATS = ("csv", "ndjson")
+# Users per INSERT statement and commit
+INSERT_BATCH = 1000
+# Emails per IN list of the existence check
+LOOKUP_BATCH = 10_000
+# Below this many passwords, hashing stays on the calling thread
+PARALLEL_MIN_PASSWORDS = 64
+
+# Hashing pools by thread count; the API only ever uses USER_IMPORT_WORKERS
+_pools: Dict[int, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+@dataclass
+class ImportOutcome:
+    row: int
+    status: str
+    email: Optional[str] = None
+    userid: Optional[int] = None
+    detail: Optional[str] = None
+
+
+def parse(data: str, format: str) -> Iterator[Tuple[int, dict]]:
+    """(row number, fields) per record; CSV rows count from 1 after the header"""
+    if format == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        for number, record in enumerate(reader, start=1):
+            yield number, record
+    elif format == "ndjson":
+        for number, line in enumerate(data.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {"_error": f"Invalid JSON: {e.msg}"}
+            yield number, (
+                record
+                if isinstance(record, dict)
+                else {"_error": "Expected a JSON object"}
+            )
+    else:
+        raise ValueError(f"Unknown format {format!r}, expected one of {FORMATS}")
+
+
+def _field(record: dict, name: str):
+    value = record.get(name)
+    return value.strip() if isinstance(value, str) else value
+
+
+def _validate(record: dict) -> UserCreate:
+    if "_error" in record:
+        raise ValueError(record["_error"])
+    user = UserCreate(
+        email=_field(record, "email"),
+        password=record.get("password"),
+        displayname=_field(record, "displayname") or None,
+    )
+    if not user.password:
+        raise ValueError("Password is required")
+    return user
+
+
+def _existing_emails(db: Session, emails: Sequence[str]) -> set:
+    found = set()
+    for start in range(0, len(emails), LOOKUP_BATCH):
+        chunk = emails[start : start + LOOKUP_BATCH]
+        found.update(db.scalars(select(User.email).where(User.email.in_(chunk))))
+    return found
+
+
+def _hash_pool(workers: int) -> ThreadPoolExecutor:
+    """The process's hashing pool of this size, created on first use"""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="user-import-hash"
+            )
+        return pool
+
+
+def hash_passwords(passwords: Sequence[str], workers: int) -> Iterator[str]:
+    """bcrypt hashes in input order, computed on up to `workers` threads"""
+    if workers <= 1 or len(passwords) < PARALLEL_MIN_PASSWORDS:
+        yield from map(get_password_hash, passwords)
+        return
+    yield from _hash_pool(workers).map(get_password_hash, passwords)
+
+
+def import_users(
+    db: Session,
+    data: str,
+    format: str,
+    workers: int = USER_IMPORT_WORKERS,
+) -> List[ImportOutcome]:
+    """Create the users in `data`; returns one outcome per row"""
+    outcomes: List[ImportOutcome] = []
+    pending: List[Tuple[ImportOutcome, UserCreate]] = []
+    seen = set()
+    for number, record in parse(data, format):
+        try:
+            user = _validate(record)
+        except (ValidationError, ValueError) as e:
+            detail = (
+                "; ".join(error["msg"] for error in e.errors())
+                if isinstance(e, ValidationError)
+                else str(e)
+            )
+            email = _field(record, "email")
+            outcomes.append(
+                ImportOutcome(
+                    number,
+                    "invalid",
+                    email=email if isinstance(email, str) else None,
+                    detail=detail,
+                )
+            )
+            continue
+        outcome = ImportOutcome(number, "created", email=user.email)
+        outcomes.append(outcome)
+        if user.email in seen:
+            outcome.status = "duplicate"
+            continue
+        seen.add(user.email)
+        pending.append((outcome, user))
+
+    existing = _existing_emails(db, [user.email for _, user in pending])
+    new_users = []
+    for outcome, user in pending:
+        if user.email in existing:
+            outcome.status = "exists"
+        else:
+            new_users.append((outcome, user))
+
+    hashes = hash_passwords([user.password for _, user in new_users], workers)
+    # Closing the generator shuts the pool down if an insert fails
+    with closing(hashes):
+        for start in range(0, len(new_users), INSERT_BATCH):
+            _insert_batch(db, new_users[start : start + INSERT_BATCH], hashes)
+    return outcomes
+
+
+def _insert_batch(db: Session, batch, hashes: Iterator[str]) -> None:
+    """Insert and commit one batch of new users, recording their IDs"""
+    table = User.__table__
+    rows = [
+        {
+            "email": user.email,
+            "passwordhash": next(hashes),
+            "displayname": user.displayname or user.email.split("@")[0],
+            "role": "USER",
+        }
+        for _, user in batch
+    ]
+    inserted = {
+        row.email: row.userid
+        for row in db.execute(
+            insert(table)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[table.c.email])
+            .returning(table.c.userid, table.c.email)
+        )
+    }
+    db.commit()
+    for outcome, user in batch:
+        if user.email in inserted:
+            outcome.userid = inserted[user.email]
+        else:
+            # Registered by someone else since the existence check
+            outcome.status = "exists"
+
+
+def summarize(outcomes: Sequence[ImportOutcome]) -> dict:
+    counts = {"created": 0, "exists": 0, "duplicate": 0, "invalid": 0}
+    for outcome in outcomes:
+        counts[outcome.status] += 1
+    return counts
+
+
+def main():
+    import time
+
+    from config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import users from CSV or NDJSON")
+    parser.add_argument("path")
+    parser.add_argument(
+        "--format", choices=FORMATS, help="default: from the file extension"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="hashing threads (default: one per core)",
+    )
+    parser.add_argument("--report", help="write per-row outcomes as NDJSON")
+    args = parser.parse_args()
+
+    format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    with open(args.path, encoding="utf-8") as f:
+        data = f.read()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        print(f"\n👥 Importing users from {args.path} with {args.workers} workers...")
+        outcomes = import_users(db, data, format, args.workers)
+        elapsed = time.perf_counter() - started
+        counts = summarize(outcomes)
+        print(
+            f"✅ {counts['created']} created, {counts['exists']} already registered, "
+            f"{counts['duplicate']} duplicates, {counts['invalid']} invalid "
+            f"in {elapsed:.1f}s"
+        )
+        invalid = [outcome for outcome in outcomes if outcome.status == "invalid"]
+        for outcome in invalid[:20]:
+            print(f"   ❌ row {outcome.row}: {outcome.detail}")
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                for outcome in outcomes:
+                    f.write(json.dumps(asdict(outcome)) + "\n")
+            print(f"   Outcomes written to {args.report}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Startup warmup for API workers.
+
+Without it the first requests after a deploy pay for one-off work: opening
+database connections, configuring SQLAlchemy mappers, building the OpenAPI
+schema, loading the bcrypt backend and filling the hot caches. The lifespan
+runs the quick steps before the worker accepts requests and warms the caches
+in the background; /ready answers 503 until both are done, so a load
+balancer only routes to warm workers.
+
+Each step is timed; `python startup_profile.py` prints the same timings
+together with the slowest imports.
+"""
+
+import logging
+import time
+from typing import Callable, List, Optional
+
+from fastapi import FastAPI
+from sqlalchemy.orm import configure_mappers
+
+from config import WARMUP_CONNECTIONS, engine, replicas
+
+logger = logging.getLogger(__name__)
+
+
+def open_pool_connections() -> None:
+    """Open connections up front so early requests skip the handshake"""
+    for target in [engine] + [replica.engine for replica in replicas]:
+        connections = [target.connect() for _ in range(WARMUP_CONNECTIONS)]
+        for connection in connections:
+            connection.close()
+
+
+def load_bcrypt_backend() -> None:
+    """Import auth and bcrypt; the lowest cost factor keeps the hash quick"""
+    import bcrypt
+
+    import auth  # noqa: F401
+
+    bcrypt.hashpw(b"warmup", bcrypt.gensalt(4))
+
+
+class Warmup:
+    """Runs and times the warmup steps for one worker"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.steps: List[dict] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.finished is not None
+
+    def step(self, name: str, func: Callable[[], object]) -> None:
+        started = time.perf_counter()
+        error = None
+        try:
+            func()
+        except Exception as e:
+            # A failed step leaves that cost to the first request; it is
+            # reported by /ready but does not stop the worker
+            error = f"{type(e).__name__}: {e}"
+            logger.warning("Warmup step %s failed: %s", name, error)
+        self.steps.append(
+            {
+                "name": name,
+                "seconds": round(time.perf_counter() - started, 4),
+                "error": error,
+            }
+        )
+
+    def run_core(self, app: FastAPI, connect: bool = True) -> None:
+        """The steps that run before the worker accepts requests"""
+        self.step("configure_mappers", configure_mappers)
+        # Pydantic builds validators when the models are defined; the JSON
+        # schemas behind /openapi.json are the part still built lazily
+        self.step("openapi_schema", app.openapi)
+        self.step("bcrypt_backend", load_bcrypt_backend)
+        if connect:
+            self.step("pool_connections", open_pool_connections)
+
+    async def warm_caches(self, scheduler) -> None:
+        """Wait for the run_at_startup jobs (caches, counters) then mark ready"""
+        if scheduler is not None:
+            started = time.perf_counter()
+            await scheduler.wait_for_startup_jobs()
+            self.steps.append(
+                {
+                    "name": "startup_jobs",
+                    "seconds": round(time.perf_counter() - started, 4),
+                    "error": None,
+                }
+            )
+        self.finished = time.perf_counter()
+
+    def status(self) -> dict:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            "status": "ready" if self.ready else "warming",
+            "startup_seconds": round(end - self.started, 4),
+            "steps": self.steps,
+        }
@@ -2,6 +2,25 @@ import React, { useState, useEffect } from 'react';
 
 const API_URL = 'http://localhost:8000';
 
+// Read-your-writes: after a write the API pins this client's reads to the
+// primary database for a few seconds. The token comes back as a cookie and
+// as a header; the header is echoed too, for when the cookie is not sent.
+const READ_PRIMARY_HEADER = 'X-Read-Primary-Until';
+let readPrimaryUntil: string | null = null;
+
+async function apiFetch(url: string, init: RequestInit = {}): Promise<Response> {
+  const headers = new Headers(init.headers);
+  if (readPrimaryUntil && Number(readPrimaryUntil) > Date.now() / 1000) {
+    headers.set(READ_PRIMARY_HEADER, readPrimaryUntil);
+  }
+  const response = await fetch(url, { ...init, headers, credentials: 'include' });
+  const token = response.headers.get(READ_PRIMARY_HEADER);
+  if (token) {
+    readPrimaryUntil = token;
+  }
+  return response;
+}
+
 interface User {
   userid: number;
   email: string;
@@ -124,7 +143,7 @@ function App() {
     const searchAuthors = async () => {
       if (authorSearch.trim().length > 0) {
         try {
-          const response = await fetch(`${API_URL}/authors/?name=${encodeURIComponent(authorSearch.trim())}&limit=200`);
+          const response = await apiFetch(`${API_URL}/authors/?name=${encodeURIComponent(authorSearch.trim())}&limit=200`);
           if (response.ok) {
             const data = await response.json();
             setFilteredAuthors(data);
@@ -148,7 +167,7 @@ function App() {
     const searchGenres = async () => {
       if (genreSearch.trim().length > 0) {
         try {
-          const response = await fetch(`${API_URL}/genres/?name=${encodeURIComponent(genreSearch.trim())}&limit=200`);
+          const response = await apiFetch(`${API_URL}/genres/?name=${encodeURIComponent(genreSearch.trim())}&limit=200`);
           if (response.ok) {
             const data = await response.json();
             setFilteredGenres(data);
@@ -239,7 +258,7 @@ function App() {
       selectedAuthors.forEach(author => params.append('author', author));
       selectedGenres.forEach(genre => params.append('genre', genre));
 
-      const response = await fetch(`${API_URL}/books?${params.toString()}`);
+      const response = await apiFetch(`${API_URL}/books?${params.toString()}`);
       if (response.ok) {
         const data = await response.json();
         setBooks(data.items);
@@ -263,7 +282,7 @@ function App() {
       formData.append('username', email);
       formData.append('password', password);
 
-      const response = await fetch(`${API_URL}/auth/login`, {
+      const response = await apiFetch(`${API_URL}/auth/login`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/x-www-form-urlencoded',
@@ -298,7 +317,7 @@ function App() {
     setLoading(true);
 
     try {
-      const response = await fetch(`${API_URL}/auth/register`, {
+      const response = await apiFetch(`${API_URL}/auth/register`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -400,7 +419,7 @@ function App() {
     if (!user) return;
     try {
       setReadingListItems([]);
-      const response = await fetch(`${API_URL}/readinglist/${user.userid}?limit=100`);
+      const response = await apiFetch(`${API_URL}/readinglist/${user.userid}?limit=100`);
       if (response.ok) {
         const data = await response.json();
         setReadingListItems(data.map(normalizeReadingListItem));
@@ -413,7 +432,7 @@ function App() {
   const checkBookInReadingList = async (bookId: number) => {
     if (!user) return;
     try {
-      const response = await fetch(`${API_URL}/readinglist/${user.userid}/${bookId}`);
+      const response = await apiFetch(`${API_URL}/readinglist/${user.userid}/${bookId}`);
       if (response.ok) {
         const data = await response.json();
         setBookInReadingList(normalizeReadingListItem(data));
@@ -429,7 +448,7 @@ function App() {
     if (!user) return;
     const normalizedStatus = status.toUpperCase();
     try {
-      const response = await fetch(`${API_URL}/readinglist/?user_id=${user.userid}`, {
+      const response = await apiFetch(`${API_URL}/readinglist/?user_id=${user.userid}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -466,7 +485,7 @@ function App() {
       payload.status = (payload.status as string).toUpperCase();
     }
     try {
-      const response = await fetch(`${API_URL}/readinglist/${user.userid}/${bookId}`, {
+      const response = await apiFetch(`${API_URL}/readinglist/${user.userid}/${bookId}`, {
         method: 'PATCH',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(payload)
@@ -489,7 +508,7 @@ function App() {
     if (!user) return;
     if (!confirm('Remove this book from your reading list?')) return;
     try {
-      const response = await fetch(`${API_URL}/readinglist/${user.userid}/${bookId}`, {
+      const response = await apiFetch(`${API_URL}/readinglist/${user.userid}/${bookId}`, {
         method: 'DELETE'
       });
       if (response.ok) {
@@ -11,4 +11,10 @@ CREATE TABLE ReadingList (
     PRIMARY KEY (UserID, BookID),
     FOREIGN KEY (UserID) REFERENCES "User"(UserID) ON DELETE CASCADE,
     FOREIGN KEY (BookID) REFERENCES Book(BookID) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- Keyset pagination of a user's reading list by (AddedAt, BookID)
+CREATE INDEX idx_readinglist_user_addedat ON ReadingList (UserID, AddedAt);
+
+-- Recent adds for the trending counters (backend/trending.py)
+CREATE INDEX idx_readinglist_addedat ON ReadingList (AddedAt);
\ No newline at end of file
@@ -0,0 +1,14 @@
+DROP TABLE IF EXISTS user_reading_stats CASCADE;
+
+CREATE TABLE user_reading_stats (
+    UserID INT PRIMARY KEY,
+    Want_Count INT NOT NULL DEFAULT 0,
+    Reading_Count INT NOT NULL DEFAULT 0,
+    Completed_Count INT NOT NULL DEFAULT 0,
+    Dropped_Count INT NOT NULL DEFAULT 0,
+    Rating_Sum DECIMAL(12,1) NOT NULL DEFAULT 0,
+    Rating_Count INT NOT NULL DEFAULT 0,
+    Pages_Read BIGINT NOT NULL DEFAULT 0,
+    UpdatedAt TIMESTAMP DEFAULT NOW(),
+    FOREIGN KEY (UserID) REFERENCES "User"(UserID) ON DELETE CASCADE
+);
@@ -0,0 +1,19 @@
+DROP TABLE IF EXISTS book_also_read CASCADE;
+DROP TABLE IF EXISTS book_also_read_dirty CASCADE;
+
+-- Top-K "readers also shelved" neighbours per book, written by backend/also_read.py
+CREATE TABLE book_also_read (
+    BookID INT NOT NULL,
+    Rank INT NOT NULL,
+    NeighborID INT NOT NULL,
+    Score DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (BookID, Rank),
+    FOREIGN KEY (BookID) REFERENCES Book(BookID) ON DELETE CASCADE,
+    FOREIGN KEY (NeighborID) REFERENCES Book(BookID) ON DELETE CASCADE
+);
+
+-- Books whose readers changed since their neighbours were last computed
+CREATE TABLE book_also_read_dirty (
+    BookID INT PRIMARY KEY,
+    MarkedAt TIMESTAMP DEFAULT NOW()
+);
@@ -0,0 +1,76 @@
+DROP MATERIALIZED VIEW IF EXISTS author_stats CASCADE;
+DROP TABLE IF EXISTS author_stats_dirty CASCADE;
+DROP FUNCTION IF EXISTS mark_author_stats_dirty() CASCADE;
+
+-- Per-author aggregates, refreshed CONCURRENTLY by backend/author_stats.py
+CREATE MATERIALIZED VIEW author_stats AS
+WITH book_stats AS (
+    SELECT ba.AuthorID,
+           COUNT(*) AS Book_Count,
+           AVG(b.AverageRating)::DOUBLE PRECISION AS Avg_Rating,
+           COALESCE(SUM(b.TotalRatings), 0)::BIGINT AS Total_Ratings
+    FROM BookAuthor ba
+    JOIN Book b ON b.BookID = ba.BookID
+    GROUP BY ba.AuthorID
+),
+genre_counts AS (
+    SELECT ba.AuthorID,
+           g.Name,
+           ROW_NUMBER() OVER (
+               PARTITION BY ba.AuthorID ORDER BY COUNT(*) DESC, g.Name
+           ) AS Position
+    FROM BookAuthor ba
+    JOIN BookGenre bg ON bg.BookID = ba.BookID
+    JOIN Genre g ON g.GenreID = bg.GenreID
+    GROUP BY ba.AuthorID, g.Name
+),
+top_genres AS (
+    SELECT AuthorID, array_agg(Name::TEXT ORDER BY Position) AS Top_Genres
+    FROM genre_counts
+    WHERE Position <= 3
+    GROUP BY AuthorID
+)
+SELECT a.AuthorID,
+       COALESCE(bs.Book_Count, 0) AS Book_Count,
+       bs.Avg_Rating,
+       COALESCE(bs.Total_Ratings, 0) AS Total_Ratings,
+       COALESCE(tg.Top_Genres, ARRAY[]::TEXT[]) AS Top_Genres
+FROM Author a
+LEFT JOIN book_stats bs ON bs.AuthorID = a.AuthorID
+LEFT JOIN top_genres tg ON tg.AuthorID = a.AuthorID;
+
+-- REFRESH ... CONCURRENTLY requires a unique index
+CREATE UNIQUE INDEX idx_authorstats_authorid ON author_stats (AuthorID);
+-- Backs GET /authors/?sort=popularity
+CREATE INDEX idx_authorstats_popularity ON author_stats (Total_Ratings DESC, AuthorID);
+
+-- Single row set whenever the catalog changes; cleared by the refresh
+CREATE TABLE author_stats_dirty (
+    ID SMALLINT PRIMARY KEY DEFAULT 1 CHECK (ID = 1),
+    MarkedAt TIMESTAMP DEFAULT NOW()
+);
+
+CREATE FUNCTION mark_author_stats_dirty() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO author_stats_dirty (ID, MarkedAt) VALUES (1, NOW())
+    ON CONFLICT (ID) DO UPDATE SET MarkedAt = EXCLUDED.MarkedAt;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, so bulk loads mark the view once per statement
+CREATE TRIGGER book_author_stats_dirty
+    AFTER INSERT OR UPDATE OR DELETE ON Book
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+CREATE TRIGGER author_author_stats_dirty
+    AFTER INSERT OR DELETE ON Author
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+CREATE TRIGGER genre_author_stats_dirty
+    AFTER UPDATE ON Genre
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+CREATE TRIGGER bookauthor_author_stats_dirty
+    AFTER INSERT OR UPDATE OR DELETE ON BookAuthor
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+CREATE TRIGGER bookgenre_author_stats_dirty
+    AFTER INSERT OR UPDATE OR DELETE ON BookGenre
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
@@ -0,0 +1,171 @@
+DROP TABLE IF EXISTS book_doc CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync(INT[]) CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync_rows() CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync_moved() CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync_authors() CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync_genres() CASCADE;
+
+-- One row per book with its authors and genres inlined, so book listings and
+-- author/genre filters read a single table. Kept current by the triggers below;
+-- rebuild with backend/book_doc.py
+CREATE TABLE book_doc (
+    BookID INT PRIMARY KEY REFERENCES Book(BookID) ON DELETE CASCADE,
+    Title VARCHAR(500) NOT NULL,
+    Description TEXT,
+    BookFormat VARCHAR(50),
+    Pages INT,
+    AverageRating DECIMAL(2,1),
+    TotalRatings INT,
+    ReviewsCount INT,
+    ISBN VARCHAR(20) NOT NULL,
+    ISBN13 VARCHAR(30),
+    ImageURL TEXT,
+    GoodreadsLink TEXT,
+    -- Ordered by ID; each names array is parallel to its IDs array
+    Author_IDs INT[] NOT NULL DEFAULT '{}',
+    Author_Names TEXT[] NOT NULL DEFAULT '{}',
+    Genre_IDs INT[] NOT NULL DEFAULT '{}',
+    Genre_Names TEXT[] NOT NULL DEFAULT '{}'
+);
+
+-- Array overlap (&&) and containment (@>) filters
+CREATE INDEX idx_bookdoc_authorids ON book_doc USING GIN (Author_IDs);
+CREATE INDEX idx_bookdoc_authornames ON book_doc USING GIN (Author_Names);
+CREATE INDEX idx_bookdoc_genreids ON book_doc USING GIN (Genre_IDs);
+CREATE INDEX idx_bookdoc_genrenames ON book_doc USING GIN (Genre_Names);
+-- POST /books/lookup by ISBN-10 or ISBN-13
+CREATE INDEX idx_bookdoc_isbn ON book_doc (ISBN);
+CREATE INDEX idx_bookdoc_isbn13 ON book_doc (ISBN13);
+
+-- Rewrite the book_doc rows of the given books from the normalized tables
+CREATE FUNCTION book_doc_sync(book_ids INT[]) RETURNS VOID AS $$
+BEGIN
+    -- Serialize concurrent writers of the same book, so each one aggregates
+    -- the bridge rows the other committed. NO KEY UPDATE does not conflict
+    -- with the KEY SHARE locks taken by the bridge tables' foreign keys
+    PERFORM 1 FROM Book WHERE BookID = ANY(book_ids)
+    ORDER BY BookID FOR NO KEY UPDATE;
+
+    DELETE FROM book_doc d
+    WHERE d.BookID = ANY(book_ids)
+      AND NOT EXISTS (SELECT 1 FROM Book b WHERE b.BookID = d.BookID);
+
+    INSERT INTO book_doc (
+        BookID, Title, Description, BookFormat, Pages, AverageRating,
+        TotalRatings, ReviewsCount, ISBN, ISBN13, ImageURL, GoodreadsLink,
+        Author_IDs, Author_Names, Genre_IDs, Genre_Names
+    )
+    SELECT b.BookID, b.Title, b.Description, b.BookFormat, b.Pages,
+           b.AverageRating, b.TotalRatings, b.ReviewsCount, b.ISBN, b.ISBN13,
+           b.ImageURL, b.GoodreadsLink,
+           COALESCE(a.IDs, '{}'), COALESCE(a.Names, '{}'),
+           COALESCE(g.IDs, '{}'), COALESCE(g.Names, '{}')
+    FROM Book b
+    LEFT JOIN LATERAL (
+        SELECT array_agg(au.AuthorID ORDER BY au.AuthorID) AS IDs,
+               array_agg(au.Name::TEXT ORDER BY au.AuthorID) AS Names
+        FROM BookAuthor ba
+        JOIN Author au ON au.AuthorID = ba.AuthorID
+        WHERE ba.BookID = b.BookID
+    ) a ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT array_agg(ge.GenreID ORDER BY ge.GenreID) AS IDs,
+               array_agg(ge.Name::TEXT ORDER BY ge.GenreID) AS Names
+        FROM BookGenre bg
+        JOIN Genre ge ON ge.GenreID = bg.GenreID
+        WHERE bg.BookID = b.BookID
+    ) g ON TRUE
+    WHERE b.BookID = ANY(book_ids)
+    ON CONFLICT (BookID) DO UPDATE SET
+        Title = EXCLUDED.Title,
+        Description = EXCLUDED.Description,
+        BookFormat = EXCLUDED.BookFormat,
+        Pages = EXCLUDED.Pages,
+        AverageRating = EXCLUDED.AverageRating,
+        TotalRatings = EXCLUDED.TotalRatings,
+        ReviewsCount = EXCLUDED.ReviewsCount,
+        ISBN = EXCLUDED.ISBN,
+        ISBN13 = EXCLUDED.ISBN13,
+        ImageURL = EXCLUDED.ImageURL,
+        GoodreadsLink = EXCLUDED.GoodreadsLink,
+        Author_IDs = EXCLUDED.Author_IDs,
+        Author_Names = EXCLUDED.Author_Names,
+        Genre_IDs = EXCLUDED.Genre_IDs,
+        Genre_Names = EXCLUDED.Genre_Names;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level with transition tables, so bulk loads sync each book once
+-- per statement. Deleted books go with ON DELETE CASCADE
+CREATE FUNCTION book_doc_sync_rows() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM book_doc_sync(ARRAY(SELECT DISTINCT BookID FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION book_doc_sync_moved() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM book_doc_sync(ARRAY(
+        SELECT BookID FROM old_rows UNION SELECT BookID FROM new_rows
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION book_doc_sync_authors() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM book_doc_sync(ARRAY(
+        SELECT DISTINCT ba.BookID
+        FROM BookAuthor ba
+        JOIN changed_rows c ON c.AuthorID = ba.AuthorID
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION book_doc_sync_genres() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM book_doc_sync(ARRAY(
+        SELECT DISTINCT bg.BookID
+        FROM BookGenre bg
+        JOIN changed_rows c ON c.GenreID = bg.GenreID
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER book_doc_book_insert
+    AFTER INSERT ON Book REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_book_update
+    AFTER UPDATE ON Book REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookauthor_insert
+    AFTER INSERT ON BookAuthor REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookauthor_delete
+    AFTER DELETE ON BookAuthor REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookauthor_update
+    AFTER UPDATE ON BookAuthor REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_moved();
+CREATE TRIGGER book_doc_bookgenre_insert
+    AFTER INSERT ON BookGenre REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookgenre_delete
+    AFTER DELETE ON BookGenre REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookgenre_update
+    AFTER UPDATE ON BookGenre REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_moved();
+-- Renames
+CREATE TRIGGER book_doc_author_update
+    AFTER UPDATE ON Author REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_authors();
+CREATE TRIGGER book_doc_genre_update
+    AFTER UPDATE ON Genre REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_genres();
+
+-- Backfill books loaded before this table existed
+SELECT book_doc_sync(ARRAY(SELECT BookID FROM Book));
@@ -0,0 +1,104 @@
+DROP TABLE IF EXISTS readinglist_event CASCADE;
+DROP FUNCTION IF EXISTS readinglist_event_item(ReadingList) CASCADE;
+DROP FUNCTION IF EXISTS readinglist_event_added() CASCADE;
+DROP FUNCTION IF EXISTS readinglist_event_updated() CASCADE;
+DROP FUNCTION IF EXISTS readinglist_event_removed() CASCADE;
+
+-- Change feed of reading list items, written by the triggers below in the
+-- same transaction as the change and streamed by GET /readinglist/{user_id}/events.
+-- EventID is the SSE event ID clients resume from; old rows are pruned by
+-- backend/reading_events.py. No foreign key on UserID: deleting a user
+-- cascades to ReadingList, whose delete trigger must not then write events
+-- referencing the deleted user
+CREATE TABLE readinglist_event (
+    EventID BIGSERIAL PRIMARY KEY,
+    UserID INT NOT NULL,
+    BookID INT NOT NULL,
+    Op VARCHAR(10) NOT NULL CHECK (Op IN ('add', 'update', 'remove')),
+    -- The item after the change; NULL for removals
+    Item JSONB,
+    CreatedAt TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX idx_readinglistevent_user ON readinglist_event (UserID, EventID);
+CREATE INDEX idx_readinglistevent_createdat ON readinglist_event (CreatedAt);
+
+CREATE FUNCTION readinglist_event_item(r ReadingList) RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'status', r.Status,
+        'progresspages', r.ProgressPages,
+        'userrating', r.UserRating,
+        'note', r.Note,
+        'addedat', r.AddedAt
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Statement-level with transition tables, so batch writes record their events
+-- and notify each affected user once per statement. The payload is the user
+-- ID; listeners read the events themselves, which are visible by the time
+-- the notification is delivered on commit.
+-- Each function first takes a per-user advisory lock (class 4601, held until
+-- the transaction ends), so a user's events
+-- get their IDs in commit order and a client that has seen event N can
+-- never later miss an earlier one
+CREATE FUNCTION readinglist_event_added() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(4601, u.UserID)
+    FROM (SELECT DISTINCT UserID FROM new_rows ORDER BY UserID) u;
+    INSERT INTO readinglist_event (UserID, BookID, Op, Item)
+    SELECT n.UserID, n.BookID, 'add', readinglist_event_item(n)
+    FROM new_rows n
+    ORDER BY n.UserID, n.BookID;
+    PERFORM pg_notify('readinglist_events', u.UserID::TEXT)
+    FROM (SELECT DISTINCT UserID FROM new_rows) u;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION readinglist_event_updated() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(4601, u.UserID)
+    FROM (SELECT DISTINCT UserID FROM new_rows ORDER BY UserID) u;
+    -- Skip rows written back unchanged
+    INSERT INTO readinglist_event (UserID, BookID, Op, Item)
+    SELECT n.UserID, n.BookID, 'update', readinglist_event_item(n)
+    FROM new_rows n
+    JOIN old_rows o ON o.UserID = n.UserID AND o.BookID = n.BookID
+    WHERE o IS DISTINCT FROM n
+    ORDER BY n.UserID, n.BookID;
+    PERFORM pg_notify('readinglist_events', u.UserID::TEXT)
+    FROM (
+        SELECT DISTINCT n.UserID
+        FROM new_rows n
+        JOIN old_rows o ON o.UserID = n.UserID AND o.BookID = n.BookID
+        WHERE o IS DISTINCT FROM n
+    ) u;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION readinglist_event_removed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(4601, u.UserID)
+    FROM (SELECT DISTINCT UserID FROM old_rows ORDER BY UserID) u;
+    -- Users being deleted (the cascade) have no one left to tell
+    INSERT INTO readinglist_event (UserID, BookID, Op)
+    SELECT o.UserID, o.BookID, 'remove'
+    FROM old_rows o
+    WHERE EXISTS (SELECT 1 FROM "User" u WHERE u.UserID = o.UserID)
+    ORDER BY o.UserID, o.BookID;
+    PERFORM pg_notify('readinglist_events', u.UserID::TEXT)
+    FROM (SELECT DISTINCT UserID FROM old_rows) u;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER readinglist_event_insert
+    AFTER INSERT ON ReadingList REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION readinglist_event_added();
+CREATE TRIGGER readinglist_event_update
+    AFTER UPDATE ON ReadingList REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION readinglist_event_updated();
+CREATE TRIGGER readinglist_event_delete
+    AFTER DELETE ON ReadingList REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION readinglist_event_removed();
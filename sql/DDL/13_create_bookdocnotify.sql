@@ -0,0 +1,35 @@
+DROP FUNCTION IF EXISTS book_doc_notify() CASCADE;
+
+-- Tell each API worker's in-memory catalog (backend/catalog_engine.py) which
+-- books changed: the IDs of the inserted, updated or deleted book_doc rows,
+-- comma-separated on the book_doc_changes channel, in chunks that stay under
+-- the 8000-byte payload limit. Sent on commit, so a worker that reads the
+-- books on notification sees the change
+CREATE FUNCTION book_doc_notify() RETURNS TRIGGER AS $$
+DECLARE
+    chunk TEXT;
+BEGIN
+    FOR chunk IN
+        SELECT string_agg(BookID::TEXT, ',' ORDER BY BookID)
+        FROM (
+            SELECT BookID, (row_number() OVER (ORDER BY BookID) - 1) / 800 AS part
+            FROM (SELECT DISTINCT BookID FROM changed_rows) c
+        ) numbered
+        GROUP BY part
+    LOOP
+        PERFORM pg_notify('book_doc_changes', chunk);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER book_doc_notify_insert
+    AFTER INSERT ON book_doc REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_notify();
+CREATE TRIGGER book_doc_notify_update
+    AFTER UPDATE ON book_doc REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_notify();
+-- Includes books deleted through ON DELETE CASCADE from Book
+CREATE TRIGGER book_doc_notify_delete
+    AFTER DELETE ON book_doc REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_notify();
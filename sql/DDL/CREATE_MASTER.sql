@@ -1,6 +1,13 @@
 -- DATABASE SCHEMA: Online Bookshelf
 
 -- Drop tables if they exist (for reruns)
+DROP TABLE IF EXISTS readinglist_event CASCADE;
+DROP TABLE IF EXISTS book_doc CASCADE;
+DROP MATERIALIZED VIEW IF EXISTS author_stats CASCADE;
+DROP TABLE IF EXISTS author_stats_dirty CASCADE;
+DROP TABLE IF EXISTS book_also_read_dirty CASCADE;
+DROP TABLE IF EXISTS book_also_read CASCADE;
+DROP TABLE IF EXISTS user_reading_stats CASCADE;
 DROP TABLE IF EXISTS ReadingList CASCADE;
 DROP TABLE IF EXISTS BookGenre CASCADE;
 DROP TABLE IF EXISTS BookAuthor CASCADE;
@@ -78,3 +85,428 @@ CREATE TABLE ReadingList (
     FOREIGN KEY (UserID) REFERENCES "User"(UserID) ON DELETE CASCADE,
     FOREIGN KEY (BookID) REFERENCES Book(BookID) ON DELETE CASCADE
 );
+
+-- Keyset pagination of a user's reading list by (AddedAt, BookID)
+CREATE INDEX idx_readinglist_user_addedat ON ReadingList (UserID, AddedAt);
+
+-- Recent adds for the trending counters (backend/trending.py)
+CREATE INDEX idx_readinglist_addedat ON ReadingList (AddedAt);
+
+-- 8. USER_READING_STATS TABLE (per-user reading list aggregates)
+-- Backfill after loading data with: python backend/reading_stats.py
+CREATE TABLE user_reading_stats (
+    UserID INT PRIMARY KEY,
+    Want_Count INT NOT NULL DEFAULT 0,
+    Reading_Count INT NOT NULL DEFAULT 0,
+    Completed_Count INT NOT NULL DEFAULT 0,
+    Dropped_Count INT NOT NULL DEFAULT 0,
+    Rating_Sum DECIMAL(12,1) NOT NULL DEFAULT 0,
+    Rating_Count INT NOT NULL DEFAULT 0,
+    Pages_Read BIGINT NOT NULL DEFAULT 0,
+    UpdatedAt TIMESTAMP DEFAULT NOW(),
+    FOREIGN KEY (UserID) REFERENCES "User"(UserID) ON DELETE CASCADE
+);
+
+-- 9. BOOK_ALSO_READ TABLES ("readers also shelved" recommendations)
+-- Build after loading data with: python backend/also_read.py --full
+CREATE TABLE book_also_read (
+    BookID INT NOT NULL,
+    Rank INT NOT NULL,
+    NeighborID INT NOT NULL,
+    Score DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (BookID, Rank),
+    FOREIGN KEY (BookID) REFERENCES Book(BookID) ON DELETE CASCADE,
+    FOREIGN KEY (NeighborID) REFERENCES Book(BookID) ON DELETE CASCADE
+);
+
+CREATE TABLE book_also_read_dirty (
+    BookID INT PRIMARY KEY,
+    MarkedAt TIMESTAMP DEFAULT NOW()
+);
+
+-- 10. AUTHOR_STATS MATERIALIZED VIEW (per-author aggregates)
+-- Refreshed CONCURRENTLY by the API's background jobs or with:
+-- python backend/author_stats.py
+DROP FUNCTION IF EXISTS mark_author_stats_dirty() CASCADE;
+CREATE MATERIALIZED VIEW author_stats AS
+WITH book_stats AS (
+    SELECT ba.AuthorID,
+           COUNT(*) AS Book_Count,
+           AVG(b.AverageRating)::DOUBLE PRECISION AS Avg_Rating,
+           COALESCE(SUM(b.TotalRatings), 0)::BIGINT AS Total_Ratings
+    FROM BookAuthor ba
+    JOIN Book b ON b.BookID = ba.BookID
+    GROUP BY ba.AuthorID
+),
+genre_counts AS (
+    SELECT ba.AuthorID,
+           g.Name,
+           ROW_NUMBER() OVER (
+               PARTITION BY ba.AuthorID ORDER BY COUNT(*) DESC, g.Name
+           ) AS Position
+    FROM BookAuthor ba
+    JOIN BookGenre bg ON bg.BookID = ba.BookID
+    JOIN Genre g ON g.GenreID = bg.GenreID
+    GROUP BY ba.AuthorID, g.Name
+),
+top_genres AS (
+    SELECT AuthorID, array_agg(Name::TEXT ORDER BY Position) AS Top_Genres
+    FROM genre_counts
+    WHERE Position <= 3
+    GROUP BY AuthorID
+)
+SELECT a.AuthorID,
+       COALESCE(bs.Book_Count, 0) AS Book_Count,
+       bs.Avg_Rating,
+       COALESCE(bs.Total_Ratings, 0) AS Total_Ratings,
+       COALESCE(tg.Top_Genres, ARRAY[]::TEXT[]) AS Top_Genres
+FROM Author a
+LEFT JOIN book_stats bs ON bs.AuthorID = a.AuthorID
+LEFT JOIN top_genres tg ON tg.AuthorID = a.AuthorID;
+
+-- REFRESH ... CONCURRENTLY requires a unique index
+CREATE UNIQUE INDEX idx_authorstats_authorid ON author_stats (AuthorID);
+-- Backs GET /authors/?sort=popularity
+CREATE INDEX idx_authorstats_popularity ON author_stats (Total_Ratings DESC, AuthorID);
+
+-- Single row set whenever the catalog changes; cleared by the refresh
+CREATE TABLE author_stats_dirty (
+    ID SMALLINT PRIMARY KEY DEFAULT 1 CHECK (ID = 1),
+    MarkedAt TIMESTAMP DEFAULT NOW()
+);
+
+CREATE FUNCTION mark_author_stats_dirty() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO author_stats_dirty (ID, MarkedAt) VALUES (1, NOW())
+    ON CONFLICT (ID) DO UPDATE SET MarkedAt = EXCLUDED.MarkedAt;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, so bulk loads mark the view once per statement
+CREATE TRIGGER book_author_stats_dirty
+    AFTER INSERT OR UPDATE OR DELETE ON Book
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+CREATE TRIGGER author_author_stats_dirty
+    AFTER INSERT OR DELETE ON Author
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+CREATE TRIGGER genre_author_stats_dirty
+    AFTER UPDATE ON Genre
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+CREATE TRIGGER bookauthor_author_stats_dirty
+    AFTER INSERT OR UPDATE OR DELETE ON BookAuthor
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+CREATE TRIGGER bookgenre_author_stats_dirty
+    AFTER INSERT OR UPDATE OR DELETE ON BookGenre
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_author_stats_dirty();
+
+-- 11. BOOK_DOC TABLE (denormalized book listings)
+-- Kept current by triggers on the catalog tables; rebuild with:
+-- python backend/book_doc.py
+DROP FUNCTION IF EXISTS book_doc_sync(INT[]) CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync_rows() CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync_moved() CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync_authors() CASCADE;
+DROP FUNCTION IF EXISTS book_doc_sync_genres() CASCADE;
+CREATE TABLE book_doc (
+    BookID INT PRIMARY KEY REFERENCES Book(BookID) ON DELETE CASCADE,
+    Title VARCHAR(500) NOT NULL,
+    Description TEXT,
+    BookFormat VARCHAR(50),
+    Pages INT,
+    AverageRating DECIMAL(2,1),
+    TotalRatings INT,
+    ReviewsCount INT,
+    ISBN VARCHAR(20) NOT NULL,
+    ISBN13 VARCHAR(30),
+    ImageURL TEXT,
+    GoodreadsLink TEXT,
+    -- Ordered by ID; each names array is parallel to its IDs array
+    Author_IDs INT[] NOT NULL DEFAULT '{}',
+    Author_Names TEXT[] NOT NULL DEFAULT '{}',
+    Genre_IDs INT[] NOT NULL DEFAULT '{}',
+    Genre_Names TEXT[] NOT NULL DEFAULT '{}'
+);
+
+-- Array overlap (&&) and containment (@>) filters
+CREATE INDEX idx_bookdoc_authorids ON book_doc USING GIN (Author_IDs);
+CREATE INDEX idx_bookdoc_authornames ON book_doc USING GIN (Author_Names);
+CREATE INDEX idx_bookdoc_genreids ON book_doc USING GIN (Genre_IDs);
+CREATE INDEX idx_bookdoc_genrenames ON book_doc USING GIN (Genre_Names);
+-- POST /books/lookup by ISBN-10 or ISBN-13
+CREATE INDEX idx_bookdoc_isbn ON book_doc (ISBN);
+CREATE INDEX idx_bookdoc_isbn13 ON book_doc (ISBN13);
+
+-- Rewrite the book_doc rows of the given books from the normalized tables
+CREATE FUNCTION book_doc_sync(book_ids INT[]) RETURNS VOID AS $$
+BEGIN
+    -- Serialize concurrent writers of the same book, so each one aggregates
+    -- the bridge rows the other committed. NO KEY UPDATE does not conflict
+    -- with the KEY SHARE locks taken by the bridge tables' foreign keys
+    PERFORM 1 FROM Book WHERE BookID = ANY(book_ids)
+    ORDER BY BookID FOR NO KEY UPDATE;
+
+    DELETE FROM book_doc d
+    WHERE d.BookID = ANY(book_ids)
+      AND NOT EXISTS (SELECT 1 FROM Book b WHERE b.BookID = d.BookID);
+
+    INSERT INTO book_doc (
+        BookID, Title, Description, BookFormat, Pages, AverageRating,
+        TotalRatings, ReviewsCount, ISBN, ISBN13, ImageURL, GoodreadsLink,
+        Author_IDs, Author_Names, Genre_IDs, Genre_Names
+    )
+    SELECT b.BookID, b.Title, b.Description, b.BookFormat, b.Pages,
+           b.AverageRating, b.TotalRatings, b.ReviewsCount, b.ISBN, b.ISBN13,
+           b.ImageURL, b.GoodreadsLink,
+           COALESCE(a.IDs, '{}'), COALESCE(a.Names, '{}'),
+           COALESCE(g.IDs, '{}'), COALESCE(g.Names, '{}')
+    FROM Book b
+    LEFT JOIN LATERAL (
+        SELECT array_agg(au.AuthorID ORDER BY au.AuthorID) AS IDs,
+               array_agg(au.Name::TEXT ORDER BY au.AuthorID) AS Names
+        FROM BookAuthor ba
+        JOIN Author au ON au.AuthorID = ba.AuthorID
+        WHERE ba.BookID = b.BookID
+    ) a ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT array_agg(ge.GenreID ORDER BY ge.GenreID) AS IDs,
+               array_agg(ge.Name::TEXT ORDER BY ge.GenreID) AS Names
+        FROM BookGenre bg
+        JOIN Genre ge ON ge.GenreID = bg.GenreID
+        WHERE bg.BookID = b.BookID
+    ) g ON TRUE
+    WHERE b.BookID = ANY(book_ids)
+    ON CONFLICT (BookID) DO UPDATE SET
+        Title = EXCLUDED.Title,
+        Description = EXCLUDED.Description,
+        BookFormat = EXCLUDED.BookFormat,
+        Pages = EXCLUDED.Pages,
+        AverageRating = EXCLUDED.AverageRating,
+        TotalRatings = EXCLUDED.TotalRatings,
+        ReviewsCount = EXCLUDED.ReviewsCount,
+        ISBN = EXCLUDED.ISBN,
+        ISBN13 = EXCLUDED.ISBN13,
+        ImageURL = EXCLUDED.ImageURL,
+        GoodreadsLink = EXCLUDED.GoodreadsLink,
+        Author_IDs = EXCLUDED.Author_IDs,
+        Author_Names = EXCLUDED.Author_Names,
+        Genre_IDs = EXCLUDED.Genre_IDs,
+        Genre_Names = EXCLUDED.Genre_Names;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level with transition tables, so bulk loads sync each book once
+-- per statement. Deleted books go with ON DELETE CASCADE
+CREATE FUNCTION book_doc_sync_rows() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM book_doc_sync(ARRAY(SELECT DISTINCT BookID FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION book_doc_sync_moved() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM book_doc_sync(ARRAY(
+        SELECT BookID FROM old_rows UNION SELECT BookID FROM new_rows
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION book_doc_sync_authors() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM book_doc_sync(ARRAY(
+        SELECT DISTINCT ba.BookID
+        FROM BookAuthor ba
+        JOIN changed_rows c ON c.AuthorID = ba.AuthorID
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION book_doc_sync_genres() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM book_doc_sync(ARRAY(
+        SELECT DISTINCT bg.BookID
+        FROM BookGenre bg
+        JOIN changed_rows c ON c.GenreID = bg.GenreID
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER book_doc_book_insert
+    AFTER INSERT ON Book REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_book_update
+    AFTER UPDATE ON Book REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookauthor_insert
+    AFTER INSERT ON BookAuthor REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookauthor_delete
+    AFTER DELETE ON BookAuthor REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookauthor_update
+    AFTER UPDATE ON BookAuthor REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_moved();
+CREATE TRIGGER book_doc_bookgenre_insert
+    AFTER INSERT ON BookGenre REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookgenre_delete
+    AFTER DELETE ON BookGenre REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_rows();
+CREATE TRIGGER book_doc_bookgenre_update
+    AFTER UPDATE ON BookGenre REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_moved();
+-- Renames
+CREATE TRIGGER book_doc_author_update
+    AFTER UPDATE ON Author REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_authors();
+CREATE TRIGGER book_doc_genre_update
+    AFTER UPDATE ON Genre REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_sync_genres();
+
+-- 12. READINGLIST_EVENT TABLE (reading list change feed)
+-- Streamed by GET /readinglist/{user_id}/events; see backend/reading_events.py
+DROP FUNCTION IF EXISTS readinglist_event_item(ReadingList) CASCADE;
+DROP FUNCTION IF EXISTS readinglist_event_added() CASCADE;
+DROP FUNCTION IF EXISTS readinglist_event_updated() CASCADE;
+DROP FUNCTION IF EXISTS readinglist_event_removed() CASCADE;
+
+-- Change feed of reading list items, written by the triggers below in the
+-- same transaction as the change and streamed by GET /readinglist/{user_id}/events.
+-- EventID is the SSE event ID clients resume from; old rows are pruned by
+-- backend/reading_events.py. No foreign key on UserID: deleting a user
+-- cascades to ReadingList, whose delete trigger must not then write events
+-- referencing the deleted user
+CREATE TABLE readinglist_event (
+    EventID BIGSERIAL PRIMARY KEY,
+    UserID INT NOT NULL,
+    BookID INT NOT NULL,
+    Op VARCHAR(10) NOT NULL CHECK (Op IN ('add', 'update', 'remove')),
+    -- The item after the change; NULL for removals
+    Item JSONB,
+    CreatedAt TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX idx_readinglistevent_user ON readinglist_event (UserID, EventID);
+CREATE INDEX idx_readinglistevent_createdat ON readinglist_event (CreatedAt);
+
+CREATE FUNCTION readinglist_event_item(r ReadingList) RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'status', r.Status,
+        'progresspages', r.ProgressPages,
+        'userrating', r.UserRating,
+        'note', r.Note,
+        'addedat', r.AddedAt
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Statement-level with transition tables, so batch writes record their events
+-- and notify each affected user once per statement. The payload is the user
+-- ID; listeners read the events themselves, which are visible by the time
+-- the notification is delivered on commit.
+-- Each function first takes a per-user advisory lock (class 4601, held until
+-- the transaction ends), so a user's events
+-- get their IDs in commit order and a client that has seen event N can
+-- never later miss an earlier one
+CREATE FUNCTION readinglist_event_added() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(4601, u.UserID)
+    FROM (SELECT DISTINCT UserID FROM new_rows ORDER BY UserID) u;
+    INSERT INTO readinglist_event (UserID, BookID, Op, Item)
+    SELECT n.UserID, n.BookID, 'add', readinglist_event_item(n)
+    FROM new_rows n
+    ORDER BY n.UserID, n.BookID;
+    PERFORM pg_notify('readinglist_events', u.UserID::TEXT)
+    FROM (SELECT DISTINCT UserID FROM new_rows) u;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION readinglist_event_updated() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(4601, u.UserID)
+    FROM (SELECT DISTINCT UserID FROM new_rows ORDER BY UserID) u;
+    -- Skip rows written back unchanged
+    INSERT INTO readinglist_event (UserID, BookID, Op, Item)
+    SELECT n.UserID, n.BookID, 'update', readinglist_event_item(n)
+    FROM new_rows n
+    JOIN old_rows o ON o.UserID = n.UserID AND o.BookID = n.BookID
+    WHERE o IS DISTINCT FROM n
+    ORDER BY n.UserID, n.BookID;
+    PERFORM pg_notify('readinglist_events', u.UserID::TEXT)
+    FROM (
+        SELECT DISTINCT n.UserID
+        FROM new_rows n
+        JOIN old_rows o ON o.UserID = n.UserID AND o.BookID = n.BookID
+        WHERE o IS DISTINCT FROM n
+    ) u;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION readinglist_event_removed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(4601, u.UserID)
+    FROM (SELECT DISTINCT UserID FROM old_rows ORDER BY UserID) u;
+    -- Users being deleted (the cascade) have no one left to tell
+    INSERT INTO readinglist_event (UserID, BookID, Op)
+    SELECT o.UserID, o.BookID, 'remove'
+    FROM old_rows o
+    WHERE EXISTS (SELECT 1 FROM "User" u WHERE u.UserID = o.UserID)
+    ORDER BY o.UserID, o.BookID;
+    PERFORM pg_notify('readinglist_events', u.UserID::TEXT)
+    FROM (SELECT DISTINCT UserID FROM old_rows) u;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER readinglist_event_insert
+    AFTER INSERT ON ReadingList REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION readinglist_event_added();
+CREATE TRIGGER readinglist_event_update
+    AFTER UPDATE ON ReadingList REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION readinglist_event_updated();
+CREATE TRIGGER readinglist_event_delete
+    AFTER DELETE ON ReadingList REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION readinglist_event_removed();
+
+-- 13. BOOK_DOC CHANGE NOTIFICATIONS (in-memory catalog updates)
+-- Listened to by backend/catalog_engine.py
+DROP FUNCTION IF EXISTS book_doc_notify() CASCADE;
+
+-- Tell each API worker's in-memory catalog (backend/catalog_engine.py) which
+-- books changed: the IDs of the inserted, updated or deleted book_doc rows,
+-- comma-separated on the book_doc_changes channel, in chunks that stay under
+-- the 8000-byte payload limit. Sent on commit, so a worker that reads the
+-- books on notification sees the change
+CREATE FUNCTION book_doc_notify() RETURNS TRIGGER AS $$
+DECLARE
+    chunk TEXT;
+BEGIN
+    FOR chunk IN
+        SELECT string_agg(BookID::TEXT, ',' ORDER BY BookID)
+        FROM (
+            SELECT BookID, (row_number() OVER (ORDER BY BookID) - 1) / 800 AS part
+            FROM (SELECT DISTINCT BookID FROM changed_rows) c
+        ) numbered
+        GROUP BY part
+    LOOP
+        PERFORM pg_notify('book_doc_changes', chunk);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER book_doc_notify_insert
+    AFTER INSERT ON book_doc REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_notify();
+CREATE TRIGGER book_doc_notify_update
+    AFTER UPDATE ON book_doc REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_notify();
+-- Includes books deleted through ON DELETE CASCADE from Book
+CREATE TRIGGER book_doc_notify_delete
+    AFTER DELETE ON book_doc REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_doc_notify();